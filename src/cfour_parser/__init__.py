@@ -0,0 +1,7 @@
+def open(path):
+    """
+    Returns a lazy view of the CFOUR output at `path`, see
+    `cfour_parser.lazy`.
+    """
+    from cfour_parser.lazy import LazyOutput
+    return LazyOutput(path)
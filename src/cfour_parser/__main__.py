@@ -1,15 +1,11 @@
 #!/usr/bin/env python3
 
 import argparse
-import json
-from cfour_parser.text import pretty_introduce_section
+import os
+import sys
+from cfour_parser.compression import open_input
 from cfour_parser.programs import find_programs
-from cfour_parser.xjoda import parse_xjoda_program
-from cfour_parser.xvscf import parse_xvscf_program
-from cfour_parser.xdqcscf import parse_xdqcscf_program
-from cfour_parser.xncc import parse_xncc_program
-from cfour_parser.xvcc import parse_xvcc_program
-from cfour_parser.xvee import parse_xvee_program
+from cfour_parser.registry import get_command, parse_programs
 
 
 def get_args():
@@ -17,37 +13,74 @@ def get_args():
     parser.add_argument('cfour_output', help='CFOUR output.')
     parser.add_argument('-j', '--json', default=False, action='store_true')
     parser.add_argument('-v', '--verbose', default=0, action='count')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Write the JSON to this file instead of stdout.'
+                        ' The file is compressed if its name ends with .gz,'
+                        ' .xz, .bz2, or .zst.')
+    parser.add_argument('--ndjson', default=False, action='store_true',
+                        help='Write one JSON line per program.')
+    parser.add_argument('--export', default=None,
+                        choices=('npz', 'npy', 'parquet'),
+                        help='Export columnar tables into the directory '
+                        'given with -o.')
+    parser.add_argument('--export-trace', default=None, metavar='FILE',
+                        help='Write the timeline of the job in the Chrome '
+                        'trace format.')
     args = parser.parse_args()
     return args
 
 
+def write_json(programs, path=None, ndjson: bool = False):
+    """
+    Prints `programs` as JSON, or writes them to the file `path`.
+    With `ndjson` each program is written in its own line.
+    """
+    import json
+    from cfour_parser.compression import open_output
+
+    if ndjson is True:
+        text = ''.join(json.dumps(program) + '\n' for program in programs)
+    else:
+        text = json.dumps(programs) + '\n'
+
+    if path is None:
+        sys.stdout.write(text)
+        return
+
+    with open_output(path) as output:
+        output.write(text)
+
+
 def main():
+    # An existing file is parsed even if it is named like a command
+    if len(sys.argv) > 1 and not os.path.exists(sys.argv[1]):
+        command = get_command(sys.argv[1])
+        if command is not None:
+            return command(sys.argv[2:])
+
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
-    parsers = {
-        'xjoda': parse_xjoda_program,
-        'xvscf': parse_xvscf_program,
-        'xdqcscf': parse_xdqcscf_program,
-        'xncc': parse_xncc_program,
-        'xvcc': parse_xvcc_program,
-        'xvee': parse_xvee_program,
-    }
+    # Parsers are imported only for the programs present in the output
+    parse_programs(programs)
 
-    for program in programs:
-        if program['name'] in parsers:
-            parse_program = parsers[program['name']]
-            parse_program(program)
+    if args.export_trace is not None:
+        from cfour_parser.trace import write_trace
+        write_trace(programs, args.export_trace)
 
-    if args.json is True:
-        print(json.dumps(programs))
-
-    if args.verbose is True:
-        for program in programs:
-            pretty_introduce_section(program)
+    if args.export is not None:
+        if args.output is None:
+            raise SystemExit("Error: --export requires -o DIRECTORY.")
+        from cfour_parser.export import add_run, collect_tables, write_tables
+        tables = collect_tables(programs)
+        add_run(tables, 0, args.cfour_output)
+        write_tables(tables, args.output, args.export)
+    elif args.json is True or args.output is not None:
+        write_json(programs, args.output, args.ndjson)
 
     if args.verbose > 0:
+        from cfour_parser.text import pretty_introduce_section
         for program in programs:
             pretty_introduce_section(program, args.verbose)
 
@@ -0,0 +1,146 @@
+"""
+Reading CFOUR outputs straight out of tar and zip archives.
+
+Members of zip files and of uncompressed tar files are read by seeking to
+their data, so any process can read any member independently. Compressed tar
+files can only be streamed; their members are read in one sequential pass.
+"""
+
+import fnmatch
+import os.path
+import tarfile
+import threading
+import zipfile
+from cfour_parser.compression import EXTENSIONS
+
+DEFAULT_PATTERN = '*.c4'
+
+TAR_EXTENSIONS = ('.tar',)
+STREAMED_TAR_EXTENSIONS = ('.tar.gz', '.tgz', '.tar.xz', '.txz', '.tar.bz2',
+                           '.tbz2', '.tar.zst')
+ZIP_EXTENSIONS = ('.zip',)
+
+# Archives already opened by this process, keyed by their path; ZipFile
+# reads of several threads are safe, opening them is guarded by the lock
+_open_zip_files = dict()
+_open_zip_files_lock = threading.Lock()
+
+
+def archive_kind(path):
+    """
+    Tells the kind of the archive `path` by its name. Returns 'tar', 'zip',
+    'streamed tar' (a compressed tar), or None if `path` is not an archive.
+    """
+    name = str(path).lower()
+    if name.endswith(TAR_EXTENSIONS):
+        return 'tar'
+    if name.endswith(STREAMED_TAR_EXTENSIONS):
+        return 'streamed tar'
+    if name.endswith(ZIP_EXTENSIONS):
+        return 'zip'
+    return None
+
+
+def matches_pattern(name, pattern: str = DEFAULT_PATTERN):
+    """
+    True if the base name of `name` matches the glob `pattern`, also when
+    followed by the extension of a compressed file.
+    """
+    base = os.path.basename(name)
+    if fnmatch.fnmatch(base, pattern):
+        return True
+    for extension in EXTENSIONS:
+        if fnmatch.fnmatch(base, pattern + extension):
+            return True
+    return False
+
+
+def list_archive_members(path, pattern: str = DEFAULT_PATTERN):
+    """
+    Lists members of the archive `path` whose names match `pattern`. Each
+    member is a dictionary with
+        'path': path of the archive
+        'member': name of the member
+        'kind': kind of the archive, see `archive_kind`
+        'size': size of the member in bytes
+        'offset': position of the member's data in the tar file
+    Members of streamed tars are read with `stream_archive_members`.
+    """
+    kind = archive_kind(path)
+    members = list()
+    if kind == 'tar':
+        with tarfile.open(path, 'r:') as tar:
+            for info in tar:
+                if not info.isfile() or not matches_pattern(info.name,
+                                                            pattern):
+                    continue
+                members += [{
+                    'path': path,
+                    'member': info.name,
+                    'kind': kind,
+                    'size': info.size,
+                    'offset': info.offset_data,
+                }]
+    elif kind == 'zip':
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not matches_pattern(info.filename,
+                                                        pattern):
+                    continue
+                members += [{
+                    'path': path,
+                    'member': info.filename,
+                    'kind': kind,
+                    'size': info.file_size,
+                }]
+    else:
+        raise ValueError(f"{path} is not a seekable archive.")
+
+    return members
+
+
+def stream_archive_members(path, pattern: str = DEFAULT_PATTERN):
+    """
+    Reads the members of a compressed tar in one pass. Yields dictionaries
+    like `list_archive_members` does, with the member's content under the
+    key 'data'.
+    """
+    from cfour_parser.compression import open_input
+
+    with open_input(path, 'rb') as stream:
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for info in tar:
+                if not info.isfile() or not matches_pattern(info.name,
+                                                            pattern):
+                    continue
+                yield {
+                    'path': path,
+                    'member': info.name,
+                    'kind': 'streamed tar',
+                    'size': info.size,
+                    'data': tar.extractfile(info).read(),
+                }
+
+
+def read_archive_member(member):
+    """
+    Returns the bytes of an archive's `member` as listed by
+    `list_archive_members`.
+    """
+    if 'data' in member:
+        return member['data']
+
+    if member['kind'] == 'tar':
+        with open(member['path'], 'rb') as tar:
+            tar.seek(member['offset'])
+            return tar.read(member['size'])
+
+    if member['kind'] == 'zip':
+        path = member['path']
+        with _open_zip_files_lock:
+            if path not in _open_zip_files:
+                _open_zip_files[path] = zipfile.ZipFile(path)
+            archive = _open_zip_files[path]
+        return archive.read(member['member'])
+
+    raise ValueError(f"Cannot read member of a {member['kind']} randomly.")
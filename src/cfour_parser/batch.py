@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+"""
+Parsing of many CFOUR outputs in one go.
+
+    cfour_parser batch runs/ campaign.tar.gz -o results.ndjson.gz --jobs 8
+
+Inputs are CFOUR outputs, directories (searched recursively for outputs
+whose names match `--pattern`), and tar or zip archives (whose members are
+read without extracting them to disk). Each parsed output is written as one
+line of JSON
+    {"path": ..., "member": ..., "sha256": ..., "programs": [...]}
+where 'member' is the name of the output inside of the archive 'path' (None
+for plain files) and 'sha256' is the hash of the uncompressed output.
+Outputs found in input directories also have their path relative to the
+directory under 'name'. The warnings of the parsers, if any, are listed
+under 'warnings'.
+
+The outputs are parsed by `--jobs` processes, or with `--pool thread` by
+threads, which avoid sending the results between processes and run in
+parallel on free-threaded Python builds.
+
+With `--shard i/N` only the i-th of N shares of the outputs (1 <= i <= N) is
+parsed. Outputs are assigned to shares by a hash of their member and their
+path relative to the input directory they were found in, or relative to the
+current directory for inputs which are files or archives. So N runs with the
+same inputs, e.g., on N nodes, parse every output exactly once whether the
+inputs are given as `runs/`, `./runs`, or `/abs/runs`; `cfour_parser merge`
+joins their results. `--memory-budget` bounds the memory of the workers, see
+`cfour_parser.schedule`. `--manifest` makes a run resumable, see
+`cfour_parser.manifest`.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import io
+import json
+import os
+import sys
+from cfour_parser.archive import DEFAULT_PATTERN, archive_kind, \
+    list_archive_members, matches_pattern, read_archive_member, \
+    stream_archive_members
+from cfour_parser.compression import compression_from_name, \
+    detect_compression, open_input, open_output
+from cfour_parser.programs import find_programs
+from cfour_parser.registry import parse_programs
+from cfour_parser.util import collect_diagnostics
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser batch')
+    parser.add_argument('inputs', nargs='+',
+                        help='CFOUR outputs, directories, or archives.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='NDJSON output file (stdout by default).')
+    parser.add_argument('--jobs', default=1, type=int,
+                        help='Number of parsing processes.')
+    parser.add_argument('--pool', default='process',
+                        choices=('process', 'thread'),
+                        help='Parse in processes or in threads; threads '
+                        'need a free-threaded Python to run in parallel.')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help='Glob matching names of CFOUR outputs in '
+                        'directories and archives.')
+    parser.add_argument('--export', default=None,
+                        choices=('npz', 'npy', 'parquet'),
+                        help='Instead of NDJSON export columnar tables of '
+                        'all outputs into the directory given with -o.')
+    parser.add_argument('--shard', default=None, type=parse_shard,
+                        metavar='i/N',
+                        help='Parse only the share i/N of the outputs.')
+    parser.add_argument('--memory-budget', default=None,
+                        type=parse_memory_budget, metavar='SIZE',
+                        help='Keep the estimated memory of the workers '
+                        'below SIZE, e.g., 16GiB, starting the largest '
+                        'outputs first. Records are written as outputs '
+                        'finish.')
+    parser.add_argument('--read-ahead', default=None,
+                        type=parse_memory_budget, metavar='SIZE',
+                        help='Read outputs in threads up to SIZE, e.g., '
+                        '256MiB, ahead of the parsing, which helps on slow '
+                        'filesystems.')
+    parser.add_argument('--read-threads', default=4, type=int,
+                        help='Number of threads reading ahead.')
+    parser.add_argument('--manifest', default=None,
+                        help='Record finished outputs in this file and skip '
+                        'them when run again, see `cfour_parser status`.')
+    parser.add_argument('--max-attempts', default=3, type=int,
+                        help='With --manifest, attempts at parsing an '
+                        'output before giving up.')
+    args = parser.parse_args(argv)
+    if args.pool == 'thread' and args.jobs > 1 and \
+            getattr(sys, '_is_gil_enabled', lambda: True)():
+        print("Warning! With the GIL enabled threads parse one output at a "
+              "time.", file=sys.stderr)
+    if args.memory_budget is not None:
+        from cfour_parser.schedule import WORKER_MEMORY
+        if args.memory_budget <= args.jobs * WORKER_MEMORY:
+            parser.error(f"--memory-budget has to exceed "
+                         f"{WORKER_MEMORY // 1024**2} MiB per job")
+        if args.read_ahead is not None:
+            parser.error("--read-ahead does not work with --memory-budget")
+    return args
+
+
+def parse_memory_budget(text: str):
+    from cfour_parser.schedule import parse_memory_size
+
+    try:
+        return parse_memory_size(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def parse_shard(text: str):
+    """ Turns 'i/N' into (i, N). """
+    try:
+        index, count = (int(number) for number in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got '{text}'")
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"expected 1 <= i <= N, got "
+                                         f"'{text}'")
+    return index, count
+
+
+def source_shard(source, count: int):
+    """
+    The share (1 to `count`) of `source`, the same on every machine. Sources
+    found in input directories are known by their 'name' relative to the
+    directory, the others by their path relative to the current directory.
+    Records keep the 'name' of their source, so they fall into the same
+    share.
+    """
+    name = source.get('name')
+    if name is None:
+        name = os.path.relpath(source['path'])
+    key = f"{name}\0{source['member'] or ''}".encode()
+    digest = hashlib.sha1(key).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def select_shard(sources, shard=None):
+    """ Yields the `sources` in the share `shard` = (i, N), all if None. """
+    for source in sources:
+        if shard is None or source_shard(source, shard[1]) == shard[0]:
+            yield source
+
+
+def select_sources(sources, shard=None, keep=None):
+    """
+    Yields the `sources` in the `shard` for which `keep(source)` is True
+    (all if `keep` is None).
+    """
+    for source in select_shard(sources, shard):
+        if keep is None or keep(source):
+            yield source
+
+
+def collect_sources(inputs, pattern: str = DEFAULT_PATTERN):
+    """
+    Turns the command line inputs into a list of sources. A source is
+    a dictionary with the keys 'path', 'member', 'kind', and 'size' (see
+    `cfour_parser.archive.list_archive_members`). Plain files have 'kind'
+    equal to 'file' and 'member' equal to None. Compressed tars are
+    represented by a single source of 'kind' 'streamed tar' and no 'member';
+    they are expanded while the batch runs. Files found in directories have
+    their path relative to the directory under 'name', see `source_shard`.
+    """
+    sources = list()
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if matches_pattern(name, pattern):
+                        source = file_source(os.path.join(root, name))
+                        source['name'] = os.path.relpath(source['path'], path)
+                        sources += [source]
+            continue
+
+        kind = archive_kind(path)
+        if kind in ('tar', 'zip'):
+            sources += list_archive_members(path, pattern)
+        elif kind == 'streamed tar':
+            sources += [{
+                'path': path,
+                'member': None,
+                'kind': kind,
+                'size': os.path.getsize(path),
+            }]
+        else:
+            sources += [file_source(path)]
+
+    return sources
+
+
+def file_source(path):
+    return {
+        'path': path,
+        'member': None,
+        'kind': 'file',
+        'size': os.path.getsize(path),
+    }
+
+
+def expand_sources(sources, pattern: str = DEFAULT_PATTERN):
+    """
+    Yields sources one by one, reading the members of compressed tars on the
+    way.
+    """
+    for source in sources:
+        if source['kind'] == 'streamed tar' and source['member'] is None:
+            yield from stream_archive_members(source['path'], pattern)
+        else:
+            yield source
+
+
+def read_source(source):
+    """ Returns the content of `source` as (possibly compressed) bytes. """
+    if 'data' in source:
+        return source['data']
+    if source['kind'] == 'file':
+        with open(source['path'], 'rb') as cfour_output:
+            return cfour_output.read()
+    return read_archive_member(source)
+
+
+def load_source(source):
+    """ Returns the uncompressed content of `source` as bytes. """
+    data = read_source(source)
+    if detect_compression(data[:8]) is None:
+        return data
+    with open_input(io.BytesIO(data), 'rb') as stream:
+        return stream.read()
+
+
+def parse_source(source):
+    """
+    Reads and parses one source. Returns the record written to the output.
+    """
+    record = {
+        'path': source['path'],
+        'member': source['member'],
+    }
+    if 'name' in source:
+        record['name'] = source['name']
+    with collect_diagnostics() as diagnostics:
+        try:
+            data = load_source(source)
+            record['sha256'] = hashlib.sha256(data).hexdigest()
+            cfour_output = io.TextIOWrapper(io.BytesIO(data))
+            record['programs'] = parse_programs(find_programs(cfour_output))
+        except Exception as error:
+            record['error'] = f'{type(error).__name__}: {error}'
+    if len(diagnostics) > 0:
+        record['warnings'] = diagnostics
+
+    return record
+
+
+def print_warnings(record):
+    """ Prints the warnings of the parsers collected in `record`. """
+    for warning in record.get('warnings', []):
+        print(f"Warning in parsing {record['path']}"
+              f" {record['member'] or ''}: {warning}", file=sys.stderr)
+
+
+def export_source(source):
+    """
+    Parses one source into the columnar tables of `cfour_parser.export`, as
+    run 0. Returns the record with the arrays passed by
+    `cfour_parser.sharedmem.share_arrays` under 'tables' instead of the
+    programs.
+    """
+    from cfour_parser.export import add_run, collect_tables, table_arrays
+    from cfour_parser.sharedmem import share_arrays
+
+    record = parse_source(source)
+    if 'error' in record:
+        return record
+    tables = collect_tables(record.pop('programs'))
+    add_run(tables, 0, record['path'], record['member'], record['sha256'])
+    record['tables'] = share_arrays(table_arrays(tables))
+    return record
+
+
+class ReadAhead:
+    """
+    Bytes of the sources read ahead, counted from when they are read until
+    they are parsed, and their `limit`.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.n_bytes = 0
+
+    def is_full(self):
+        return self.n_bytes >= self.limit
+
+    def parsed(self, source):
+        """ Stops counting the content of `source`. """
+        self.n_bytes -= source['size']
+
+
+def prefetch_sources(sources, read_ahead, threads: int = 4):
+    """
+    Yields the `sources` in order with their content under 'data'. The
+    contents are read by `threads` threads while the `ReadAhead`
+    `read_ahead` is not full; the consumer calls its `parsed` once done
+    with a source.
+    """
+    def prefetch(source):
+        if 'data' in source:
+            return source
+        return dict(source, data=read_source(source))
+
+    with concurrent.futures.ThreadPoolExecutor(threads) as pool:
+        in_flight = collections.deque()
+        for source in sources:
+            in_flight.append(pool.submit(prefetch, source))
+            read_ahead.n_bytes += source['size']
+            while read_ahead.is_full() and len(in_flight) > 0:
+                yield in_flight.popleft().result()
+        while len(in_flight) > 0:
+            yield in_flight.popleft().result()
+
+
+def map_in_order(executor, function, sources, window: int, read_ahead=None):
+    """
+    Yields `function(source)` of the `sources` in order, computed by the
+    `executor`. At most `window` sources are in flight, so that the content
+    of the streamed members does not pile up in memory. Sources of
+    `prefetch_sources` are also held back while the `ReadAhead`
+    `read_ahead` is full.
+    """
+    def wait_oldest():
+        source, future = in_flight.popleft()
+        result = future.result()
+        if read_ahead is not None:
+            read_ahead.parsed(source)
+        return result
+
+    in_flight = collections.deque()
+    for source in sources:
+        in_flight.append((source, executor.submit(function, source)))
+        while len(in_flight) >= window or (read_ahead is not None and
+                                           read_ahead.is_full() and
+                                           len(in_flight) > 0):
+            yield wait_oldest()
+    while len(in_flight) > 0:
+        yield wait_oldest()
+
+
+def make_pool(jobs: int, pool: str = 'process'):
+    """ An executor with `jobs` workers, processes or threads. """
+    if pool == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(jobs)
+    return concurrent.futures.ProcessPoolExecutor(jobs)
+
+
+def run_batch(sources, jobs: int = 1, pattern: str = DEFAULT_PATTERN,
+              shard=None, memory_budget=None, keep=None, read_ahead=None,
+              read_threads: int = 4, pool: str = 'process',
+              parse=parse_source):
+    """
+    Parses the `sources` with `jobs` processes and yields the records in the
+    order of the sources. Workers read their sources themselves, except for
+    members of compressed tars which are read here and sent over. With
+    `shard` = (i, N) only the i-th share of the sources is parsed, and of
+    those only the ones for which `keep(source)` is True. With a
+    `memory_budget` in bytes the sources are scheduled by
+    `cfour_parser.schedule.run_budgeted` instead, and the records come in the
+    order in which the sources finish. With `read_ahead` in bytes the
+    sources are read by `read_threads` threads ahead of the parsing, see
+    `prefetch_sources`; the bytes read count until their sources are parsed,
+    so they also bound the sources waiting for a worker. `pool` is either
+    'process' or 'thread', see `make_pool`. The records are made by `parse`,
+    e.g., `export_source`.
+    """
+    if memory_budget is not None and jobs > 1:
+        from cfour_parser.schedule import run_budgeted
+        yield from run_budgeted(sources, jobs, memory_budget, pattern, shard,
+                                keep, pool, parse)
+        return
+
+    sources = select_sources(expand_sources(sources, pattern), shard, keep)
+    if read_ahead is not None:
+        read_ahead = ReadAhead(read_ahead)
+        sources = prefetch_sources(sources, read_ahead, read_threads)
+    if jobs == 1:
+        for source in sources:
+            record = parse(source)
+            if read_ahead is not None:
+                read_ahead.parsed(source)
+            yield record
+        return
+
+    with make_pool(jobs, pool) as executor:
+        yield from map_in_order(executor, parse, sources, 4 * jobs,
+                                read_ahead)
+
+
+def is_ndjson(path):
+    """ True if `path` looks like an NDJSON file, possibly compressed. """
+    from cfour_parser.compression import EXTENSIONS
+
+    name = str(path)
+    for extension in EXTENSIONS:
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    return name.endswith(('.ndjson', '.jsonl'))
+
+
+def read_records(path):
+    """ Yields the records of an NDJSON file written by `main`. """
+    with open_input(path) as records:
+        for line in records:
+            if line.strip() != '':
+                yield json.loads(line)
+
+
+def export_batch(records, directory, export_format):
+    """
+    Exports `records` as columnar tables (see `cfour_parser.export`). The
+    outputs are told apart by the 'run' column. Returns the number of
+    records with errors.
+    """
+    from cfour_parser.export import add_run, collect_tables, empty_tables, \
+        write_tables
+
+    tables = empty_tables()
+    n_failed = 0
+    run = 0
+    for record in records:
+        print_warnings(record)
+        if 'error' in record:
+            n_failed += 1
+            print(f"Error in parsing {record['path']}"
+                  f" {record['member'] or ''}: {record['error']}",
+                  file=sys.stderr)
+            continue
+        add_run(tables, run, record['path'], record['member'],
+                record['sha256'])
+        collect_tables(record['programs'], tables, run)
+        run += 1
+
+    write_tables(tables, directory, export_format)
+    return n_failed
+
+
+def number_run(arrays, run: int, n_states: int):
+    """
+    Sets the `run` of the tables `arrays` of one output and numbers its EOM
+    states on from the `n_states` of the previous runs. Returns the number
+    of states including this run's.
+    """
+    for columns in arrays.values():
+        columns['run'][:] = run
+    for table in ('eom_states', 'eom_amplitudes'):
+        if table in arrays:
+            arrays[table]['state'] += n_states
+    if 'eom_states' in arrays:
+        n_states += len(arrays['eom_states']['state'])
+    return n_states
+
+
+def export_shared(records, directory, export_format):
+    """
+    `export_batch` of the records of `export_source`. The arrays of each
+    record are copied from the worker's shared memory into the tables of
+    the export as the record arrives and the block is freed right away, so
+    only the blocks of the records in flight take up shared memory. Has to
+    be called before the workers start.
+    """
+    from multiprocessing import resource_tracker
+    from cfour_parser.export import write_arrays
+    from cfour_parser.sharedmem import GrowingTables, SharedArrays
+
+    # Shared with the workers, so that blocks left behind by a crash are
+    # unlinked when the run ends
+    resource_tracker.ensure_running()
+    n_failed = 0
+    run = 0
+    n_states = 0
+    tables = GrowingTables()
+    for record in records:
+        print_warnings(record)
+        if 'error' in record:
+            n_failed += 1
+            print(f"Error in parsing {record['path']}"
+                  f" {record['member'] or ''}: {record['error']}",
+                  file=sys.stderr)
+            continue
+        # The block is the worker's last copy, so it is numbered in place
+        with SharedArrays(record['tables']) as shared:
+            n_states = number_run(shared.arrays, run, n_states)
+            tables.append(shared.arrays)
+        run += 1
+
+    write_arrays(tables.arrays(), directory, export_format)
+    return n_failed
+
+
+def batch_records(sources, args, keep=None, parse=parse_source):
+    """ `run_batch` with the options of the command line `args`. """
+    return run_batch(sources, args.jobs, args.pattern, args.shard,
+                     args.memory_budget, keep, args.read_ahead,
+                     args.read_threads, args.pool, parse)
+
+
+def write_checkpointed(sources, args):
+    """
+    Appends the records of the outputs not yet done according to the
+    manifest (see `cfour_parser.manifest`) to the NDJSON output. Failed
+    outputs are only written to the manifest. Returns the number of
+    outputs which failed in the end.
+    """
+    from cfour_parser.manifest import Manifest, truncate_partial_line
+
+    manifest = Manifest(args.manifest, args.output, args.max_attempts)
+    truncate_partial_line(args.output)
+    with open(args.output, 'a') as output:
+        while manifest.start_pass():
+            for record in batch_records(sources, args, manifest.is_pending):
+                if 'error' in record:
+                    print(f"Error in parsing {record['path']}"
+                          f" {record['member'] or ''}: {record['error']}",
+                          file=sys.stderr)
+                else:
+                    output.write(json.dumps(record) + '\n')
+                manifest.add(record)
+                if manifest.is_due():
+                    output.flush()
+                    os.fsync(output.fileno())
+                    manifest.commit()
+            output.flush()
+            os.fsync(output.fileno())
+            manifest.commit()
+    return len(manifest.failed())
+
+
+def main(argv=None):
+    args = get_args(argv)
+    sources = collect_sources(args.inputs, args.pattern)
+
+    if args.manifest is not None:
+        if args.export is not None or args.output is None or \
+                compression_from_name(args.output) is not None:
+            raise SystemExit("Error: --manifest requires -o with an "
+                             "uncompressed NDJSON file.")
+        n_failed = write_checkpointed(sources, args)
+        if n_failed > 0:
+            print(f"Warning! {n_failed} outputs failed to parse.",
+                  file=sys.stderr)
+        return
+
+    if args.export is not None:
+        if args.output is None:
+            raise SystemExit("Error: --export requires -o DIRECTORY.")
+        if args.jobs > 1 and args.pool == 'process':
+            records = batch_records(sources, args, parse=export_source)
+            n_failed = export_shared(records, args.output, args.export)
+        else:
+            records = batch_records(sources, args)
+            n_failed = export_batch(records, args.output, args.export)
+        if n_failed > 0:
+            print(f"Warning! {n_failed} outputs failed to parse.",
+                  file=sys.stderr)
+        return
+
+    if args.output is None:
+        output = sys.stdout
+    else:
+        output = open_output(args.output)
+
+    n_failed = 0
+    try:
+        for record in batch_records(sources, args):
+            if 'error' in record:
+                n_failed += 1
+                print(f"Error in parsing {record['path']}"
+                      f" {record['member'] or ''}: {record['error']}",
+                      file=sys.stderr)
+            output.write(json.dumps(record) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if n_failed > 0:
+        print(f"Warning! {n_failed} outputs failed to parse.",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Transparent reading and writing of compressed files.
+
+Inputs are recognized by their magic bytes, so the name of the file does not
+matter. Outputs are compressed according to the extension of their name.
+Both are streamed; no uncompressed copy is ever written to disk.
+
+gzip, bzip2 and xz work out of the box, zstd requires the `zstandard`
+package.
+"""
+
+import io
+
+MAGIC_BYTES = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'(\xb5/\xfd', 'zstd'),
+    (b'BZh', 'bz2'),
+)
+
+# Files are read in blocks of this size, which pays off on network
+# filesystems
+READ_BUFFER_SIZE = 1 << 20
+
+EXTENSIONS = {
+    '.gz': 'gzip',
+    '.xz': 'xz',
+    '.zst': 'zstd',
+    '.bz2': 'bz2',
+}
+
+
+def detect_compression(head: bytes):
+    """
+    Returns the name of the compression format which starts with the bytes
+    `head` or None if `head` does not look compressed.
+    """
+    for magic, name in MAGIC_BYTES:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def compression_from_name(path):
+    """ Returns the compression format implied by the extension of `path`. """
+    for extension, name in EXTENSIONS.items():
+        if str(path).endswith(extension):
+            return name
+    return None
+
+
+def import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Reading or writing zstd files requires the "
+                           "'zstandard' package.") from None
+    return zstandard
+
+
+def decompressing_stream(raw, compression):
+    """ Wraps the binary stream `raw` in a decompressing binary stream. """
+    if compression is None:
+        return raw
+    if compression == 'gzip':
+        import gzip
+        return gzip.GzipFile(fileobj=raw, mode='rb')
+    if compression == 'xz':
+        import lzma
+        return lzma.LZMAFile(raw, mode='rb')
+    if compression == 'bz2':
+        import bz2
+        return bz2.BZ2File(raw, mode='rb')
+    if compression == 'zstd':
+        zstandard = import_zstandard()
+        reader = zstandard.ZstdDecompressor().stream_reader(raw,
+                                                            closefd=True)
+        return io.BufferedReader(reader)
+    raise ValueError(f"Unknown compression '{compression}'.")
+
+
+def compressing_stream(raw, compression):
+    """ Wraps the binary stream `raw` in a compressing binary stream. """
+    if compression is None:
+        return raw
+    if compression == 'gzip':
+        import gzip
+        return gzip.GzipFile(fileobj=raw, mode='wb')
+    if compression == 'xz':
+        import lzma
+        return lzma.LZMAFile(raw, mode='wb')
+    if compression == 'bz2':
+        import bz2
+        return bz2.BZ2File(raw, mode='wb')
+    if compression == 'zstd':
+        zstandard = import_zstandard()
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    raise ValueError(f"Unknown compression '{compression}'.")
+
+
+def open_input(source, mode: str = 'rt'):
+    """
+    Opens `source`, a path or a binary file object, for reading and
+    decompresses it on the fly if needed. `mode` is either 'rt' or 'rb'.
+    """
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        raw = open(source, 'rb', buffering=READ_BUFFER_SIZE)
+    else:
+        raw = source
+
+    if not hasattr(raw, 'peek'):
+        raw = io.BufferedReader(raw)
+
+    stream = decompressing_stream(raw, detect_compression(raw.peek(8)))
+    if stream is not raw:
+        # GzipFile, LZMAFile, and BZ2File leave the file underneath open
+        stream = io.BufferedReader(ClosingStream(stream, raw))
+
+    if mode == 'rb':
+        return stream
+    return io.TextIOWrapper(stream)
+
+
+def open_output(path, mode: str = 'wt'):
+    """
+    Opens `path` for writing. The output is compressed if the name of the
+    file ends with one of the known extensions. `mode` is either 'wt' or
+    'wb'.
+    """
+    raw = open(path, 'wb')
+    stream = compressing_stream(raw, compression_from_name(path))
+    if stream is not raw:
+        stream = io.BufferedWriter(ClosingStream(stream, raw))
+
+    if mode == 'wb':
+        return stream
+    return io.TextIOWrapper(stream)
+
+
+class ClosingStream(io.RawIOBase):
+    """
+    A binary stream which closes also the file underneath the (de)compressor
+    when closed.
+    """
+
+    def __init__(self, stream, raw):
+        self.stream = stream
+        self.raw = raw
+
+    def readable(self):
+        return self.stream.readable()
+
+    def writable(self):
+        return self.stream.writable()
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+            self.stream.close()
+        finally:
+            self.raw.close()
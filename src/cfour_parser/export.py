@@ -0,0 +1,305 @@
+"""
+Columnar export of parsed CFOUR outputs.
+
+The nested results of the parsers are flattened into tables of typed
+columns which load into NumPy or pandas without any parsing
+    runs                        paths of the exported outputs
+    mos                         orbital energies and symmetries of the SCF
+    geometry                    QCOMP geometry
+    cartesian_gradient          xjoda's gradient vector
+    normal_coordinates          displacement of each atom in each mode
+    normal_coordinate_gradient  gradient along the normal modes
+    eom_states                  xncc's EOM states
+    eom_amplitudes              singles and doubles of xncc's EOM states
+    spectrum                    xsim's spectrum
+A table is written as
+    npz      DIR/<table>.npz, one array per column
+    npy      DIR/<table>/<column>.npy, ready for `np.load(mmap_mode='r')`
+    parquet  DIR/<table>.parquet
+next to DIR/manifest.json which lists the tables, their columns, types and
+lengths. NumPy is required for npz and npy, pyarrow for parquet.
+"""
+
+import json
+import os
+from cfour_parser.util import find_sections
+
+FORMATS = ('npz', 'npy', 'parquet')
+
+# Columns of every table and their NumPy types. Missing integers are stored
+# as -1 and missing floats as NaN.
+TABLES = {
+    'runs': (('run', 'i8'), ('path', 'U'), ('member', 'U'), ('sha256', 'U')),
+    'mos': (('run', 'i8'), ('program_idx', 'i8'), ('program', 'U'),
+            ('occupied', '?'), ('energy_no', 'i8'), ('mo_no', 'i8'),
+            ('energy_au', 'f8'), ('energy_ev', 'f8'), ('irrep', 'U'),
+            ('irrep_no', 'i8'), ('fullsymm', 'U')),
+    'geometry': (('run', 'i8'), ('program_idx', 'i8'), ('atom', 'i8'),
+                 ('symbol', 'U'), ('atomic_number', 'i8'), ('x', 'f8'),
+                 ('y', 'f8'), ('z', 'f8')),
+    'cartesian_gradient': (('run', 'i8'), ('program_idx', 'i8'),
+                           ('atom', 'i8'), ('x', 'f8'), ('y', 'f8'),
+                           ('z', 'f8')),
+    'normal_coordinates': (('run', 'i8'), ('program_idx', 'i8'),
+                           ('mode', 'i8'), ('symmetry', 'U'),
+                           ('frequency_cm', 'f8'), ('kind', 'U'),
+                           ('atom', 'i8'), ('symbol', 'U'), ('x', 'f8'),
+                           ('y', 'f8'), ('z', 'f8')),
+    'normal_coordinate_gradient': (('run', 'i8'), ('program_idx', 'i8'),
+                                   ('mode', 'i8'), ('omega', 'f8'),
+                                   ('de_dq_au', 'f8'), ('de_dq_cm', 'f8'),
+                                   ('de_dq_ev', 'f8'), ('ratio', 'f8')),
+    'eom_states': (('run', 'i8'), ('program_idx', 'i8'), ('state', 'i8'),
+                   ('model', 'U'), ('irrep', 'i8'), ('root', 'i8'),
+                   ('excitation_au', 'f8'), ('excitation_ev', 'f8'),
+                   ('total_au', 'f8')),
+    'eom_amplitudes': (('run', 'i8'), ('program_idx', 'i8'), ('state', 'i8'),
+                       ('rank', 'i8'), ('a', 'i8'), ('b', 'i8'), ('i', 'i8'),
+                       ('j', 'i8'), ('amplitude', 'f8')),
+    'spectrum': (('run', 'i8'), ('energy_ev', 'f8'), ('energy_cm', 'f8'),
+                 ('offset_cm', 'f8'), ('relative_intensity', 'f8')),
+}
+
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("Exporting npz or npy requires the 'numpy' "
+                           "package.") from None
+    return numpy
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Exporting parquet requires the 'pyarrow' "
+                           "package.") from None
+    return pyarrow
+
+
+def empty_tables():
+    """ Returns {table: {column: list()}} for all `TABLES`. """
+    return {table: {column: list() for column, _ in columns}
+            for table, columns in TABLES.items()}
+
+
+def add_row(tables, table, *row):
+    for (column, _), value in zip(TABLES[table], row):
+        tables[table][column] += [value]
+
+
+def add_run(tables, run: int, path, member=None, sha256=None):
+    """ Describes the output number `run` in the 'runs' table. """
+    add_row(tables, 'runs', run, str(path), member, sha256)
+
+
+def collect_xjoda(tables, run, idx, xjoda):
+    for qcomp in find_sections(xjoda, 'qcomp'):
+        for atom, entry in enumerate(qcomp['data'].get('geometry a.u.', [])):
+            add_row(tables, 'geometry', run, idx, atom,
+                    entry['Z-matrix Symbol'], entry['Atomic Number'],
+                    *entry['Coordinates'])
+
+    for gradient in find_sections(xjoda, 'cartesian gradient'):
+        for atom, xyz in enumerate(gradient['data'].get('Cartesian Gradient',
+                                                        [])):
+            add_row(tables, 'cartesian_gradient', run, idx, atom, xyz['x'],
+                    xyz['y'], xyz['z'])
+
+    for section in find_sections(xjoda, 'normal coordinates'):
+        modes = section['data'].get('normal coordinates', [])
+        for mode_no, mode in enumerate(modes):
+            for atom, xyz in enumerate(mode['coordinate']):
+                add_row(tables, 'normal_coordinates', run, idx, mode_no,
+                        mode['symmetry'], mode['frequency, cm-1'],
+                        mode['kind'], atom, xyz['atomic symbol'], xyz['x'],
+                        xyz['y'], xyz['z'])
+
+    for section in find_sections(xjoda, 'normal coordinate gradient'):
+        for mode in section['data'].get('Normal Coordinate Gradient', []):
+            add_row(tables, 'normal_coordinate_gradient', run, idx,
+                    mode['mode #'], mode['omega'], mode['dE/dQ, a.u.'],
+                    mode['dE/dQ, cm-1'], mode['dE/dQ, eV'],
+                    mode['dE/dQ/omega, relative'])
+
+
+def collect_scf(tables, run, idx, scf):
+    for mos in find_sections(scf, 'MOs'):
+        for occupied in (True, False):
+            key = 'occupied' if occupied else 'virtual'
+            for mo in mos['data'][key]:
+                add_row(tables, 'mos', run, idx, scf['name'], occupied,
+                        mo['ids']['energy #'], mo['ids']['#'],
+                        mo['E']['au'], mo['E']['eV'], mo['compsymm']['name'],
+                        mo['compsymm']['#'], mo['fullsymm'])
+
+
+def collect_xncc(tables, run, idx, xncc):
+    state = len(tables['eom_states']['state'])
+    for irrep in find_sections(xncc, 'irrep'):
+        for root_no, root in enumerate(irrep['sections']):
+            energy = dict()
+            for section in find_sections(root, 'EOM energy'):
+                energy = section['data']
+            excitation = energy.get('excitation', dict())
+            add_row(tables, 'eom_states', run, idx, state,
+                    root['data']['model'], irrep['data']['#'], root_no,
+                    excitation.get('au'), excitation.get('eV'),
+                    energy.get('total', dict()).get('au'))
+
+            for converged in find_sections(root, 'converged root'):
+                amplitudes = converged.get('data', dict())
+                for single in amplitudes.get('singles', []):
+                    add_row(tables, 'eom_amplitudes', run, idx, state, 1,
+                            single['A'], -1, single['I'], -1,
+                            single['amplitude'])
+                for double in amplitudes.get('doubles', []):
+                    add_row(tables, 'eom_amplitudes', run, idx, state, 2,
+                            double['A'], double['B'], double['I'],
+                            double['J'], double['amplitude'])
+            state += 1
+
+
+def collect_tables(programs, tables=None, run: int = 0):
+    """
+    Appends rows describing the parsed `programs` to `tables` (new ones if
+    None) and returns them. `run` tells apart outputs exported together.
+    """
+    if tables is None:
+        tables = empty_tables()
+
+    for idx, program in enumerate(programs):
+        if program['name'] == 'xjoda':
+            collect_xjoda(tables, run, idx, program)
+        elif program['name'] in ('xvscf', 'xdqcscf'):
+            collect_scf(tables, run, idx, program)
+        elif program['name'] == 'xncc':
+            collect_xncc(tables, run, idx, program)
+
+    return tables
+
+
+def collect_xsim_tables(xsim_data, tables=None, run: int = 0):
+    """ `collect_tables` for the output of `xsim.parse_xsim_output`. """
+    if tables is None:
+        tables = empty_tables()
+
+    for line in xsim_data['spectrum_data']:
+        add_row(tables, 'spectrum', run, line['Energy (eV)'],
+                line['Energy (cm-1)'], line['Offset (cm-1)'],
+                line['Relative intensity'])
+    return tables
+
+
+def to_numpy_column(values, dtype):
+    """ Turns a list into a typed NumPy array, filling in the None's. """
+    numpy = import_numpy()
+    if dtype == 'f8':
+        values = [numpy.nan if value is None else value for value in values]
+    elif dtype == 'i8':
+        values = [-1 if value is None else value for value in values]
+    elif dtype == 'U':
+        values = ['' if value is None else value for value in values]
+        if len(values) == 0:
+            return numpy.array(values, dtype='U1')
+    return numpy.array(values, dtype=dtype)
+
+
+def write_tables(tables, directory, export_format: str = 'npz'):
+    """
+    Writes the non-empty `tables` into `directory` in the `export_format`
+    (see `FORMATS`) together with the manifest. Returns the manifest.
+    """
+    return write_arrays(table_arrays(tables), directory, export_format)
+
+
+def table_arrays(tables):
+    """ Turns the non-empty `tables` into {table: {column: NumPy array}}. """
+    arrays = dict()
+    for table, columns in tables.items():
+        if len(next(iter(columns.values()))) == 0:
+            continue
+        dtypes = dict(TABLES[table])
+        arrays[table] = {column: to_numpy_column(values, dtypes[column]) for
+                         column, values in columns.items()}
+    return arrays
+
+
+def write_arrays(arrays, directory, export_format: str = 'npz'):
+    """
+    Writes {table: {column: NumPy array}} like `write_tables`; empty tables
+    are left out.
+    """
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'.")
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = {
+        'format': export_format,
+        'tables': dict(),
+    }
+    for table, columns in arrays.items():
+        length = len(next(iter(columns.values())))
+        if length == 0:
+            continue
+
+        if export_format == 'parquet':
+            pyarrow = import_pyarrow()
+            path = os.path.join(directory, f'{table}.parquet')
+            pyarrow.parquet.write_table(pyarrow.table(columns), path)
+        elif export_format == 'npz':
+            numpy = import_numpy()
+            path = os.path.join(directory, f'{table}.npz')
+            numpy.savez(path, **columns)
+        else:
+            numpy = import_numpy()
+            path = os.path.join(directory, table)
+            os.makedirs(path, exist_ok=True)
+            for column, array in columns.items():
+                numpy.save(os.path.join(path, f'{column}.npy'), array)
+
+        manifest['tables'][table] = {
+            'path': os.path.relpath(path, directory),
+            'length': length,
+            'columns': {column: str(array.dtype) for column, array in
+                        columns.items()},
+        }
+
+    with open(os.path.join(directory, 'manifest.json'), 'w') as output:
+        json.dump(manifest, output, indent=2)
+
+    return manifest
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, 'manifest.json')) as manifest:
+        return json.load(manifest)
+
+
+def read_tables(directory):
+    """ Reads an export of `write_tables` as {table: {column: array}}. """
+    manifest = read_manifest(directory)
+    export_format = manifest['format']
+    arrays = dict()
+    for table, description in manifest['tables'].items():
+        path = os.path.join(directory, description['path'])
+        if export_format == 'parquet':
+            pyarrow = import_pyarrow()
+            data = pyarrow.parquet.read_table(path)
+            arrays[table] = {
+                column: data.column(column).to_numpy(zero_copy_only=False)
+                for column in description['columns']}
+        elif export_format == 'npz':
+            numpy = import_numpy()
+            with numpy.load(path) as data:
+                arrays[table] = {column: data[column] for column in
+                                 description['columns']}
+        else:
+            numpy = import_numpy()
+            arrays[table] = {
+                column: numpy.load(os.path.join(path, f'{column}.npy'))
+                for column in description['columns']}
+    return arrays
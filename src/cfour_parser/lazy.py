@@ -0,0 +1,213 @@
+"""
+Lazy, random-access view of a CFOUR output.
+
+```python
+import cfour_parser
+out = cfour_parser.open('pyrazine.c4')
+out.programs['xncc'][-1].eom.irreps[3].roots[0].energy
+```
+Every level is split out of its parent and parsed only when it is first
+accessed, and the result is kept on the object. Looking at one EOM root does
+not parse any other root.
+"""
+
+from functools import cached_property
+from cfour_parser.compression import open_input
+from cfour_parser.programs import find_programs
+from cfour_parser.registry import get_program_parser, job_context
+
+
+class LazyOutput:
+    """ A CFOUR output; nothing is read before it is needed. """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.path!r})"
+
+    @cached_property
+    def program_list(self):
+        """ All programs in chronological order. """
+        with open_input(self.path) as cfour_output:
+            programs = find_programs(cfour_output)
+        return [lazy_program(program, programs) for program in programs]
+
+    @cached_property
+    def programs(self):
+        """ {program name: list of its runs in chronological order} """
+        programs = dict()
+        for program in self.program_list:
+            programs.setdefault(program.name, []).append(program)
+        return programs
+
+
+class LazyProgram:
+    """
+    A program of the output, parsed with its registered parser. `job` are
+    all programs of the output, see `cfour_parser.registry.job_context`.
+    """
+
+    def __init__(self, program, job=None):
+        self.program = program
+        self.job = [program] if job is None else job
+
+    def __repr__(self):
+        return (f"<{type(self).__name__} {self.name} lines {self.start}-"
+                f"{self.end}>")
+
+    @property
+    def name(self):
+        return self.program['name']
+
+    @property
+    def start(self):
+        return self.program['start']
+
+    @property
+    def end(self):
+        return self.program['end']
+
+    @property
+    def lines(self):
+        return self.program['lines']
+
+    @cached_property
+    def parsed(self):
+        """ The program's dictionary after running its parser. """
+        parse_program = get_program_parser(self.name)
+        if parse_program is not None:
+            with job_context(self.job):
+                parse_program(self.program)
+        return self.program
+
+    @property
+    def sections(self):
+        return self.parsed['sections']
+
+    @property
+    def data(self):
+        return self.parsed['data']
+
+
+class LazyXncc(LazyProgram):
+    """ xncc with its CC and EOM parts parsed separately. """
+
+    @cached_property
+    def catches(self):
+        from cfour_parser.xncc import cool_lines_in_xncc
+        return cool_lines_in_xncc(self.program)
+
+    @cached_property
+    def cc(self):
+        """ The CC section, see `cfour_parser.xncc.parse_xncc_cc`. """
+        from cfour_parser.xncc import get_cc_lines_from_xncc, job_cc_conv, \
+            parse_xncc_cc
+        cc_section = get_cc_lines_from_xncc(self.program, self.catches)
+        if cc_section is not None:
+            parse_xncc_cc(cc_section, job_cc_conv(self.job, self.program))
+        return cc_section
+
+    @cached_property
+    def eom(self):
+        from cfour_parser.xncc import get_eom_lines_from_xncc
+        eom_section = get_eom_lines_from_xncc(self.program, self.catches)
+        if eom_section is None:
+            return None
+        return LazyXnccEom(eom_section)
+
+
+class LazyXnccEom:
+    """ The EOM part of xncc split into irreps. """
+
+    def __init__(self, section):
+        self.section = section
+
+    @cached_property
+    def irreps(self):
+        """ {irrep number: LazyXnccEomIrrep} """
+        from cfour_parser.xncc import find_xncc_eom_irreps
+        irreps = dict()
+        for irrep_start in find_xncc_eom_irreps(self.section):
+            irrep = LazyXnccEomIrrep(self.section, irrep_start)
+            irreps[irrep.number] = irrep
+        return irreps
+
+
+class LazyXnccEomIrrep:
+    """ One irrep of xncc's EOM split into roots. """
+
+    def __init__(self, eom_section, irrep_start):
+        self.number = int(irrep_start['match'].group(2))
+        self.n_roots = int(irrep_start['match'].group(1))
+        self.start = eom_section['start'] + irrep_start['line']
+        self.lines = eom_section['lines'][irrep_start['line']:
+                                          irrep_start['end']]
+
+    def __repr__(self):
+        return f"<{type(self).__name__} #{self.number}>"
+
+    @cached_property
+    def roots(self):
+        from cfour_parser.xncc import find_xncc_eom_irrep_roots
+        roots = []
+        for root_start, root_end in find_xncc_eom_irrep_roots(self.lines):
+            roots += [LazyXnccEomRoot(self.lines[root_start:root_end],
+                                      self.start + root_start)]
+        return roots
+
+
+class LazyXnccEomRoot:
+    """ One root of xncc's EOM, parsed on the first access. """
+
+    def __init__(self, lines, start):
+        self.lines = lines
+        self.start = start
+
+    def __repr__(self):
+        return f"<{type(self).__name__} line {self.start}>"
+
+    @cached_property
+    def parsed(self):
+        """ See `cfour_parser.xncc.parse_xncc_eom_root`. """
+        from cfour_parser.xncc import parse_xncc_eom_root
+        return parse_xncc_eom_root(self.lines, self.start)
+
+    def get_section(self, name):
+        for section in self.parsed['sections']:
+            if section['name'] == name:
+                return section
+        return None
+
+    @property
+    def model(self):
+        return self.parsed['data']['model']
+
+    @property
+    def energy(self):
+        """ {'excitation': {'au', 'eV'}, 'total': {'au'}} """
+        return self.get_section('EOM energy')['data']
+
+    @property
+    def iterations(self):
+        """ See `cfour_parser.xncc.parse_xncc_eom_iterative_solution`. """
+        return self.get_section('iterative solution')['data']
+
+    @property
+    def amplitudes(self):
+        """ {'singles': [...], 'doubles': [...]} """
+        return self.get_section('converged root').get('data')
+
+
+LAZY_PROGRAMS = {
+    'xncc': LazyXncc,
+}
+
+
+def lazy_program(program, job=None):
+    """
+    Wraps a program of `find_programs`, one of the programs `job` of an
+    output, in its lazy class.
+    """
+    lazy_class = LAZY_PROGRAMS.get(program['name'], LazyProgram)
+    return lazy_class(program, job)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Checkpoints of long batch runs.
+
+    cfour_parser batch runs/ -o results.ndjson --manifest results.manifest
+    cfour_parser ingest runs/ --db results.sqlite --manifest results.manifest
+    cfour_parser status results.manifest runs/
+
+With `--manifest` every parsed output is appended to the manifest as a line
+    {"path": ..., "member": ..., "size": ..., "mtime_ns": ..., "sha256": ...,
+     "status": "ok" or "error", "attempt": ..., "output": ..., "time": ...}
+once its record is safely in the output, i.e., flushed to the NDJSON file
+or committed to the results store. A run with the same manifest skips the
+outputs which are done and parses the others; the NDJSON output is appended
+to. Outputs which failed are retried, in the same run and in later ones,
+until they failed `--max-attempts` times. An output counts as new again when
+its size changed, or when its modification time (that of the archive for
+members) changed and its content no longer has the recorded SHA-256.
+
+After a crash between writing a record and the manifest the record is
+written again by the next run; `cfour_parser merge` and `ingest` keep it
+once.
+
+`status` summarizes a manifest: outputs done and failed, throughput, and,
+given the inputs of the run, the outputs left and the estimated time to go.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from cfour_parser.archive import DEFAULT_PATTERN
+
+DEFAULT_MAX_ATTEMPTS = 3
+# The NDJSON output of batch is flushed and the manifest written after this
+# many records or seconds
+CHECKPOINT_RECORDS = 64
+CHECKPOINT_SECONDS = 30.0
+# Throughput of the last entries, used for the time to go
+RECENT_ENTRIES = 200
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser status')
+    parser.add_argument('manifest', help='Manifest of a batch run.')
+    parser.add_argument('inputs', nargs='*',
+                        help='Inputs of the run, to count the outputs left.')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help='Glob matching names of CFOUR outputs in '
+                        'directories and archives.')
+    parser.add_argument('--max-attempts', default=DEFAULT_MAX_ATTEMPTS,
+                        type=int,
+                        help='Attempts after which a failed output is given '
+                        'up.')
+    parser.add_argument('-j', '--json', default=False, action='store_true',
+                        help='Write the status as JSON.')
+    args = parser.parse_args(argv)
+    return args
+
+
+def source_key(source):
+    return source['path'], source['member']
+
+
+def source_mtime(source):
+    """ Modification time in ns of the file of `source`. """
+    try:
+        return os.stat(source['path']).st_mtime_ns
+    except OSError:
+        return None
+
+
+def content_sha256(source):
+    """ SHA-256 of the uncompressed content of `source`, as in records. """
+    from cfour_parser.batch import load_source
+
+    try:
+        return hashlib.sha256(load_source(source)).hexdigest()
+    except Exception:
+        return None
+
+
+def read_manifest(path):
+    """
+    Returns the entries of the manifest `path` in order; lines cut short by
+    a crash are left out.
+    """
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path) as manifest:
+        for line in manifest:
+            try:
+                entries += [json.loads(line)]
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def latest_entries(entries):
+    """ Returns {(path, member): last entry}. """
+    return {(entry['path'], entry['member']): entry for entry in entries}
+
+
+class Manifest:
+    """
+    The manifest of a run writing to `output`. Entries of records are
+    buffered by `add` and written by `commit`, which is called once the
+    records are safely in the output.
+    """
+
+    def __init__(self, path, output, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.output = output
+        self.max_attempts = max_attempts
+        self.latest = latest_entries(read_manifest(path))
+        # (size, modification time) of the outputs of this run
+        self.states = dict()
+        self.buffer = []
+        self.committed = time.monotonic()
+        self.n_passes = 0
+        self.n_retryable = 0
+
+    def attempts(self, key, size, mtime):
+        """
+        Failed attempts at the output `key` of the current `size` and
+        modification time `mtime`.
+        """
+        entry = self.latest.get(key)
+        if entry is None or entry['size'] != size or entry['status'] == 'ok':
+            return 0
+        if entry.get('mtime_ns') not in (None, mtime):
+            return 0
+        return entry['attempt']
+
+    def is_unchanged(self, entry, source, mtime):
+        """
+        True if `source` is still the output of `entry`: of the same size and
+        modification time, or, if only the latter changed, of the same
+        content. Entries of outputs which turn out unchanged are renewed
+        with the new modification time.
+        """
+        if entry['size'] != source['size']:
+            return False
+        if entry.get('mtime_ns') is None or entry['mtime_ns'] == mtime:
+            return True
+        if entry.get('sha256') is None or \
+                content_sha256(source) != entry['sha256']:
+            return False
+        entry = dict(entry, mtime_ns=mtime, time=time.time())
+        self.buffer += [entry]
+        self.latest[source_key(source)] = entry
+        return True
+
+    def is_pending(self, source):
+        """ True if `source` still has to be parsed. """
+        key = source_key(source)
+        mtime = source_mtime(source)
+        entry = self.latest.get(key)
+        if entry is not None and self.is_unchanged(entry, source, mtime):
+            if entry['status'] == 'ok':
+                return False
+            if entry['attempt'] >= self.max_attempts:
+                return False
+        self.states[key] = (source['size'], mtime)
+        return True
+
+    def add(self, record):
+        """
+        Buffers the entry of `record`. Records of outputs which did not go
+        through `is_pending`, e.g., read from NDJSON files, are left out.
+        """
+        key = (record['path'], record['member'])
+        if key not in self.states:
+            return
+        size, mtime = self.states[key]
+        status = 'error' if 'error' in record else 'ok'
+        attempt = self.attempts(key, size, mtime) + 1
+        entry = {
+            'path': record['path'],
+            'member': record['member'],
+            'size': size,
+            'mtime_ns': mtime,
+            'sha256': record.get('sha256'),
+            'status': status,
+            'attempt': attempt,
+            'output': self.output,
+            'time': time.time(),
+        }
+        if status == 'error':
+            entry['error'] = record['error']
+            if attempt < self.max_attempts:
+                self.n_retryable += 1
+        self.buffer += [entry]
+        self.latest[key] = entry
+
+    def commit(self):
+        """ Appends the buffered entries to the manifest. """
+        if len(self.buffer) == 0:
+            return
+        with open(self.path, 'a') as manifest:
+            manifest.write(''.join(json.dumps(entry) + '\n' for entry in
+                                   self.buffer))
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        self.buffer = []
+        self.committed = time.monotonic()
+
+    def is_due(self):
+        """ True if enough entries are buffered for a checkpoint. """
+        return len(self.buffer) >= CHECKPOINT_RECORDS or \
+            time.monotonic() - self.committed >= CHECKPOINT_SECONDS
+
+    def failed(self):
+        """ The entries of this run's outputs which failed last time. """
+        return [self.latest[key] for key in self.states if key in self.latest
+                and self.latest[key]['status'] == 'error']
+
+    def start_pass(self):
+        """
+        Starts a pass over the inputs; returns False once the previous pass
+        left nothing to retry.
+        """
+        if self.n_passes > 0 and self.n_retryable == 0:
+            return False
+        self.n_passes += 1
+        self.n_retryable = 0
+        return True
+
+
+def truncate_partial_line(path):
+    """ Cuts a line left unfinished by a crash off the end of `path`. """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as output:
+        size = output.seek(0, 2)
+        position = size
+        block_size = 1 << 16
+        while position > 0:
+            start = max(0, position - block_size)
+            output.seek(start)
+            block = output.read(position - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < size:
+            output.truncate(position)
+
+
+def manifest_status(entries, n_outputs=None,
+                    max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+    """
+    Summarizes the manifest `entries`. `n_outputs` is the number of outputs
+    of the run, if known.
+    """
+    latest = latest_entries(entries)
+    n_ok = sum(entry['status'] == 'ok' for entry in latest.values())
+    n_given_up = sum(entry['status'] == 'error' and
+                     entry['attempt'] >= max_attempts for entry in
+                     latest.values())
+    status = {
+        'done': n_ok,
+        'failed': n_given_up,
+        'retrying': len(latest) - n_ok - n_given_up,
+        'entries': len(entries),
+        'bytes done': sum(entry['size'] or 0 for entry in latest.values()
+                          if entry['status'] == 'ok'),
+        'outputs': sorted(set(str(entry['output']) for entry in entries)),
+    }
+
+    times = [entry['time'] for entry in entries]
+    if len(times) > 1 and times[-1] > times[0]:
+        status['outputs/sec'] = (len(times) - 1) / (times[-1] - times[0])
+        recent = times[-RECENT_ENTRIES:]
+        if len(recent) > 1 and recent[-1] > recent[0]:
+            status['recent outputs/sec'] = (len(recent) - 1) / \
+                (recent[-1] - recent[0])
+        status['last entry, sec ago'] = time.time() - times[-1]
+
+    if n_outputs is not None:
+        status['total'] = n_outputs
+        status['left'] = max(0, n_outputs - n_ok - n_given_up)
+        rate = status.get('recent outputs/sec')
+        if rate is not None:
+            status['eta, sec'] = status['left'] / rate
+    return status
+
+
+def str_status(status):
+    """ The status as text. """
+    lines = []
+    if 'total' in status:
+        done = status['done'] + status['failed']
+        percent = 100.0 * done / status['total'] if status['total'] else 100.0
+        lines += [f"{done} of {status['total']} outputs handled "
+                  f"({percent:.1f}%), {status['left']} left"]
+    lines += [f"done      {status['done']:8d}",
+              f"failed    {status['failed']:8d}",
+              f"retrying  {status['retrying']:8d}",
+              f"MiB done  {status['bytes done'] / 1024**2:8.1f}"]
+    if 'outputs/sec' in status:
+        lines += [f"outputs/sec {status['outputs/sec']:.2f} overall, "
+                  f"{status.get('recent outputs/sec', 0.0):.2f} recently",
+                  f"last entry {status['last entry, sec ago']:.0f} sec ago"]
+    if 'eta, sec' in status:
+        lines += [f"time to go {status['eta, sec'] / 3600:.1f} h"]
+    lines += [f"written to {', '.join(status['outputs'])}"]
+    return '\n'.join(lines) + '\n'
+
+
+def count_outputs(inputs, pattern: str = DEFAULT_PATTERN):
+    """ Number of outputs in `inputs`; compressed tars are read through. """
+    from cfour_parser.archive import stream_archive_members
+    from cfour_parser.batch import collect_sources
+
+    n_outputs = 0
+    for source in collect_sources(inputs, pattern):
+        if source['kind'] == 'streamed tar':
+            n_outputs += sum(1 for _ in stream_archive_members(
+                source['path'], pattern))
+        else:
+            n_outputs += 1
+    return n_outputs
+
+
+def main(argv=None):
+    args = get_args(argv)
+    if not os.path.exists(args.manifest):
+        sys.exit(f"Error: no manifest {args.manifest}.")
+    n_outputs = None
+    if len(args.inputs) > 0:
+        n_outputs = count_outputs(args.inputs, args.pattern)
+    status = manifest_status(read_manifest(args.manifest), n_outputs,
+                             args.max_attempts)
+    if args.json is True:
+        sys.stdout.write(json.dumps(status) + '\n')
+    else:
+        sys.stdout.write(str_status(status))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Memoization of section parsers.
+
+Big blocks of CFOUR outputs, e.g., the control parameters of xjoda, the
+geometry at a reference point, or the MOs of the same SCF, repeat verbatim in
+many outputs of a campaign. `parse_section` remembers what a parser made of a
+section's text and, when the same text comes again, hands out the same
+result instead of parsing it again.
+
+The results are shared between sections and are therefore frozen: dicts
+become `FrozenDict`s and lists `FrozenList`s, whether or not the parser ran.
+Both still serialize to JSON as before. Callers which need to change a
+result `thaw` a copy of it. The `warn`ings of the parser are kept with the
+result and repeated on every hit.
+
+A memoized parser may only fill in the section's 'data' and 'metadata'.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from cfour_parser.util import collect_diagnostics, warn
+
+DEFAULT_CACHE_SIZE = 4096
+
+
+class FrozenDict(dict):
+    """ A dict which refuses to change. """
+
+    def _frozen(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable.")
+
+    __setitem__ = __delitem__ = __ior__ = _frozen
+    clear = pop = popitem = setdefault = update = _frozen
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+
+class FrozenList(tuple):
+    """ A frozen list, told apart from the tuples of a result. """
+
+
+def freeze(value):
+    """ Returns an immutable copy of the dicts and lists in `value`. """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    if isinstance(value, tuple):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """ Returns a mutable copy of a value of `freeze`. """
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, FrozenList):
+        return [thaw(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(thaw(item) for item in value)
+    return value
+
+
+def parser_identity(parse):
+    return f'{parse.__module__}.{parse.__qualname__}'
+
+
+def section_key(parse, section):
+    """ Hash of the parser's name and the section's text. """
+    digest = hashlib.sha1(parser_identity(parse).encode())
+    for line in section['lines']:
+        digest.update(line.encode())
+    return digest.digest()
+
+
+class SectionCache:
+    """
+    Least recently used results of section parsers. Safe to share between
+    threads.
+    """
+
+    def __init__(self, size: int = DEFAULT_CACHE_SIZE):
+        self.size = size
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            result = self.results.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.results.move_to_end(key)
+            return result
+
+    def put(self, key, result):
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.size:
+                self.results.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.results.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+SECTION_CACHE = SectionCache()
+
+
+def parse_section(parse, section, cache: SectionCache = SECTION_CACHE):
+    """
+    Calls `parse(section)` unless a section with the same text went through
+    `parse` before, in which case the earlier 'data' and 'metadata' are put
+    into `section` and the earlier warnings repeated. Either way the values
+    put into `section` are frozen.
+    """
+    key = section_key(parse, section)
+    result = cache.get(key)
+    if result is None:
+        scratch = dict(section)
+        scratch['data'] = dict()
+        scratch['metadata'] = dict(section.get('metadata', dict()))
+        try:
+            with collect_diagnostics() as diagnostics:
+                parse(scratch)
+        except Exception:
+            for message in diagnostics:
+                warn(message)
+            raise
+        result = freeze({
+            'data': scratch['data'],
+            'metadata': scratch['metadata'],
+            'diagnostics': diagnostics,
+        })
+        cache.put(key, result)
+
+    for message in result['diagnostics']:
+        warn(message)
+    section.setdefault('data', dict()).update(result['data'])
+    if len(result['metadata']) > 0:
+        section.setdefault('metadata', dict()).update(result['metadata'])
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Merging the results of sharded batch runs.
+
+    for i in 1 2 3 4; do
+        cfour_parser batch runs/ --shard $i/4 -o shard$i.ndjson &
+    done; wait
+    cfour_parser merge shard*.ndjson -o campaign.ndjson
+
+The shards are given in the order in which they are merged, and all have to
+be of the same kind:
+    NDJSON files of `cfour_parser batch`          merged into an NDJSON file
+    results stores of `cfour_parser ingest`       merged into a results store
+    directories of `cfour_parser batch --export`  merged into a directory in
+                                                  the format of the first one
+Outputs are identified by their SHA-256: an output found in several shards
+is kept once, from the first shard which has it, so merging the same shards
+always gives the same result. Failed records of NDJSON shards are kept
+unless the output was parsed in another shard.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+SQLITE_HEADER = b'SQLite format 3\0'
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser merge')
+    parser.add_argument('shards', nargs='+',
+                        help='NDJSON files, results stores, or export '
+                        'directories.')
+    parser.add_argument('-o', '--output', required=True,
+                        help='The merged NDJSON file, results store, or '
+                        'export directory.')
+    args = parser.parse_args(argv)
+    return args
+
+
+def shard_kind(path):
+    """ 'export', 'store', or 'ndjson'. """
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, 'manifest.json')):
+            raise ValueError(f"{path} is a directory without manifest.json.")
+        return 'export'
+    with open(path, 'rb') as shard:
+        if shard.read(len(SQLITE_HEADER)) == SQLITE_HEADER:
+            return 'store'
+    return 'ndjson'
+
+
+def merge_ndjson(shards, output):
+    """
+    Writes the records of the NDJSON `shards` to the text stream `output`.
+    Returns the number of records written.
+    """
+    from cfour_parser.batch import read_records
+
+    parsed = set()
+    failed = []
+    n_written = 0
+    for shard in shards:
+        for record in read_records(shard):
+            if 'error' in record:
+                failed += [record]
+                continue
+            if record['sha256'] in parsed:
+                continue
+            parsed.add(record['sha256'])
+            output.write(json.dumps(record) + '\n')
+            n_written += 1
+
+    for record in failed:
+        # Failed records may lack the hash if the output could not be read
+        if record.get('sha256') not in parsed:
+            output.write(json.dumps(record) + '\n')
+            n_written += 1
+    return n_written
+
+
+def merge_stores(shards, path):
+    """
+    Copies the runs of the results stores `shards` into the store `path`,
+    skipping runs whose SHA-256 is already there. Returns the number of runs
+    copied.
+    """
+    from cfour_parser.store import RESULT_TABLES, connect
+
+    connection = connect(path)
+    n_copied = 0
+    try:
+        for shard in shards:
+            connection.execute('ATTACH DATABASE ? AS shard', (shard,))
+            shard_tables = set(name for name, in connection.execute(
+                "SELECT name FROM shard.sqlite_master WHERE type = 'table'"))
+            connection.execute(
+                'CREATE TEMP TABLE new_runs AS SELECT id, sha256 FROM '
+                'shard.runs WHERE sha256 NOT IN (SELECT sha256 FROM '
+                'main.runs) ORDER BY id')
+            connection.execute(
+                'INSERT INTO main.runs (sha256, path, member, n_atoms, '
+                'n_mos, ingested) SELECT s.sha256, s.path, s.member, '
+                's.n_atoms, s.n_mos, s.ingested FROM shard.runs s JOIN '
+                'temp.new_runs n ON s.id = n.id ORDER BY s.id')
+            for table, columns in RESULT_TABLES.items():
+                if table not in shard_tables:
+                    # A shard written before the table existed
+                    continue
+                names = ', '.join(columns)
+                selected = ', '.join(f's.{column}' for column in columns)
+                connection.execute(
+                    f'INSERT INTO main.{table} (run_id, {names}) '
+                    f'SELECT m.id, {selected} FROM shard.{table} s '
+                    f'JOIN temp.new_runs n ON s.run_id = n.id '
+                    f'JOIN main.runs m ON m.sha256 = n.sha256')
+            n_copied += connection.execute(
+                'SELECT COUNT(*) FROM temp.new_runs').fetchone()[0]
+            connection.execute('DROP TABLE temp.new_runs')
+            connection.commit()
+            connection.execute('DETACH DATABASE shard')
+    finally:
+        connection.close()
+    return n_copied
+
+
+def merge_exports(shards, directory):
+    """
+    Concatenates the tables of the export directories `shards` into
+    `directory`. Runs, and EOM states which are numbered across runs, are
+    renumbered in the order of the shards. Returns the number of runs.
+    """
+    from cfour_parser.export import import_numpy, read_manifest, \
+        read_tables, write_arrays
+
+    numpy = import_numpy()
+    export_format = read_manifest(shards[0])['format']
+    merged = dict()
+    seen = set()
+    n_runs = 0
+    n_states = 0
+    for shard in shards:
+        tables = read_tables(shard)
+        runs = tables.get('runs')
+        if runs is None:
+            continue
+
+        # Old run number -> new run number of the runs not seen before
+        numbers = dict()
+        for run, sha256 in zip(runs['run'].tolist(), runs['sha256'].tolist()):
+            if sha256 != '' and sha256 in seen:
+                continue
+            seen.add(sha256)
+            numbers[run] = n_runs
+            n_runs += 1
+
+        old = numpy.array(sorted(numbers), dtype='i8')
+        new = numpy.array([numbers[run] for run in sorted(numbers)],
+                          dtype='i8')
+        renumbered = dict()
+        for table, columns in tables.items():
+            keep = numpy.isin(columns['run'], old)
+            renumbered[table] = {column: array[keep] for column, array in
+                                 columns.items()}
+            renumbered[table]['run'] = new[numpy.searchsorted(
+                old, renumbered[table]['run'])]
+
+        if 'eom_states' in renumbered:
+            # The states of the kept runs follow the states of the shards
+            # before
+            states = renumbered['eom_states']['state']
+            order = numpy.argsort(states)
+            old_states = states[order]
+            new_states = (n_states + numpy.arange(len(states)))[order]
+            for table in ('eom_states', 'eom_amplitudes'):
+                if table in renumbered:
+                    renumbered[table]['state'] = new_states[
+                        numpy.searchsorted(old_states,
+                                           renumbered[table]['state'])]
+            n_states += len(states)
+
+        for table, columns in renumbered.items():
+            merged.setdefault(table, []).append(columns)
+
+    arrays = dict()
+    for table, parts in merged.items():
+        arrays[table] = {column: numpy.concatenate([part[column] for part in
+                                                    parts])
+                         for column in parts[0]}
+    write_arrays(arrays, directory, export_format)
+    return n_runs
+
+
+def main(argv=None):
+    from cfour_parser.compression import open_output
+
+    args = get_args(argv)
+    kinds = set(shard_kind(shard) for shard in args.shards)
+    if len(kinds) > 1:
+        sys.exit(f"Cannot merge shards of different kinds: "
+                 f"{', '.join(sorted(kinds))}.")
+    kind = kinds.pop()
+
+    if kind == 'ndjson':
+        with open_output(args.output) as output:
+            n_merged = merge_ndjson(args.shards, output)
+        print(f"Merged {n_merged} records.", file=sys.stderr)
+    elif kind == 'store':
+        n_merged = merge_stores(args.shards, args.output)
+        print(f"Merged {n_merged} runs.", file=sys.stderr)
+    else:
+        n_merged = merge_exports(args.shards, args.output)
+        print(f"Merged {n_merged} runs.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
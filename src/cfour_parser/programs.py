@@ -3,13 +3,25 @@
 import os.path
 import argparse
 import re
-import sys
+from cfour_parser.compression import open_input
+from cfour_parser.util import warn
+
+CHECKOUT_PATTERN = re.compile(
+    r'\s*@CHECKOUT-I, Total execution time \(CPU/WALL\):\s*(\d+\.\d+)/'
+    r'\s*(\d+\.\d+) seconds')
+# The @CHECKOUT line is printed right before the end of a program
+CHECKOUT_SEARCH = 4
+
+THREADS_PATTERN = re.compile(r'Running with (\d+) threads')
 
 
 def get_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('cfour_output', help='CFOUR output.')
     parser.add_argument('-v', '--verbose', default=False, action='store_true')
+    parser.add_argument('-e', '--efficiency', default=False,
+                        action='store_true',
+                        help='List CPU/wall efficiency of every program.')
     args = parser.parse_args()
     return args
 
@@ -64,8 +76,7 @@ def add_names_of_program_starts(stack, lines):
         # if the header is the last line of the file no name of the file
         # can be parsed
         if len(lines) == head_line + 1:
-            print(f"Unexpected end of output at line {head_line}",
-                  file=sys.stderr)
+            warn(f"Unexpected end of output at line {head_line}")
             limit['data']['ok'] = False
 
         name_line = lines[head_line + 1]
@@ -87,8 +98,8 @@ def parse_executable_finish_line(line):
 
     match = pattern.match(line)
     if match is None:
-        print("Warning! Parsing of the '--executable <name> finished ...' line"
-              " failed.", file=sys.stderr)
+        warn("Warning! Parsing of the '--executable <name> finished ...' line"
+             " failed.")
         return None
 
     score = {
@@ -121,9 +132,26 @@ def add_names_of_program_ends(stack, lines):
     return stack
 
 
+def checkout_times(program):
+    """
+    Returns {'CPU time, sec', 'wall time, sec'} of the line
+    `@CHECKOUT-I, Total execution time (CPU/WALL):  0.23/  0.54 seconds.`
+    which closes the program, or an empty dictionary if it is not there.
+    """
+    for line in program['lines'][-1:-CHECKOUT_SEARCH-1:-1]:
+        match = CHECKOUT_PATTERN.match(line)
+        if match is not None:
+            return {
+                'CPU time, sec': float(match.group(1)),
+                'wall time, sec': float(match.group(2)),
+            }
+    return dict()
+
+
 def find_programs(cfour):
     """
-    Input is an open file with CFOUR's output.
+    Input is an open file with CFOUR's output. Compressed outputs can be
+    opened with `cfour_parser.compression.open_input`.
     Output is a list of collected programs.
     Each program is represented by a dictionary with:
         'name': program name.
@@ -135,6 +163,8 @@ def find_programs(cfour):
             'ok': bool,  # True if didn't detect parsing nor program errors
             'exit status': int(),
             'walltime, sec': Reported execution time
+            'CPU time, sec', 'wall time, sec': if the program reported them
+                at its @CHECKOUT, see `checkout_times`
         }
     """
 
@@ -164,23 +194,17 @@ def find_programs(cfour):
         # TODO: the document might be incorrectly formatted -- but the compiler
         # should still finish its job
         if node['type'] != 'head' or match['type'] != 'end':
-            print("Error in parsing starts and ends of program sections.",
-                  file=sys.stderr)
-            print("A missmatch between started and completed programs.",
-                  file=sys.stderr)
-            print("The resulted partition is not reliable.",
-                  file=sys.stderr)
+            warn("Error in parsing starts and ends of program sections.\n"
+                 "A missmatch between started and completed programs.\n"
+                 "The resulted partition is not reliable.")
             looks_good = False
 
         # Check that the program names are also alright
         if node['name'] != match['name']:
-            print("Error in parsing starts and ends of executables.",
-                  file=sys.stderr)
-            print(f"The opening of executable {node['name']} is matched with "
-                  f"{match['name']}.",
-                  file=sys.stderr)
-            print("The resulted partition is not reliable.",
-                  file=sys.stderr)
+            warn("Error in parsing starts and ends of executables.\n"
+                 f"The opening of executable {node['name']} is matched with "
+                 f"{match['name']}.\n"
+                 "The resulted partition is not reliable.")
             looks_good = False
 
         if node['data']['ok'] is False or match['data']['ok'] is False:
@@ -202,20 +226,19 @@ def find_programs(cfour):
         if looks_good is False:
             program['data']['ok'] = False
         program['sections'] = list()
+        program['data'].update(checkout_times(program))
 
         programs += [program]
 
     # TODO: parsing of a program that has finished only parts of the jobs
     # should be allowed
     if len(active) != 0:
-        print("Error in parsing starts and ends of program sections.",
-              file=sys.stderr)
-        print("Best guess: some programs did not finish.", file=sys.stderr)
+        warn("Error in parsing starts and ends of program sections.\n"
+             "Best guess: some programs did not finish.")
 
     bad = [program for program in programs if program['data']['ok'] is False]
     if len(bad) > 0:
-        print("Warning! Programs with errors detected in xcfour.",
-              file=sys.stderr)
+        warn("Warning! Programs with errors detected in xcfour.")
 
     programs = [program for program in programs if
                 program['data']['ok'] is True]
@@ -225,11 +248,82 @@ def find_programs(cfour):
     return programs
 
 
+def program_threads(program):
+    """ Number of threads the program reports using, None if it doesn't. """
+    for line in program['lines']:
+        if not line.startswith('Running with'):
+            continue
+        match = THREADS_PATTERN.match(line)
+        if match is not None:
+            return int(match.group(1))
+    return None
+
+
+def program_efficiency(program, io_bound: float = 0.5,
+                       min_walltime: float = 1.0):
+    """
+    CPU/wall efficiency of a program found by `find_programs`. Returns a
+    dictionary with
+        'name', 'start', 'end'
+        'CPU time, sec', 'wall time, sec': from @CHECKOUT (None if missing)
+        'walltime, sec': from the line ending the program
+        'threads': see `program_threads`, None if not reported
+        'CPU/wall': number of cores busy on average
+        'efficiency': CPU/wall per thread (a single thread if unknown)
+        'I/O bound': True if the efficiency is below `io_bound` for a
+                     program running at least `min_walltime` seconds, i.e.,
+                     the program mostly waits
+    """
+    data = program['data']
+    cpu = data.get('CPU time, sec')
+    wall = data.get('wall time, sec')
+    threads = program_threads(program)
+    row = {
+        'name': program['name'],
+        'start': program['start'],
+        'end': program['end'],
+        'CPU time, sec': cpu,
+        'wall time, sec': wall,
+        'walltime, sec': data.get('walltime, sec'),
+        'threads': threads,
+        'CPU/wall': None,
+        'efficiency': None,
+        'I/O bound': False,
+    }
+    if cpu is None or wall is None or wall <= 0.0:
+        return row
+
+    row['CPU/wall'] = cpu / wall
+    row['efficiency'] = row['CPU/wall'] / (threads or 1)
+    row['I/O bound'] = wall >= min_walltime and row['efficiency'] < io_bound
+    return row
+
+
+def str_efficiency_row(row):
+    """ One line of the table of `program_efficiency`. """
+    line = f"{row['start']:5d} -- {row['end']:5d}: {row['name']:12s}"
+    if row['CPU/wall'] is None:
+        return line + "no @CHECKOUT times"
+    threads = '-' if row['threads'] is None else row['threads']
+    line += f"{row['CPU time, sec']:12.2f}{row['wall time, sec']:12.2f}"
+    line += f"{threads:>4}"
+    line += f"{row['CPU/wall']:10.2f}{100 * row['efficiency']:7.1f}%"
+    if row['I/O bound'] is True:
+        line += "  I/O bound?"
+    return line
+
+
 def main():
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
+    if args.efficiency is True:
+        print(f"{'lines':>14s}  {'program':12s}{'CPU, s':>12s}{'wall, s':>12s}"
+              f"{'thr':>4s}{'CPU/wall':>10s}{'eff.':>8s}")
+        for program in programs:
+            print(str_efficiency_row(program_efficiency(program)))
+
     if args.verbose is True:
         for program in programs:
             start = program['start']
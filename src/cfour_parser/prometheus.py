@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics of running CFOUR jobs.
+
+    cfour_parser prometheus runs/ --textfile /var/lib/node_exporter/cfour.prom
+
+Every `--interval` seconds the outputs are checked and only the bytes
+written since the last check are read, so hundreds of jobs cost little more
+than a `stat` each. The metrics are written to the textfile, which the
+textfile collector of node_exporter picks up; every metric is labelled with
+the `job` path:
+    cfour_job_running                    1 while a program runs
+    cfour_current_program{program}       1 for the innermost running program
+    cfour_programs_completed_total       programs which finished
+    cfour_programs_failed_total          programs with a non-zero status
+    cfour_walltime_seconds               walltime of the finished top-level
+                                         programs
+    cfour_cc_iterations                  CC iterations done
+    cfour_cc_last_residual               largest residual of the last one
+    cfour_eom_iterations                 Davidson iterations of the current
+                                         EOM root
+    cfour_eom_last_residual              largest residual of the last one
+    cfour_eom_roots_requested{irrep}     roots searched for in the irrep
+    cfour_eom_roots_converged{irrep}     roots converged in the irrep
+    cfour_output_bytes                   bytes of output read so far
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from cfour_parser.archive import DEFAULT_PATTERN
+from cfour_parser.xncc import EOM_CONVERGED_PATTERN, ITERATION_ROW
+
+FINISH_PATTERN = re.compile(
+    r'\s*--executable (\w+) finished with status\s+(\d+) in\s+(\d+\.\d+)')
+SOLUTION_PATTERN = re.compile(
+    r'\s*Beginning iterative solution of (\S+) equations')
+IRREP_PATTERN = re.compile(r'\s*Searching for\s*(\d+)\s*roots in irrep\s*'
+                           r'(\d+)')
+
+# Lines which are looked at; others are skipped without decoding
+INTERESTING_STARTS = (b'--invoking executable--', b'--executable',
+                      b'Beginning iterative', b'Searching for', b'EOM')
+# Bytes read at a time, e.g., when a long output is first seen
+READ_CHUNK = 1 << 20
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser prometheus')
+    parser.add_argument('inputs', nargs='+',
+                        help='CFOUR outputs or directories with them.')
+    parser.add_argument('--textfile', required=True,
+                        help='The .prom file to write.')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help='Glob matching names of CFOUR outputs in '
+                        'directories.')
+    parser.add_argument('--interval', default=30.0, type=float,
+                        help='Seconds between updates.')
+    parser.add_argument('--once', default=False, action='store_true',
+                        help='Write the metrics once and exit.')
+    args = parser.parse_args(argv)
+    return args
+
+
+class JobMonitor:
+    """
+    Follows one CFOUR output. `update` reads the bytes appended since the
+    previous call and updates the counters.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.partial = b''
+        self.expect_name = False
+        self.running = []
+        self.completed = 0
+        self.failed = 0
+        self.walltime = 0.0
+        self.solution = None
+        self.cc_iterations = 0
+        self.cc_residual = None
+        self.eom_iterations = 0
+        self.eom_residual = None
+        self.irrep = None
+        self.roots_requested = dict()
+        self.roots_converged = dict()
+
+    def update(self):
+        """
+        Reads the new bytes of the output, `READ_CHUNK` at a time; the
+        partial line at the end of a chunk waits for the next one.
+        """
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            # The output was truncated, e.g., the job was restarted
+            self.reset()
+        if size == self.offset:
+            return
+
+        with open(self.path, 'rb') as cfour_output:
+            cfour_output.seek(self.offset)
+            while self.offset < size:
+                chunk = cfour_output.read(min(READ_CHUNK, size - self.offset))
+                if len(chunk) == 0:
+                    break
+                self.offset += len(chunk)
+                lines = (self.partial + chunk).split(b'\n')
+                self.partial = lines.pop()
+                for line in lines:
+                    self.feed(line)
+
+    def feed(self, line: bytes):
+        """ Updates the counters with one line of the output. """
+        if self.expect_name is True:
+            self.expect_name = False
+            name = os.path.basename(line.strip().decode(errors='replace'))
+            self.running += [name]
+            return
+
+        stripped = line.lstrip()
+        if stripped[:1].isdigit():
+            self.feed_iteration(line)
+            return
+
+        if not stripped.startswith(INTERESTING_STARTS):
+            return
+
+        text = line.decode(errors='replace')
+        if stripped.startswith(b'--invoking executable--'):
+            self.expect_name = True
+        elif stripped.startswith(b'--executable'):
+            self.feed_finish(text)
+        elif stripped.startswith(b'Beginning iterative'):
+            match = SOLUTION_PATTERN.match(text)
+            if match is not None:
+                self.solution = match.group(1)
+                if self.solution.startswith('EOM'):
+                    self.eom_iterations = 0
+                    self.eom_residual = None
+                else:
+                    self.cc_iterations = 0
+                    self.cc_residual = None
+        elif stripped.startswith(b'Searching for'):
+            match = IRREP_PATTERN.match(text)
+            if match is not None:
+                self.irrep = match.group(2)
+                self.roots_requested[self.irrep] = int(match.group(1))
+                self.roots_converged.setdefault(self.irrep, 0)
+        elif EOM_CONVERGED_PATTERN.match(text.strip()) is not None:
+            self.roots_converged[self.irrep] = \
+                self.roots_converged.get(self.irrep, 0) + 1
+
+    def feed_iteration(self, line: bytes):
+        if self.solution is None:
+            return
+        match = ITERATION_ROW.match(line.decode(errors='replace'))
+        if match is None:
+            return
+        residual = max(float(residual) for residual in
+                       match.group(3).split())
+        if self.solution.startswith('EOM'):
+            self.eom_iterations += 1
+            self.eom_residual = residual
+        else:
+            self.cc_iterations += 1
+            self.cc_residual = residual
+
+    def feed_finish(self, text: str):
+        match = FINISH_PATTERN.match(text)
+        if match is None:
+            return
+        name = match.group(1)
+        if name in self.running:
+            # Programs started after this one never reported their ends
+            while self.running[-1] != name:
+                self.running.pop()
+            self.running.pop()
+        self.completed += 1
+        if int(match.group(2)) != 0:
+            self.failed += 1
+        if len(self.running) == 0:
+            self.walltime += float(match.group(3))
+        if name == 'xncc':
+            self.solution = None
+
+    def metrics(self):
+        """ Returns [(metric name, {label: value}, value)]. """
+        job = {'job': self.path}
+        metrics = [
+            ('cfour_job_running', job, int(len(self.running) > 0)),
+            ('cfour_programs_completed_total', job, self.completed),
+            ('cfour_programs_failed_total', job, self.failed),
+            ('cfour_walltime_seconds', job, self.walltime),
+            ('cfour_cc_iterations', job, self.cc_iterations),
+            ('cfour_eom_iterations', job, self.eom_iterations),
+            ('cfour_output_bytes', job, self.offset),
+        ]
+        if len(self.running) > 0:
+            metrics += [('cfour_current_program',
+                         dict(job, program=self.running[-1]), 1)]
+        if self.cc_residual is not None:
+            metrics += [('cfour_cc_last_residual', job, self.cc_residual)]
+        if self.eom_residual is not None:
+            metrics += [('cfour_eom_last_residual', job, self.eom_residual)]
+        for irrep, requested in self.roots_requested.items():
+            labels = dict(job, irrep=irrep)
+            metrics += [
+                ('cfour_eom_roots_requested', labels, requested),
+                ('cfour_eom_roots_converged', labels,
+                 self.roots_converged.get(irrep, 0)),
+            ]
+        return metrics
+
+
+def escape_label(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+        '\n', r'\n')
+
+
+def str_metrics(monitors):
+    """ The metrics of all `monitors` in the Prometheus text format. """
+    samples = dict()
+    for monitor in monitors:
+        for name, labels, value in monitor.metrics():
+            samples.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, values in samples.items():
+        kind = 'counter' if name.endswith('_total') else 'gauge'
+        lines += [f'# TYPE {name} {kind}']
+        for labels, value in values:
+            label_text = ','.join(f'{key}="{escape_label(label)}"' for
+                                  key, label in labels.items())
+            lines += [f'{name}{{{label_text}}} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path, text):
+    """ Replaces `path` atomically, so the collector never sees half. """
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as textfile:
+        textfile.write(text)
+    os.replace(temporary, path)
+
+
+def find_outputs(inputs, pattern: str = DEFAULT_PATTERN):
+    """ Plain CFOUR outputs among `inputs`; directories are searched. """
+    from cfour_parser.batch import collect_sources
+    from cfour_parser.compression import compression_from_name
+
+    # Running jobs write plain text
+    return [source['path'] for source in collect_sources(inputs, pattern)
+            if source['kind'] == 'file' and
+            compression_from_name(source['path']) is None]
+
+
+def update_monitors(monitors, inputs, pattern: str = DEFAULT_PATTERN):
+    """
+    Updates {path: JobMonitor} `monitors` in place: new outputs are
+    followed, vanished ones forgotten.
+    """
+    paths = find_outputs(inputs, pattern)
+    for path in set(monitors) - set(paths):
+        del monitors[path]
+    for path in paths:
+        monitor = monitors.setdefault(path, JobMonitor(path))
+        try:
+            monitor.update()
+        except OSError as error:
+            print(f"Warning! Cannot read {path}: {error}", file=sys.stderr)
+    return monitors
+
+
+def main(argv=None):
+    args = get_args(argv)
+    monitors = dict()
+    while True:
+        update_monitors(monitors, args.inputs, args.pattern)
+        write_textfile(args.textfile, str_metrics(monitors.values()))
+        if args.once is True:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
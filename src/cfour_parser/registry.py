@@ -0,0 +1,217 @@
+"""
+Registry of the parsers of CFOUR's programs.
+
+Program names are mapped onto import paths of their parsers
+(`module:function`) so that a parser's module is imported only when its
+program actually shows up in the output.
+
+Third-party packages can register extra parsers through the
+`cfour_parser.parsers` entry point group, e.g. in their `pyproject.toml`
+```toml
+[project.entry-points."cfour_parser.parsers"]
+xsomething = "my_package.xsomething:parse_xsomething_program"
+```
+Parsers shipped with `cfour_parser` take precedence over the plugins.
+
+A parser which depends on earlier programs of the job, e.g., xncc on the
+CC_CONV printed by xjoda, finds them with `job_programs`. Code which runs
+parsers on some programs of a job only wraps them in `job_context`.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import importlib
+import sys
+
+ENTRY_POINT_GROUP = 'cfour_parser.parsers'
+
+# The programs of the output `parse_programs` is working on
+_job_programs = contextvars.ContextVar('job_programs', default=None)
+
+PROGRAM_PARSERS = {
+    'xjoda': 'cfour_parser.xjoda:parse_xjoda_program',
+    'xvscf': 'cfour_parser.xvscf:parse_xvscf_program',
+    'xdqcscf': 'cfour_parser.xdqcscf:parse_xdqcscf_program',
+    'xncc': 'cfour_parser.xncc:parse_xncc_program',
+    'xvcc': 'cfour_parser.xvcc:parse_xvcc_program',
+    'xvee': 'cfour_parser.xvee:parse_xvee_program',
+}
+
+# Subcommands of the `cfour_parser` script; each takes the list of its own
+# command line arguments
+COMMANDS = {
+    'serve': 'cfour_parser.serve:main',
+    'batch': 'cfour_parser.batch:main',
+    'tail': 'cfour_parser.tail:main',
+    'triage': 'cfour_parser.triage:main',
+    'ingest': 'cfour_parser.store:main',
+    'stats': 'cfour_parser.stats:main',
+    'prometheus': 'cfour_parser.prometheus:main',
+    'watch': 'cfour_parser.watch:main',
+    'merge': 'cfour_parser.merge:main',
+    'status': 'cfour_parser.manifest:main',
+}
+
+# Parsers that were already imported, keyed by the program name
+_loaded_parsers = dict()
+# Import paths of the parsers registered by plugins, read on first need
+_plugin_parsers = None
+
+
+def find_plugin_parsers():
+    """
+    Returns {program name: import path} of the parsers registered under the
+    `cfour_parser.parsers` entry point group. The entry points are read only
+    once per process.
+    """
+    global _plugin_parsers
+    if _plugin_parsers is not None:
+        return _plugin_parsers
+
+    if sys.version_info >= (3, 10):
+        from importlib.metadata import entry_points
+    else:
+        from importlib_metadata import entry_points
+
+    _plugin_parsers = dict()
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        _plugin_parsers[entry_point.name] = entry_point.value
+
+    return _plugin_parsers
+
+
+def register_parser(name, parser):
+    """
+    Registers `parser` of the program `name`. The `parser` is either
+    a callable or an import path of the form `module:function`.
+    """
+    _loaded_parsers.pop(name, None)
+    if callable(parser):
+        _loaded_parsers[name] = parser
+    else:
+        PROGRAM_PARSERS[name] = parser
+
+
+def import_from_path(path):
+    """ Import the function pointed to by `module:function`. """
+    module_name, _, function_name = path.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
+
+def get_program_parser(name):
+    """
+    Returns the parser of the program `name` or None if the program has no
+    parser. The parser's module is imported on the first call.
+    """
+    if name in _loaded_parsers:
+        return _loaded_parsers[name]
+
+    if name in PROGRAM_PARSERS:
+        path = PROGRAM_PARSERS[name]
+    else:
+        path = find_plugin_parsers().get(name)
+
+    parser = None
+    if path is not None:
+        parser = import_from_path(path)
+
+    _loaded_parsers[name] = parser
+    return parser
+
+
+def program_fingerprint(program):
+    """
+    Returns (name, start, end, SHA-1 of the lines) of a program found by
+    `find_programs`. A program with the same fingerprint parses the same.
+    """
+    digest = hashlib.sha1()
+    for line in program['lines']:
+        digest.update(line.encode())
+    return (program.get('name'), program['start'], program['end'],
+            digest.hexdigest())
+
+
+def fingerprint_programs(programs):
+    """ Returns {fingerprint: program} of `programs`. """
+    return {program_fingerprint(program): program for program in programs}
+
+
+def parse_programs(programs, previous=None):
+    """
+    Runs the registered parser of every program found by `find_programs`.
+    Programs without a parser are left untouched.
+
+    `previous` are the programs of an earlier parse of the same output, or
+    their `fingerprint_programs`. Programs which did not change since are
+    taken over from `previous` instead of being parsed again.
+
+    `programs` are taken for the whole job unless this runs in a
+    `job_context`.
+    """
+    if previous is not None and not isinstance(previous, dict):
+        previous = fingerprint_programs(previous)
+
+    job = job_programs()
+    with job_context(programs if job is None else job):
+        for idx, program in enumerate(programs):
+            if previous:
+                known = previous.get(program_fingerprint(program))
+                if known is not None:
+                    programs[idx] = known
+                    continue
+
+            parse_program = get_program_parser(program['name'])
+            if parse_program is not None:
+                parse_program(program)
+
+    return programs
+
+
+@contextlib.contextmanager
+def job_context(programs):
+    """
+    Makes `programs`, all programs of a job found by `find_programs`, the
+    `job_programs` of the parsers called inside of the `with` block.
+    """
+    token = _job_programs.set(programs)
+    try:
+        yield programs
+    finally:
+        _job_programs.reset(token)
+
+
+def job_programs():
+    """
+    The programs of the job being parsed, see `job_context`, or None outside
+    of one.
+    """
+    return _job_programs.get()
+
+
+def read_programs(path):
+    """ Finds all programs of the CFOUR output stored at `path`. """
+    from cfour_parser.compression import open_input
+    from cfour_parser.programs import find_programs
+
+    with open_input(path) as cfour_output:
+        return find_programs(cfour_output)
+
+
+def parse_file(path, previous=None):
+    """
+    Finds and parses all programs of the CFOUR output stored at `path`.
+    See `parse_programs` for `previous`.
+    """
+    return parse_programs(read_programs(path), previous)
+
+
+def get_command(name):
+    """
+    Returns the `main` function of the subcommand `name` or None if there is
+    no such subcommand.
+    """
+    if name not in COMMANDS:
+        return None
+    return import_from_path(COMMANDS[name])
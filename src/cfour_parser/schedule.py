@@ -0,0 +1,208 @@
+"""
+Scheduling batch workers under a memory budget.
+
+    cfour_parser batch runs/ --jobs 8 --memory-budget 16GiB -o results.ndjson
+
+The memory a worker needs to parse an output is estimated from the output's
+size and the size of its xncc programs, whose EOM listings cost the most.
+xncc is found by a quick scan for the `--invoking executable--` lines of the
+memory-mapped file. Compressed outputs and members of zip files and
+compressed tars are not scanned and count as xncc from end to end.
+
+The outputs are started largest first. An output estimated to need more than
+the whole budget runs alone; the others run together as long as their
+estimates add up to less than the budget, which therefore bounds the memory
+of the workers. Records come out in the order in which the outputs finish.
+"""
+
+import bisect
+import concurrent.futures
+import mmap
+import re
+import struct
+from cfour_parser.archive import DEFAULT_PATTERN
+from cfour_parser.compression import detect_compression
+
+# Rough peak memory of a worker per byte of output, from tracemalloc on the
+# example output; xncc adds XNCC_MEMORY_PER_BYTE on top
+MEMORY_PER_BYTE = 8
+XNCC_MEMORY_PER_BYTE = 8
+# Memory of an idle worker with the parsers imported
+WORKER_MEMORY = 32 * 1024**2
+# Assumed ratio of the uncompressed to the compressed size
+COMPRESSION_RATIO = 8
+# Smaller outputs are not scanned for xncc
+SCAN_MIN_SIZE = 1024**2
+
+INVOKING = b'--invoking executable--'
+XNCC_FINISHED = b'--executable xncc finished'
+
+SIZE_PATTERN = re.compile(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?\s*$',
+                          re.IGNORECASE)
+SIZE_PREFIXES = {'': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+
+
+def parse_memory_size(text: str):
+    """ Turns '16G', '16GiB', '512 MB', or '1000000' into bytes. """
+    match = SIZE_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Cannot read the memory size '{text}'.")
+    return int(float(match.group(1)) * SIZE_PREFIXES[match.group(2).upper()])
+
+
+def xncc_bytes(data, start: int = 0, end=None):
+    """
+    Number of bytes of the xncc programs between `start` and `end` of the
+    bytes-like `data`.
+    """
+    end = len(data) if end is None else end
+    total = 0
+    position = data.find(INVOKING, start, end)
+    while position >= 0:
+        name_start = data.find(b'\n', position, end) + 1
+        name_end = data.find(b'\n', name_start, end)
+        if name_start == 0 or name_end < 0:
+            break
+        following = name_end
+        if data[name_start:name_end].strip().endswith(b'xncc'):
+            finish = data.find(XNCC_FINISHED, name_end, end)
+            following = end if finish < 0 else finish
+            total += following - position
+        position = data.find(INVOKING, following, end)
+    return total
+
+
+def scan_xncc_bytes(path, start: int = 0, size=None):
+    """
+    Memory-maps `path` and returns `xncc_bytes` of `size` bytes from `start`,
+    or None if they are compressed.
+    """
+    with open(path, 'rb') as cfour_output:
+        with mmap.mmap(cfour_output.fileno(), 0,
+                       access=mmap.ACCESS_READ) as data:
+            end = len(data) if size is None else start + size
+            if detect_compression(data[start:start + 8]) is not None:
+                return None
+            return xncc_bytes(data, start, end)
+
+
+def uncompressed_size(source):
+    """
+    The size of a plain file after decompression: read from the trailer of
+    gzip files, guessed with `COMPRESSION_RATIO` for the other formats.
+    """
+    with open(source['path'], 'rb') as cfour_output:
+        compression = detect_compression(cfour_output.read(8))
+        if compression is None:
+            return source['size']
+        if compression == 'gzip' and source['size'] >= 18:
+            cfour_output.seek(-4, 2)
+            # The size modulo 2**32
+            size, = struct.unpack('<I', cfour_output.read(4))
+            if size >= source['size']:
+                return size
+    return COMPRESSION_RATIO * source['size']
+
+
+def estimate_memory(source):
+    """ Estimated peak memory in bytes of a worker parsing `source`. """
+    if source['kind'] == 'file':
+        size = uncompressed_size(source)
+        xncc = 0
+        if size == source['size'] and size >= SCAN_MIN_SIZE:
+            xncc = scan_xncc_bytes(source['path']) or 0
+        elif size != source['size']:
+            xncc = size
+    elif source['kind'] == 'tar' and source['size'] >= SCAN_MIN_SIZE:
+        size = source['size']
+        xncc = scan_xncc_bytes(source['path'], source['offset'], size)
+        if xncc is None:
+            size = xncc = COMPRESSION_RATIO * size
+    else:
+        size = xncc = source['size']
+    return MEMORY_PER_BYTE * size + XNCC_MEMORY_PER_BYTE * xncc
+
+
+def take_source(costs, sources, free: int, budget: int, idle: bool):
+    """
+    Removes and returns (cost, source) of the largest source of `sources`,
+    sorted by their `costs`, which fits into the `free` memory. Sources over
+    the whole `budget` go first, each one only when the workers are `idle`.
+    Returns None if nothing can start now.
+    """
+    if len(costs) == 0:
+        return None
+    if costs[-1] > budget:
+        index = len(costs) - 1 if idle else -1
+    else:
+        index = bisect.bisect_right(costs, free) - 1
+        if index < 0 and idle:
+            index = len(costs) - 1
+    if index < 0:
+        return None
+    return costs.pop(index), sources.pop(index)
+
+
+def run_budgeted(sources, jobs: int, memory_budget: int,
+                 pattern: str = DEFAULT_PATTERN, shard=None, keep=None,
+                 pool: str = 'process', parse=None):
+    """
+    Parses the `sources` (of the `shard`, see
+    `cfour_parser.batch.select_sources`) with `jobs` processes whose
+    estimated memory stays within `memory_budget` bytes, largest first.
+    `pool` is either 'process' or 'thread'. The records are made by `parse`,
+    `parse_source` by default. Members of compressed tars are parsed after
+    the other sources, in the order of the archive. Yields the records as
+    the sources finish.
+    """
+    from cfour_parser.batch import expand_sources, make_pool, parse_source, \
+        select_sources
+
+    parse = parse_source if parse is None else parse
+    budget = memory_budget - jobs * WORKER_MEMORY
+    if budget <= 0:
+        raise ValueError(f"A memory budget of {memory_budget} bytes does not "
+                         f"cover {jobs} workers.")
+
+    streamed = [source for source in sources if
+                source['kind'] == 'streamed tar']
+    pending = sorted(((estimate_memory(source), index, source) for
+                      index, source in enumerate(select_sources(
+                          [source for source in sources if
+                           source['kind'] != 'streamed tar'], shard, keep))),
+                     key=lambda item: item[:2])
+    costs = [cost for cost, _, _ in pending]
+    pending = [source for _, _, source in pending]
+    members = select_sources(expand_sources(streamed, pattern), shard, keep)
+    waiting = None
+
+    running = dict()
+    in_use = 0
+    with make_pool(jobs, pool) as executor:
+        while True:
+            while len(running) < jobs:
+                free = budget - in_use
+                idle = len(running) == 0
+                taken = take_source(costs, pending, free, budget, idle)
+                if taken is None and len(pending) == 0:
+                    if waiting is None:
+                        member = next(members, None)
+                        if member is not None:
+                            # The member's content is held here until it
+                            # is sent to a worker
+                            waiting = (estimate_memory(member), member)
+                    if waiting is not None and (waiting[0] <= free or idle):
+                        taken, waiting = waiting, None
+                if taken is None:
+                    break
+                cost, source = taken
+                running[executor.submit(parse, source)] = cost
+                in_use += cost
+
+            if len(running) == 0:
+                return
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                in_use -= running.pop(future)
+                yield future.result()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+A long-running parse daemon listening on a Unix socket.
+
+    cfour_parser serve --socket /tmp/cfour_parser.sock
+
+Every request is a single line of JSON
+    {"path": "/abs/path/job.c4", "programs": ["xncc"], "mode": "summary"}
+where only 'path' is required. 'programs' selects programs by name and
+'mode' is either 'json' (programs as printed by `cfour_parser -j`) or
+'summary' (the same without the 'lines' of the output).
+The answer is a single line of JSON, either
+    {"ok": true, "programs": [...]}
+or
+    {"ok": false, "error": "..."}
+
+Parsed outputs are kept in an LRU cache keyed by the path, modification time
+and size of the file, so repeated queries do not touch the parsers at all.
+When a file changes, e.g., a running job writes more output, only its new or
+changed programs are parsed again.
+Parsing runs in a pool of worker processes which keeps the event loop
+responsive.
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import signal
+import socket
+import sys
+from cfour_parser.registry import job_context, parse_programs, \
+    program_fingerprint, read_programs
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser serve')
+    parser.add_argument('--socket', required=True,
+                        help='Path of the Unix socket to listen on.')
+    parser.add_argument('--workers', default=None, type=int,
+                        help='Number of parsing processes.')
+    parser.add_argument('--cache-size', default=128, type=int,
+                        help='Number of parsed outputs kept in memory.')
+    args = parser.parse_args(argv)
+    return args
+
+
+def strip_lines(section):
+    """
+    Returns a copy of `section` (and its subsections) without the 'lines'.
+    """
+    stripped = {key: value for key, value in section.items()
+                if key not in ('lines', 'sections')}
+    if 'sections' in section:
+        stripped['sections'] = [strip_lines(subsection) for subsection in
+                                section['sections']]
+    return stripped
+
+
+def select_programs(programs, names=None, mode='json'):
+    """
+    Picks the programs called `names` (all if None) and formats them for the
+    output `mode`.
+    """
+    if names is not None:
+        programs = [program for program in programs if program['name'] in
+                    names]
+
+    if mode == 'summary':
+        programs = [strip_lines(program) for program in programs]
+    elif mode != 'json':
+        raise ValueError(f"Unknown output mode '{mode}'.")
+
+    return programs
+
+
+class ParsedOutputCache:
+    """
+    LRU cache of parsed CFOUR outputs.
+
+    An entry is valid as long as the file's modification time and size did
+    not change. Next to the parsed programs each entry stores their
+    fingerprints and the encoded answers to the queries already seen.
+    """
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def latest(self, path):
+        """ Returns the newest entry of `path` even if outdated. """
+        for key in reversed(self.entries):
+            if key[0] == path:
+                return self.entries[key]
+        return None
+
+    def put(self, key, programs, fingerprints=None):
+        # Only the newest version of a file is worth keeping
+        path = key[0]
+        for old_key in [k for k in self.entries if k[0] == path]:
+            del self.entries[old_key]
+
+        entry = {
+            'programs': programs,
+            'fingerprints': dict() if fingerprints is None else fingerprints,
+            'answers': dict(),
+        }
+        self.entries[key] = entry
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return entry
+
+
+def parse_changed_file(path, known=frozenset()):
+    """
+    Parses the programs of `path` whose fingerprints are not `known`.
+    Returns a list of (fingerprint, program) where the program is None if
+    its fingerprint is known.
+    """
+    parsed = list()
+    programs = read_programs(path)
+    with job_context(programs):
+        for program in programs:
+            fingerprint = program_fingerprint(program)
+            if fingerprint in known:
+                parsed += [(fingerprint, None)]
+                continue
+            parse_programs([program])
+            parsed += [(fingerprint, program)]
+    return parsed
+
+
+def file_key(path):
+    """ Returns (path, mtime, size) which identifies a version of a file. """
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+class ParseServer:
+    """
+    Answers the parse requests. Parsing happens in the `pool`; requests for
+    a file that is already being parsed wait for the same parse.
+    """
+
+    def __init__(self, pool, cache_size: int = 128):
+        self.pool = pool
+        self.cache = ParsedOutputCache(cache_size)
+        self.pending = dict()
+
+    async def parse(self, path):
+        """
+        Parses `path` in the pool reusing the unchanged programs of its
+        previous version. Returns the programs and their fingerprints.
+        """
+        previous = self.cache.latest(path)
+        known = dict() if previous is None else previous['fingerprints']
+        loop = asyncio.get_running_loop()
+        parsed = await loop.run_in_executor(self.pool, parse_changed_file,
+                                            path, frozenset(known))
+        fingerprints = {fingerprint: known[fingerprint] if program is None
+                        else program for fingerprint, program in parsed}
+        programs = [fingerprints[fingerprint] for fingerprint, _ in parsed]
+        return programs, fingerprints
+
+    async def get_entry(self, path):
+        key = file_key(path)
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+
+        if key not in self.pending:
+            self.pending[key] = asyncio.ensure_future(self.parse(path))
+        try:
+            programs, fingerprints = await self.pending[key]
+        finally:
+            self.pending.pop(key, None)
+
+        entry = self.cache.get(key)
+        if entry is None:
+            entry = self.cache.put(key, programs, fingerprints)
+        return entry
+
+    async def answer(self, request):
+        path = os.path.abspath(request['path'])
+        names = request.get('programs')
+        mode = request.get('mode', 'json')
+
+        entry = await self.get_entry(path)
+        query = (None if names is None else tuple(names), mode)
+        if query not in entry['answers']:
+            programs = select_programs(entry['programs'], names, mode)
+            answer = {'ok': True, 'programs': programs}
+            entry['answers'][query] = json.dumps(answer).encode() + b'\n'
+
+        return entry['answers'][query]
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if len(line) == 0:
+                    break
+                try:
+                    request = json.loads(line)
+                    answer = await self.answer(request)
+                except Exception as error:
+                    answer = json.dumps({
+                        'ok': False,
+                        'error': f'{type(error).__name__}: {error}',
+                    }).encode() + b'\n'
+                writer.write(answer)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(socket_path, workers=None, cache_size: int = 128):
+    """ Runs the daemon until SIGINT or SIGTERM. """
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        server = ParseServer(pool, cache_size)
+        unix_server = await asyncio.start_unix_server(server.handle_client,
+                                                      path=socket_path)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+
+        print(f"cfour_parser serving on {socket_path}", file=sys.stderr)
+        async with unix_server:
+            await stop.wait()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+
+def request_parse(socket_path, path, programs=None, mode='json'):
+    """
+    Client side of the daemon. Sends a single request and returns the
+    decoded answer.
+    """
+    request = {
+        'path': os.path.abspath(path),
+        'mode': mode,
+    }
+    if programs is not None:
+        request['programs'] = list(programs)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(request).encode() + b'\n')
+        with client.makefile('rb') as answer:
+            return json.loads(answer.readline())
+
+
+def main(argv=None):
+    args = get_args(argv)
+    asyncio.run(serve(args.socket, args.workers, args.cache_size))
+
+
+if __name__ == "__main__":
+    main()
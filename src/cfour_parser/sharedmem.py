@@ -0,0 +1,153 @@
+"""
+Passing arrays from worker processes through shared memory.
+
+With `cfour_parser batch --export` and several processes each worker turns
+its output into the columnar tables of `cfour_parser.export` itself.
+Instead of pickling the arrays back to the parent, `share_arrays` copies
+them into one block of shared memory and only a small descriptor of the
+block is pickled. The parent maps the block with `SharedArrays`, copies
+the arrays into its `GrowingTables` straight from the mapping, and unlinks
+the block right after.
+
+Arrays smaller than `SHARED_MIN_BYTES` in total, and all arrays on systems
+where no shared memory can be created or `SHM_DIRECTORY` has too little
+room, are pickled as before. Writing past the free space of a tmpfs kills
+the worker with SIGBUS instead of raising an error, hence the check.
+"""
+
+import os
+import shutil
+from multiprocessing import shared_memory
+from cfour_parser.export import import_numpy
+
+# Arrays start at multiples of this many bytes of the block
+ALIGNMENT = 64
+SHARED_MIN_BYTES = 1 << 16
+# Where POSIX shared memory lives on Linux; a block is only created if it
+# takes less than this fraction of the free space there
+SHM_DIRECTORY = '/dev/shm'
+SHM_MAX_FRACTION = 0.5
+
+
+def has_room(size: int):
+    """ True if a block of `size` bytes fits into `SHM_DIRECTORY`. """
+    if not os.path.isdir(SHM_DIRECTORY):
+        return True
+    return size <= SHM_MAX_FRACTION * shutil.disk_usage(SHM_DIRECTORY).free
+
+
+def share_arrays(arrays):
+    """
+    Returns a picklable descriptor of {table: {column: NumPy array}}
+    `arrays`, placed in shared memory if they are big enough.
+    """
+    numpy = import_numpy()
+    layout = dict()
+    size = 0
+    for table, columns in arrays.items():
+        layout[table] = dict()
+        for column, array in columns.items():
+            layout[table][column] = (array.dtype.str, array.shape, size)
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    if size < SHARED_MIN_BYTES or not has_room(size):
+        return {'arrays': arrays}
+    try:
+        block = shared_memory.SharedMemory(create=True, size=size)
+    except OSError:
+        return {'arrays': arrays}
+
+    try:
+        for table, columns in layout.items():
+            for column, (dtype, shape, offset) in columns.items():
+                view = numpy.ndarray(shape, dtype, buffer=block.buf,
+                                     offset=offset)
+                view[...] = arrays[table][column]
+                del view
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    # The block stays until the parent unlinks it
+    block.close()
+    return {'shared': block.name, 'layout': layout}
+
+
+class SharedArrays:
+    """
+    The arrays of a descriptor of `share_arrays` under `arrays`, mapped
+    without copying. `close` unlinks the block; views of it must be dropped
+    before.
+    """
+
+    def __init__(self, descriptor):
+        self.block = None
+        if 'shared' not in descriptor:
+            self.arrays = descriptor['arrays']
+            return
+
+        numpy = import_numpy()
+        self.block = shared_memory.SharedMemory(name=descriptor['shared'])
+        self.arrays = {
+            table: {column: numpy.ndarray(shape, dtype, buffer=self.block.buf,
+                                          offset=offset)
+                    for column, (dtype, shape, offset) in columns.items()}
+            for table, columns in descriptor['layout'].items()
+        }
+
+    def close(self):
+        self.arrays = None
+        if self.block is None:
+            return
+        block = self.block
+        self.block = None
+        block.unlink()
+        try:
+            block.close()
+        except BufferError:
+            # Views are left, e.g., after an error; the mapping goes with them
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GrowingTables:
+    """
+    {table: {column: NumPy array}} appended to in place. Each column has
+    room for twice the rows it needed when it last filled up, so the rows
+    are copied into it once on average. `arrays` are the filled rows.
+    """
+
+    def __init__(self):
+        self.columns = dict()
+        self.lengths = dict()
+
+    def append(self, arrays):
+        """ Copies {table: {column: NumPy array}} `arrays` to the end. """
+        numpy = import_numpy()
+        for table, columns in arrays.items():
+            buffers = self.columns.setdefault(table, dict())
+            start = self.lengths.get(table, 0)
+            length = start + len(next(iter(columns.values())))
+            for column, array in columns.items():
+                buffer = buffers.get(column)
+                if buffer is None:
+                    buffer = numpy.empty(length, array.dtype)
+                # Strings of later rows may be longer
+                dtype = numpy.result_type(buffer.dtype, array.dtype)
+                if len(buffer) < length or dtype != buffer.dtype:
+                    grown = numpy.empty(max(length, 2 * len(buffer)), dtype)
+                    grown[:start] = buffer[:start]
+                    buffer = grown
+                buffer[start:length] = array
+                buffers[column] = buffer
+            self.lengths[table] = length
+
+    def arrays(self):
+        return {table: {column: buffer[:self.lengths[table]]
+                        for column, buffer in columns.items()}
+                for table, columns in self.columns.items()}
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Performance statistics of a campaign of CFOUR jobs.
+
+    cfour_parser stats runs/ campaign.tar.gz --jobs 8
+    cfour_parser stats --db results.sqlite -j -o report.json
+
+The outputs are parsed (or read from NDJSON files of `cfour_parser batch`, or
+from a results store of `cfour_parser ingest`) and summarized into
+    walltime per program      distribution of walltimes of every program
+    CC Gflops/s               per CC model, from xncc's summary of the CC
+    CC time per iteration     per CC model
+    EOM Gflops/s              per EOM model, weighted by the time of roots
+    outliers                  runs whose time per CC iteration is far off the
+                              trend with the number of MOs, or whose Gflops/s
+                              are far below the rest
+A distribution is summarized by its count, mean, total, minimum, 10th,
+50th and 90th percentiles, and maximum.
+"""
+
+import argparse
+import json
+import math
+import sys
+from cfour_parser.archive import DEFAULT_PATTERN
+
+# Tables of the results store, see `cfour_parser.store`, which go into the
+# statistics
+STATS_TABLES = ('programs', 'cc_energies', 'xncc_capacity')
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser stats')
+    parser.add_argument('inputs', nargs='*',
+                        help='CFOUR outputs, directories, archives, or '
+                        'NDJSON files of `cfour_parser batch`.')
+    parser.add_argument('--db', default=None,
+                        help='Read the runs from this results store.')
+    parser.add_argument('--jobs', default=1, type=int,
+                        help='Number of parsing processes.')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help='Glob matching names of CFOUR outputs in '
+                        'directories and archives.')
+    parser.add_argument('--threshold', default=3.0, type=float,
+                        help='Outliers are this many robust standard '
+                        'deviations off.')
+    parser.add_argument('-j', '--json', default=False, action='store_true',
+                        help='Write the report as JSON.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Write the report to this file.')
+    args = parser.parse_args(argv)
+    if args.db is None and len(args.inputs) == 0:
+        parser.error("give inputs or --db")
+    return args
+
+
+def runs_from_records(records):
+    """
+    Yields a run, see `runs_from_store`, for every record of
+    `cfour_parser.batch`.
+    """
+    from cfour_parser.store import RESULT_TABLES, count_atoms, count_mos, \
+        record_rows
+
+    for record in records:
+        if 'error' in record:
+            print(f"Skipping {record['path']} {record['member'] or ''}: "
+                  f"{record['error']}", file=sys.stderr)
+            continue
+        programs = record['programs']
+        rows = record_rows(record)
+        yield {
+            'path': record['path'],
+            'member': record['member'],
+            'n_atoms': count_atoms(programs),
+            'n_mos': count_mos(programs),
+            'rows': {table: [dict(zip(RESULT_TABLES[table], row)) for row in
+                             rows[table]] for table in STATS_TABLES},
+        }
+
+
+def runs_from_store(connection):
+    """
+    Yields the runs of a results store as dictionaries with
+        'path', 'member', 'n_atoms', 'n_mos'
+        'rows': {table: list of rows as {column: value}} for `STATS_TABLES`
+    """
+    from cfour_parser.store import RESULT_TABLES
+
+    runs = dict()
+    for run_id, path, member, n_atoms, n_mos in connection.execute(
+            'SELECT id, path, member, n_atoms, n_mos FROM runs ORDER BY id'):
+        runs[run_id] = {
+            'path': path,
+            'member': member,
+            'n_atoms': n_atoms,
+            'n_mos': n_mos,
+            'rows': {table: list() for table in STATS_TABLES},
+        }
+
+    for table in STATS_TABLES:
+        columns = RESULT_TABLES[table]
+        for row in connection.execute(
+                f'SELECT run_id, {", ".join(columns)} FROM {table}'):
+            if row[0] in runs:
+                runs[row[0]]['rows'][table] += [dict(zip(columns, row[1:]))]
+
+    yield from runs.values()
+
+
+def percentile(ordered, fraction: float):
+    """ Linear interpolation between the closest ranks of `ordered`. """
+    position = fraction * (len(ordered) - 1)
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(values):
+    """ Summary of a distribution, see the module's docstring. """
+    ordered = sorted(value for value in values if value is not None)
+    if len(ordered) == 0:
+        return {'count': 0}
+    total = math.fsum(ordered)
+    return {
+        'count': len(ordered),
+        'mean': total / len(ordered),
+        'total': total,
+        'min': ordered[0],
+        'p10': percentile(ordered, 0.1),
+        'p50': percentile(ordered, 0.5),
+        'p90': percentile(ordered, 0.9),
+        'max': ordered[-1],
+    }
+
+
+def robust_scale(values, center):
+    """ Median absolute deviation scaled to a normal standard deviation. """
+    deviations = sorted(abs(value - center) for value in values)
+    return 1.4826 * percentile(deviations, 0.5)
+
+
+def fit_line(points):
+    """
+    Least squares fit of y = a + b x to `points` [(x, y)]. Returns (a, b);
+    b is zero if all x are the same.
+    """
+    mean_x = math.fsum(x for x, _ in points) / len(points)
+    mean_y = math.fsum(y for _, y in points) / len(points)
+    sxx = math.fsum((x - mean_x)**2 for x, _ in points)
+    if sxx == 0.0:
+        return mean_y, 0.0
+    sxy = math.fsum((x - mean_x) * (y - mean_y) for x, y in points)
+    slope = sxy / sxx
+    return mean_y - slope * mean_x, slope
+
+
+def time_per_iteration_outliers(samples, threshold: float = 3.0):
+    """
+    `samples` are (run, model, time per CC iteration). For every model
+    log(time per iteration) is fitted linearly in log(number of MOs); runs
+    further than `threshold` robust standard deviations from the fit are
+    returned.
+    """
+    outliers = []
+    models = sorted(set(model for _, model, _ in samples))
+    for model in models:
+        points = [(run, math.log(run['n_mos']), math.log(time)) for
+                  run, sample_model, time in samples if sample_model == model
+                  and run['n_mos'] and time > 0.0]
+        if len(points) < 3:
+            continue
+        intercept, slope = fit_line([(x, y) for _, x, y in points])
+        residuals = [y - intercept - slope * x for _, x, y in points]
+        ordered = sorted(residuals)
+        scale = robust_scale(residuals, percentile(ordered, 0.5))
+        if scale == 0.0:
+            continue
+        for (run, x, y), residual in zip(points, residuals):
+            if abs(residual) <= threshold * scale:
+                continue
+            outliers += [{
+                'path': run['path'],
+                'member': run['member'],
+                'kind': 'CC time per iteration',
+                'model': model,
+                'n_mos': run['n_mos'],
+                'value': math.exp(y),
+                'expected': math.exp(intercept + slope * x),
+            }]
+    return outliers
+
+
+def gflops_outliers(samples, kind: str, threshold: float = 3.0):
+    """
+    `samples` are (run, model, Gflops/s). Returns the runs whose Gflops/s
+    are more than `threshold` robust standard deviations below the median
+    of their model.
+    """
+    outliers = []
+    models = sorted(set(model for _, model, _ in samples))
+    for model in models:
+        values = [(run, gflops) for run, sample_model, gflops in samples if
+                  sample_model == model]
+        if len(values) < 3:
+            continue
+        ordered = sorted(gflops for _, gflops in values)
+        median = percentile(ordered, 0.5)
+        scale = robust_scale(ordered, median)
+        if scale == 0.0:
+            continue
+        for run, gflops in values:
+            if gflops >= median - threshold * scale:
+                continue
+            outliers += [{
+                'path': run['path'],
+                'member': run['member'],
+                'kind': kind,
+                'model': model,
+                'n_mos': run['n_mos'],
+                'value': gflops,
+                'expected': median,
+            }]
+    return outliers
+
+
+def campaign_stats(runs, threshold: float = 3.0):
+    """
+    Aggregates `runs` of `runs_from_records` or `runs_from_store` into the
+    report described in the module's docstring.
+    """
+    walltimes = dict()
+    cc_gflops = list()
+    cc_times = list()
+    eom_gflops = list()
+    n_runs = 0
+    for run in runs:
+        n_runs += 1
+        rows = run['rows']
+        for program in rows['programs']:
+            walltimes.setdefault(program['name'], list()).append(
+                program['walltime'])
+
+        for cc in rows['cc_energies']:
+            if cc['program'] != 'xncc':
+                continue
+            if cc['gflops'] is not None:
+                cc_gflops += [(run, cc['model'], cc['gflops'])]
+            if cc['time_sec'] is not None and cc['n_iterations']:
+                cc_times += [(run, cc['model'],
+                              cc['time_sec'] / cc['n_iterations'])]
+
+        for capacity in rows['xncc_capacity']:
+            if capacity['eom_gflops'] is not None:
+                eom_gflops += [(run, capacity['cc_model'],
+                                capacity['eom_gflops'])]
+
+    def by_model(samples):
+        models = sorted(set(model for _, model, _ in samples))
+        return {model: summarize(value for _, sample_model, value in samples
+                                 if sample_model == model) for model in
+                models}
+
+    outliers = time_per_iteration_outliers(cc_times, threshold)
+    outliers += gflops_outliers(cc_gflops, 'CC Gflops/s', threshold)
+    outliers += gflops_outliers(eom_gflops, 'EOM Gflops/s', threshold)
+    report = {
+        'runs': n_runs,
+        'walltime per program, sec': {name: summarize(values) for name,
+                                      values in sorted(walltimes.items())},
+        'CC Gflops/s': by_model(cc_gflops),
+        'CC time per iteration, sec': by_model(cc_times),
+        # xncc's EOM models follow from its CC model
+        'EOM Gflops/s by CC model': by_model(eom_gflops),
+        'outliers': outliers,
+    }
+    return report
+
+
+def str_summary_table(title, summaries):
+    """ Lines of a table of `summarize`d distributions. """
+    lines = [title, f"{'':14s}{'count':>7s}{'mean':>12s}{'p10':>12s}"
+             f"{'p50':>12s}{'p90':>12s}{'max':>12s}{'total':>14s}"]
+    for name, summary in summaries.items():
+        if summary['count'] == 0:
+            lines += [f"{name:14s}{0:7d}"]
+            continue
+        lines += [f"{name:14s}{summary['count']:7d}{summary['mean']:12.2f}"
+                  f"{summary['p10']:12.2f}{summary['p50']:12.2f}"
+                  f"{summary['p90']:12.2f}{summary['max']:12.2f}"
+                  f"{summary['total']:14.1f}"]
+    return lines
+
+
+def str_stats(report):
+    """ The report as text. """
+    lines = [f"{report['runs']} runs", '']
+    for title in ('walltime per program, sec', 'CC Gflops/s',
+                  'CC time per iteration, sec', 'EOM Gflops/s by CC model'):
+        lines += str_summary_table(title, report[title]) + ['']
+
+    lines += [f"{len(report['outliers'])} outliers"]
+    for outlier in report['outliers']:
+        name = outlier['path']
+        if outlier['member'] is not None:
+            name += f":{outlier['member']}"
+        lines += [f"  {outlier['kind']} of {outlier['model']} "
+                  f"({outlier['n_mos']} MOs): {outlier['value']:.2f}, "
+                  f"expected {outlier['expected']:.2f}  {name}"]
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+    from cfour_parser.compression import open_output
+
+    args = get_args(argv)
+    connection = None
+    runs = []
+    if args.db is not None:
+        from cfour_parser.store import connect
+        connection = connect(args.db)
+        runs = list(runs_from_store(connection))
+
+    if len(args.inputs) > 0:
+        from cfour_parser.store import iter_input_records
+        records = iter_input_records(args.inputs, args.jobs, args.pattern)
+        runs += list(runs_from_records(records))
+
+    if connection is not None:
+        connection.close()
+
+    report = campaign_stats(runs, args.threshold)
+    if args.json is True:
+        text = json.dumps(report) + '\n'
+    else:
+        text = str_stats(report)
+
+    if args.output is None:
+        sys.stdout.write(text)
+        return
+
+    with open_output(args.output) as output:
+        output.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+SQLite store of parsed CFOUR outputs.
+
+    cfour_parser ingest runs/ campaign.tar.gz --db results.sqlite --jobs 8
+
+Every output becomes a row of the `runs` table identified by the SHA-256 of
+its content; ingesting the same content again replaces the old rows. The
+results are spread over normalized tables
+    runs                one row per CFOUR output
+    programs            name, exit status, walltime, and @CHECKOUT CPU and
+                        wall time of every program
+    scf_energies        xvscf and xdqcscf energies
+    cc_energies         xncc and xvcc energies
+    eom_states          EOM states of xncc and xvee
+    control_parameters  xjoda's table of CFOUR control parameters
+    xncc_capacity       xncc's predicted memory and disk I/O next to its
+                        observed CC and EOM cost
+which are linked by `run_id`.
+Besides CFOUR outputs `ingest` accepts NDJSON files written by
+`cfour_parser batch`.
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from cfour_parser.archive import DEFAULT_PATTERN
+from cfour_parser.util import find_sections
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    sha256 TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    member TEXT,
+    n_atoms INTEGER,
+    n_mos INTEGER,
+    ingested REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS programs (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program_idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    start_line INTEGER,
+    end_line INTEGER,
+    exit_status INTEGER,
+    walltime REAL,
+    cpu_time REAL,
+    wall_time REAL,
+    PRIMARY KEY (run_id, program_idx)
+);
+CREATE TABLE IF NOT EXISTS scf_energies (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program_idx INTEGER NOT NULL,
+    program TEXT NOT NULL,
+    energy_au REAL,
+    convergence REAL
+);
+CREATE TABLE IF NOT EXISTS cc_energies (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program_idx INTEGER NOT NULL,
+    program TEXT NOT NULL,
+    model TEXT,
+    energy_au REAL,
+    reference_au REAL,
+    correlation_au REAL,
+    n_iterations INTEGER,
+    time_sec REAL,
+    gflops REAL
+);
+CREATE TABLE IF NOT EXISTS eom_states (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program_idx INTEGER NOT NULL,
+    program TEXT NOT NULL,
+    model TEXT,
+    irrep INTEGER,
+    root INTEGER,
+    excitation_au REAL,
+    excitation_ev REAL,
+    total_au REAL,
+    oscillator_strength REAL
+);
+CREATE TABLE IF NOT EXISTS control_parameters (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program_idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    internal_name TEXT,
+    value TEXT,
+    PRIMARY KEY (run_id, program_idx, name)
+);
+CREATE TABLE IF NOT EXISTS xncc_capacity (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    program_idx INTEGER NOT NULL,
+    memory_limit_gib REAL,
+    minimum_memory_gib REAL,
+    optimal_memory_gib REAL,
+    disk_io_gib REAL,
+    uncached_lists INTEGER,
+    simulation_sec REAL,
+    cc_model TEXT,
+    cc_iterations INTEGER,
+    cc_time_sec REAL,
+    cc_gflops REAL,
+    eom_roots INTEGER,
+    eom_iterations INTEGER,
+    eom_time_sec REAL,
+    eom_gflops REAL,
+    walltime REAL,
+    PRIMARY KEY (run_id, program_idx)
+);
+CREATE INDEX IF NOT EXISTS runs_path ON runs(path);
+CREATE INDEX IF NOT EXISTS programs_name ON programs(name);
+CREATE INDEX IF NOT EXISTS scf_energies_run ON scf_energies(run_id);
+CREATE INDEX IF NOT EXISTS cc_energies_run ON cc_energies(run_id);
+CREATE INDEX IF NOT EXISTS cc_energies_model ON cc_energies(model);
+CREATE INDEX IF NOT EXISTS eom_states_run ON eom_states(run_id);
+CREATE INDEX IF NOT EXISTS eom_states_model ON eom_states(model, irrep);
+CREATE INDEX IF NOT EXISTS control_parameters_name
+    ON control_parameters(name, value);
+"""
+
+# Tables filled from the parsed programs, in the order of their columns
+RESULT_TABLES = {
+    'programs': ('program_idx', 'name', 'start_line', 'end_line',
+                 'exit_status', 'walltime', 'cpu_time', 'wall_time'),
+    'scf_energies': ('program_idx', 'program', 'energy_au', 'convergence'),
+    'cc_energies': ('program_idx', 'program', 'model', 'energy_au',
+                    'reference_au', 'correlation_au', 'n_iterations',
+                    'time_sec', 'gflops'),
+    'eom_states': ('program_idx', 'program', 'model', 'irrep', 'root',
+                   'excitation_au', 'excitation_ev', 'total_au',
+                   'oscillator_strength'),
+    'control_parameters': ('program_idx', 'name', 'internal_name', 'value'),
+    'xncc_capacity': ('program_idx', 'memory_limit_gib', 'minimum_memory_gib',
+                      'optimal_memory_gib', 'disk_io_gib', 'uncached_lists',
+                      'simulation_sec', 'cc_model', 'cc_iterations',
+                      'cc_time_sec', 'cc_gflops', 'eom_roots',
+                      'eom_iterations', 'eom_time_sec', 'eom_gflops',
+                      'walltime'),
+}
+
+
+def get_args(argv=None):
+    from cfour_parser.batch import parse_shard
+
+    parser = argparse.ArgumentParser(prog='cfour_parser ingest')
+    parser.add_argument('inputs', nargs='+',
+                        help='CFOUR outputs, directories, archives, or '
+                        'NDJSON files of `cfour_parser batch`.')
+    parser.add_argument('--db', required=True, help='SQLite database.')
+    parser.add_argument('--jobs', default=1, type=int,
+                        help='Number of parsing processes.')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help='Glob matching names of CFOUR outputs in '
+                        'directories and archives.')
+    parser.add_argument('--batch-size', default=256, type=int,
+                        help='Number of outputs stored per transaction.')
+    parser.add_argument('--shard', default=None, type=parse_shard,
+                        metavar='i/N',
+                        help='Parse only the share i/N of the outputs, see '
+                        '`cfour_parser batch`.')
+    parser.add_argument('--manifest', default=None,
+                        help='Record stored outputs in this file and skip '
+                        'them when run again, see `cfour_parser status`.')
+    parser.add_argument('--max-attempts', default=3, type=int,
+                        help='With --manifest, attempts at parsing an '
+                        'output before giving up.')
+    args = parser.parse_args(argv)
+    return args
+
+
+def connect(path):
+    """ Opens (and if needed creates) the store at `path`. """
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA foreign_keys = ON')
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')
+    columns = [row[1] for row in
+               connection.execute('PRAGMA table_info(control_parameters)')]
+    if len(columns) > 0 and 'program_idx' not in columns:
+        upgrade_control_parameters(connection)
+    columns = [row[1] for row in
+               connection.execute('PRAGMA table_info(programs)')]
+    if len(columns) > 0 and 'cpu_time' not in columns:
+        connection.executescript(
+            'ALTER TABLE programs ADD COLUMN cpu_time REAL; '
+            'ALTER TABLE programs ADD COLUMN wall_time REAL;'
+        )
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def upgrade_control_parameters(connection):
+    """
+    Keys `control_parameters` of stores written by older versions by the
+    xjoda program too. Their rows belong to the only xjoda of their run.
+    """
+    connection.executescript(
+        'DROP INDEX IF EXISTS control_parameters_name; '
+        'ALTER TABLE control_parameters RENAME TO control_parameters_old;'
+    )
+    connection.executescript(SCHEMA)
+    connection.execute(
+        'INSERT INTO control_parameters '
+        '(run_id, program_idx, name, internal_name, value) '
+        'SELECT run_id, COALESCE((SELECT MIN(program_idx) FROM programs '
+        "WHERE programs.run_id = old.run_id AND name = 'xjoda'), 0), "
+        'name, internal_name, value FROM control_parameters_old AS old'
+    )
+    connection.execute('DROP TABLE control_parameters_old')
+    connection.commit()
+
+
+def get_au(energy, key):
+    """ Returns energy[key]['au'] or None. """
+    if energy is None or key not in energy:
+        return None
+    return energy[key].get('au')
+
+
+def count_atoms(programs):
+    """ Number of real atoms (dummy atoms excluded) in the QCOMP geometry. """
+    for program in programs:
+        for qcomp in find_sections(program, 'qcomp'):
+            geometry = qcomp['data'].get('geometry a.u.', [])
+            return len([atom for atom in geometry if atom['Atomic Number'] >
+                        0])
+    return None
+
+
+def count_mos(programs):
+    """ Number of molecular orbitals in the first SCF listing. """
+    for program in programs:
+        for mos in find_sections(program, 'MOs'):
+            return len(mos['data']['occupied']) + len(mos['data']['virtual'])
+    return None
+
+
+def xncc_cc_rows(idx, xncc):
+    rows = []
+    for cc in find_sections(xncc, 'cc'):
+        iterations = dict()
+        for section in find_sections(cc, 'iterations'):
+            iterations = section['data']
+        rows += [(idx, xncc['name'], cc['data'].get('CC level'),
+                  get_au(cc['data'].get('energy'), 'total'), None, None,
+                  iterations.get('# iterations'),
+                  iterations.get('time, sec'), iterations.get('Gflops/s'))]
+    return rows
+
+
+def xncc_capacity_rows(idx, xncc):
+    from cfour_parser.xncc import capacity_report
+
+    report = capacity_report(xncc)
+    if report['memory limit, GiB'] is None:
+        return []
+    return [(idx, report['memory limit, GiB'], report['minimum memory, GiB'],
+             report['optimal memory, GiB'],
+             report['estimated disk I/O, GiB'], report['uncached lists'],
+             report['simulation time, sec'], report['CC model'],
+             report['CC iterations'], report['CC time, sec'],
+             report['CC Gflops/s'], report['EOM roots'],
+             report['EOM iterations'], report['EOM time, sec'],
+             report['EOM Gflops/s'], report['walltime, sec'])]
+
+
+def xvcc_cc_rows(idx, xvcc):
+    rows = []
+    for miracle in find_sections(xvcc, 'A miracle'):
+        energy = miracle['data']['energy']
+        rows += [(idx, xvcc['name'], None, get_au(energy, 'total'),
+                  get_au(energy, 'Reference'), get_au(energy, 'correlation'),
+                  None, None, None)]
+    return rows
+
+
+def xncc_eom_rows(idx, xncc):
+    rows = []
+    for irrep in find_sections(xncc, 'irrep'):
+        for root_no, root in enumerate(irrep['sections']):
+            energy = dict()
+            for section in find_sections(root, 'EOM energy'):
+                energy = section['data']
+            excitation = energy.get('excitation', dict())
+            rows += [(idx, xncc['name'], root['data']['model'],
+                      irrep['data']['#'], root_no, excitation.get('au'),
+                      excitation.get('eV'), get_au(energy, 'total'), None)]
+    return rows
+
+
+def xvee_eom_rows(idx, xvee):
+    """
+    The transition properties of xvee follow the solution of their symmetry
+    block, this is how states are assigned to irreps.
+    """
+    rows = []
+    irrep = None
+    root_no = 0
+    for section in xvee['sections']:
+        if section['name'] == 'eom solution':
+            irrep = section['data']['irrep']['#']
+            root_no = 0
+            continue
+        if section['name'] != 'transition properties':
+            continue
+        data = section['data']
+        transition = data['energy']['transition']
+        rows += [(idx, xvee['name'], data['model'], irrep, root_no, None,
+                  transition['eV'], get_au(data['energy'], 'total'),
+                  data['Norm of oscillator strength'])]
+        root_no += 1
+    return rows
+
+
+def record_rows(record):
+    """
+    Turns a record of `cfour_parser.batch` into rows of the result tables.
+    Returns {table name: list of rows}.
+    """
+    rows = {table: list() for table in RESULT_TABLES}
+    programs = record['programs']
+    for idx, program in enumerate(programs):
+        name = program['name']
+        data = program['data']
+        rows['programs'] += [(idx, name, program['start'], program['end'],
+                              data.get('exit status'),
+                              data.get('walltime, sec'),
+                              data.get('CPU time, sec'),
+                              data.get('wall time, sec'))]
+
+        if name in ('xvscf', 'xdqcscf') and 'energy' in data:
+            rows['scf_energies'] += [(idx, name, data['energy']['au'],
+                                      data.get('energy convergence'))]
+        elif name == 'xncc':
+            rows['cc_energies'] += xncc_cc_rows(idx, program)
+            rows['eom_states'] += xncc_eom_rows(idx, program)
+            rows['xncc_capacity'] += xncc_capacity_rows(idx, program)
+        elif name == 'xvcc':
+            rows['cc_energies'] += xvcc_cc_rows(idx, program)
+        elif name == 'xvee':
+            rows['eom_states'] += xvee_eom_rows(idx, program)
+        elif name == 'xjoda':
+            for section in find_sections(program, 'control parameters'):
+                for key, value in section['data'].items():
+                    rows['control_parameters'] += [(
+                        idx, key, value['internal_name'], value['value'])]
+
+    return rows
+
+
+def store_record(connection, record):
+    """
+    Upserts one record of `cfour_parser.batch` keyed by its content hash.
+    Returns the id of the run. Does not commit.
+    """
+    programs = record['programs']
+    connection.execute(
+        'INSERT INTO runs (sha256, path, member, n_atoms, n_mos, ingested) '
+        'VALUES (?, ?, ?, ?, ?, ?) '
+        'ON CONFLICT (sha256) DO UPDATE SET path = excluded.path, '
+        'member = excluded.member, n_atoms = excluded.n_atoms, '
+        'n_mos = excluded.n_mos, ingested = excluded.ingested',
+        (record['sha256'], record['path'], record['member'],
+         count_atoms(programs), count_mos(programs), time.time())
+    )
+    run_id = connection.execute('SELECT id FROM runs WHERE sha256 = ?',
+                                (record['sha256'],)).fetchone()[0]
+
+    for table, rows in record_rows(record).items():
+        connection.execute(f'DELETE FROM {table} WHERE run_id = ?',
+                           (run_id,))
+        if len(rows) == 0:
+            continue
+        columns = ('run_id',) + RESULT_TABLES[table]
+        placeholders = ', '.join('?' * len(columns))
+        connection.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) '
+            f'VALUES ({placeholders})',
+            [(run_id,) + row for row in rows]
+        )
+
+    return run_id
+
+
+def ingest_records(connection, records, batch_size: int = 256,
+                   manifest=None):
+    """
+    Stores `records` committing every `batch_size` of them. Records with
+    errors, or which fail to be stored, are skipped; the warnings of the
+    parsers are printed. The records
+    go to the `manifest`, see `cfour_parser.manifest.Manifest`, once
+    committed. Returns the number of stored records.
+    """
+    from cfour_parser.batch import print_warnings
+
+    n_stored = 0
+    for record in records:
+        print_warnings(record)
+        if 'error' not in record:
+            if not connection.in_transaction:
+                connection.execute('BEGIN')
+            connection.execute('SAVEPOINT record')
+            try:
+                store_record(connection, record)
+            except Exception as err:
+                connection.execute('ROLLBACK TO record')
+                record = dict(record, error=f'{type(err).__name__}: {err}')
+            connection.execute('RELEASE record')
+        if manifest is not None:
+            manifest.add(record)
+        if 'error' in record:
+            print(f"Skipping {record['path']} {record['member'] or ''}: "
+                  f"{record['error']}", file=sys.stderr)
+            continue
+        n_stored += 1
+        if n_stored % batch_size == 0:
+            connection.commit()
+            if manifest is not None:
+                manifest.commit()
+    connection.commit()
+    if manifest is not None:
+        manifest.commit()
+    return n_stored
+
+
+def iter_input_records(inputs, jobs: int = 1, pattern: str = DEFAULT_PATTERN,
+                       shard=None, keep=None):
+    """
+    Yields records of the NDJSON inputs as they are, and parses everything
+    else with `cfour_parser.batch`. Only the `shard` is kept, of the outputs
+    parsed also only what is to `keep`, see `cfour_parser.batch.run_batch`.
+    """
+    from cfour_parser.batch import collect_sources, is_ndjson, read_records, \
+        run_batch, select_shard
+
+    ndjson = [path for path in inputs if is_ndjson(path)]
+    outputs = [path for path in inputs if not is_ndjson(path)]
+    for path in ndjson:
+        yield from select_shard(read_records(path), shard)
+
+    if len(outputs) > 0:
+        sources = collect_sources(outputs, pattern)
+        yield from run_batch(sources, jobs, pattern, shard, keep=keep)
+
+
+def main(argv=None):
+    from cfour_parser.batch import is_ndjson
+
+    args = get_args(argv)
+    connection = connect(args.db)
+    start = time.perf_counter()
+    try:
+        if args.manifest is None:
+            records = iter_input_records(args.inputs, args.jobs,
+                                         args.pattern, args.shard)
+            n_stored = ingest_records(connection, records, args.batch_size)
+        else:
+            from cfour_parser.manifest import Manifest
+            manifest = Manifest(args.manifest, args.db, args.max_attempts)
+            inputs = args.inputs
+            n_stored = 0
+            while manifest.start_pass():
+                records = iter_input_records(inputs, args.jobs, args.pattern,
+                                             args.shard, manifest.is_pending)
+                n_stored += ingest_records(connection, records,
+                                           args.batch_size, manifest)
+                # NDJSON inputs are read in the first pass only
+                inputs = [path for path in inputs if not is_ndjson(path)]
+    finally:
+        connection.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Stored {n_stored} outputs in {elapsed:.1f} sec.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
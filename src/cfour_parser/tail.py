@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Fast look at the final results of a CFOUR output.
+
+The output is read backwards, block by block, starting from the end of the
+file. By default the reading stops at the start of the last program which
+printed any of the quantities, with `--want` as soon as all the requested
+quantities are found. Checking a finished job takes milliseconds regardless
+of the size of its output.
+
+Compressed outputs cannot be read backwards; only their last
+`COMPRESSED_TAIL_LINES` lines are kept while they are decompressed.
+
+    cfour_parser tail job.c4
+"""
+
+import argparse
+import collections
+import json
+import os
+import re
+from cfour_parser.compression import detect_compression, open_input
+from cfour_parser.text import FLOAT, FLOAT_WS
+
+QUANTITIES = ('last program', 'cc energy', 'miracle', 'eom energy')
+# Lines kept from the end of compressed outputs
+COMPRESSED_TAIL_LINES = 1 << 17
+INVOKING = '--invoking executable--'
+
+FINISH_PATTERN = re.compile(r'--executable (\w+) finished with status\s+(\d+)'
+                            r' in\s+(\d+\.\d+)')
+CC_ENERGY_PATTERN = re.compile(r'Total (CC(?:SD|SDT|SDTQ)) energy:' +
+                               FLOAT_WS)
+MIRACLE_PATTERN = re.compile(r'\s*A miracle has come to pass\.')
+MIRACLE_ENERGY_PATTERN = re.compile(r'\s*The (reference|correlation|total) '
+                                    r'energy is' + FLOAT_WS + r'a\.u\.')
+EOM_EXCITATION_PATTERN = re.compile(r'(EOM\w\w-CC\w+) excitation energy:' +
+                                    FLOAT_WS + r'\(' + FLOAT_WS + r'eV\)')
+EOM_TOTAL_PATTERN = re.compile(r'Total (EOM\w\w-CC\w+) energy:' + FLOAT_WS)
+XVEE_TOTAL_PATTERN = re.compile(r'\s*Total\s+(EOM\w\w-CC\w+)\s+electronic '
+                                r'energy\s+' + FLOAT + r'\s+a\.u\.')
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser tail')
+    parser.add_argument('cfour_output', help='CFOUR output.')
+    parser.add_argument('--want', nargs='+', default=None,
+                        choices=QUANTITIES,
+                        help='Quantities to look for (by default those of '
+                        'the last program which printed any).')
+    parser.add_argument('--max-bytes', default=None, type=int,
+                        help='Give up after reading this many bytes.')
+    parser.add_argument('-j', '--json', default=False, action='store_true')
+    args = parser.parse_args(argv)
+    return args
+
+
+def read_lines_backwards(stream, block_size: int = 1 << 16,
+                         max_bytes=None):
+    """
+    Yields lines of the binary, seekable `stream` starting from the last
+    one. Stops after reading `max_bytes` if given.
+    """
+    stream.seek(0, os.SEEK_END)
+    position = stream.tell()
+    stop = 0 if max_bytes is None else max(0, position - max_bytes)
+    remainder = b''
+    while position > stop:
+        step = min(block_size, position - stop)
+        position -= step
+        stream.seek(position)
+        block = stream.read(step) + remainder
+        lines = block.split(b'\n')
+        remainder = lines[0]
+        for line in reversed(lines[1:]):
+            yield line.decode(errors='replace')
+
+    if stop == 0:
+        yield remainder.decode(errors='replace')
+
+
+def scan_lines_backwards(lines, wanted=QUANTITIES, last_results=False):
+    """
+    Looks through `lines`, given in reverse order, for the `wanted`
+    quantities. Returns a dictionary with those found. With `last_results`
+    the scan stops at the start of the last program which printed any of
+    the quantities besides 'last program'.
+    """
+    wanted = set(wanted)
+    found = dict()
+    # The lines that follow the current one in the output, nearest first
+    after = collections.deque(maxlen=4)
+    for line in lines:
+        if 'last program' in wanted and 'last program' not in found:
+            finish_match = FINISH_PATTERN.match(line)
+            if finish_match is not None:
+                found['last program'] = {
+                    'name': finish_match.group(1),
+                    'running': False,
+                    'exit status': int(finish_match.group(2)),
+                    'walltime, sec': float(finish_match.group(3)),
+                }
+            elif line.strip() == INVOKING:
+                name = after[0].strip() if len(after) > 0 else None
+                found['last program'] = {
+                    'name': os.path.basename(name) if name else None,
+                    'running': True,
+                }
+
+        if 'cc energy' in wanted and 'cc energy' not in found:
+            cc_match = CC_ENERGY_PATTERN.match(line)
+            if cc_match is not None:
+                found['cc energy'] = {
+                    'model': cc_match.group(1),
+                    'au': float(cc_match.group(2)),
+                }
+
+        if 'miracle' in wanted and 'miracle' not in found:
+            if MIRACLE_PATTERN.match(line) is not None:
+                # Keys as in `cfour_parser.xvcc.parse_xvcc_miracle`
+                keys = {
+                    'reference': 'Reference',
+                    'correlation': 'correlation',
+                    'total': 'total',
+                }
+                energy = dict()
+                for next_line in list(after)[:3]:
+                    energy_match = MIRACLE_ENERGY_PATTERN.match(next_line)
+                    if energy_match is not None:
+                        energy[keys[energy_match.group(1)]] = {
+                            'au': float(energy_match.group(2)),
+                        }
+                found['miracle'] = energy
+
+        if 'eom energy' in wanted and 'eom energy' not in found:
+            eom_match = EOM_EXCITATION_PATTERN.match(line)
+            xvee_match = XVEE_TOTAL_PATTERN.match(line)
+            if eom_match is not None:
+                eom_energy = {
+                    'model': eom_match.group(1),
+                    'excitation': {
+                        'au': float(eom_match.group(2)),
+                        'eV': float(eom_match.group(3)),
+                    },
+                }
+                total_match = None
+                if len(after) > 0:
+                    total_match = EOM_TOTAL_PATTERN.match(after[0].strip())
+                if total_match is not None:
+                    eom_energy['total'] = {
+                        'au': float(total_match.group(2)),
+                    }
+                found['eom energy'] = eom_energy
+            elif xvee_match is not None:
+                found['eom energy'] = {
+                    'model': xvee_match.group(1),
+                    'total': {
+                        'au': float(xvee_match.group(2)),
+                    },
+                }
+
+        if wanted.issubset(found.keys()):
+            break
+        if last_results and len(found.keys() - {'last program'}) > 0 and \
+                line.strip() == INVOKING:
+            break
+        after.appendleft(line)
+
+    return found
+
+
+def scan_tail(path, wanted=None, max_bytes=None):
+    """
+    Returns the `wanted` quantities (see `QUANTITIES`) found nearest to the
+    end of the CFOUR output `path`. If `wanted` is None, those of the last
+    program which printed any, see `scan_lines_backwards`.
+
+    Compressed outputs cannot be read backwards; they are decompressed as a
+    stream and their last `COMPRESSED_TAIL_LINES` lines are scanned.
+    """
+    last_results = wanted is None
+    wanted = QUANTITIES if wanted is None else wanted
+    with open(path, 'rb') as raw:
+        compressed = detect_compression(raw.read(8)) is not None
+        if not compressed:
+            lines = read_lines_backwards(raw, max_bytes=max_bytes)
+            return scan_lines_backwards(lines, wanted, last_results)
+
+    with open_input(path) as cfour_output:
+        lines = collections.deque((line.rstrip('\n') for line in
+                                   cfour_output), maxlen=COMPRESSED_TAIL_LINES)
+    return scan_lines_backwards(reversed(lines), wanted, last_results)
+
+
+def str_tail(found):
+    """ Returns a human readable summary of `scan_tail`'s results. """
+    pretty = list()
+    if 'last program' in found:
+        program = found['last program']
+        if program['running'] is True:
+            pretty += [f"{program['name']} is running."]
+        else:
+            pretty += [f"{program['name']} finished with status "
+                       f"{program['exit status']} in "
+                       f"{program['walltime, sec']:.2f} sec."]
+    if 'cc energy' in found:
+        cc = found['cc energy']
+        pretty += [f"Total {cc['model']} energy: {cc['au']:.10f} au."]
+    if 'miracle' in found and 'total' in found['miracle']:
+        total = found['miracle']['total']['au']
+        pretty += [f"Total xvcc energy: {total:.10f} au."]
+    if 'eom energy' in found:
+        eom = found['eom energy']
+        msg = f"Last {eom['model']} state:"
+        if 'excitation' in eom:
+            msg += f" excitation energy {eom['excitation']['eV']:.3f} eV,"
+        if 'total' in eom:
+            msg += f" total energy {eom['total']['au']:.10f} au,"
+        pretty += [msg[:-1] + '.']
+    return '\n'.join(pretty)
+
+
+def main(argv=None):
+    args = get_args(argv)
+    found = scan_tail(args.cfour_output, args.want, args.max_bytes)
+
+    if args.json is True:
+        print(json.dumps(found))
+    else:
+        print(str_tail(found))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Timeline of a CFOUR job in the Chrome trace format.
+
+    cfour_parser job.c4 --export-trace job.trace.json
+
+The file opens in chrome://tracing or https://ui.perfetto.dev. Every program
+is a span as long as its reported walltime. Programs follow each other in
+the order of the output; a program started inside another one is placed at
+the beginning of its parent. When the timings are available xncc's span is
+split into the memory analysis, the CC iterations, the formation of H, and
+the EOM irreps with their roots.
+
+CFOUR does not print when programs start, so the time axis starts at zero
+and every span is placed by adding up the walltimes before it.
+"""
+
+import json
+import re
+from cfour_parser.compression import open_output
+from cfour_parser.util import find_sections
+
+FORMATION_OF_H_PATTERN = re.compile(
+    r'Formation of H took\s*(\d+\.\d+)\s*seconds')
+
+MICROSECONDS = 1e6
+
+
+def span(name, category, start: float, duration: float, args=None):
+    """ A complete ('X') event; times are in seconds. """
+    event = {
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': start * MICROSECONDS,
+        'dur': duration * MICROSECONDS,
+        'pid': 1,
+        'tid': 1,
+    }
+    if args is not None:
+        event['args'] = args
+    return event
+
+
+def xncc_events(xncc, start: float):
+    """ Spans of the phases of a parsed xncc starting at `start`. """
+    events = []
+    clock = start
+
+    for memory in find_sections(xncc, 'memory analysis'):
+        duration = memory['data'].get('simulation time, sec')
+        if duration is not None:
+            events += [span('memory analysis', 'xncc', clock, duration)]
+            clock += duration
+
+    for iterations in find_sections(xncc, 'iterations'):
+        data = iterations['data']
+        history = data.get('history')
+        if history is None:
+            continue
+        walltimes = history['walltime, sec']
+        duration = data.get('time, sec', sum(walltimes))
+        events += [span(f"{data['CC model']} iterations", 'cc', clock,
+                        duration, {'iterations': len(walltimes)})]
+        iteration_start = clock
+        for iteration, walltime, residual in zip(
+                history['iteration'], walltimes, history['max residual']):
+            events += [span(f'CC iteration {iteration}', 'cc',
+                            iteration_start, walltime,
+                            {'max residual': residual})]
+            iteration_start += walltime
+        clock += duration
+
+    for eom in find_sections(xncc, 'eom'):
+        match = FORMATION_OF_H_PATTERN.match(eom['lines'][0])
+        if match is not None:
+            duration = float(match.group(1))
+            events += [span('formation of H', 'eom', clock, duration)]
+            clock += duration
+
+        for irrep in eom['sections']:
+            irrep_start = clock
+            root_events = []
+            for root_no, root in enumerate(irrep['sections']):
+                for solution in find_sections(root, 'iterative solution'):
+                    duration = solution['data'].get('time, sec')
+                    if duration is None:
+                        continue
+                    root_events += [span(
+                        f"{root['data']['model']} root {root_no}", 'eom',
+                        clock, duration, {
+                            'iterations':
+                                solution['data'].get('# iterations'),
+                            'Gflops/s': solution['data'].get('Gflops/s'),
+                        })]
+                    clock += duration
+            if len(root_events) == 0:
+                continue
+            events += [span(f"irrep {irrep['data']['#']}", 'eom',
+                            irrep_start, clock - irrep_start)]
+            events += root_events
+
+    return events
+
+
+def trace_events(programs):
+    """
+    Returns the list of trace events of `programs` found by `find_programs`
+    (and parsed, to get the phases of xncc).
+    """
+    events = []
+    clock = 0.0
+    # (end line, time where the next nested program starts) of the programs
+    # which contain the current one
+    parents = []
+    for program in sorted(programs, key=lambda program: program['start']):
+        while len(parents) > 0 and parents[-1][0] < program['start']:
+            parents.pop()
+
+        duration = program['data'].get('walltime, sec', 0.0)
+        if len(parents) > 0:
+            start = parents[-1][1]
+            parents[-1][1] += duration
+        else:
+            start = clock
+            clock += duration
+        parents += [[program['end'], start]]
+
+        args = {
+            'lines': f"{program['start']}-{program['end']}",
+            'exit status': program['data'].get('exit status'),
+        }
+        for key in ('CPU time, sec', 'wall time, sec'):
+            if key in program['data']:
+                args[key] = program['data'][key]
+        events += [span(program['name'], 'program', start, duration, args)]
+
+        if program['name'] == 'xncc':
+            events += xncc_events(program, start)
+
+    return events
+
+
+def write_trace(programs, path):
+    """ Writes the Chrome trace of `programs` to `path`. """
+    trace = {
+        'traceEvents': trace_events(programs),
+        'displayTimeUnit': 'ms',
+    }
+    with open_output(path) as output:
+        json.dump(trace, output)
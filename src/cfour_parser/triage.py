@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Triage of CFOUR jobs.
+
+Only the lines that start and end programs are looked at; no section is
+parsed. Unlike `cfour_parser.programs.find_programs` every program is
+reported, including the ones that failed, did not finish, or whose start
+and end do not match.
+
+    cfour_parser triage runs/
+
+prints one line per output
+    status    programs  failed  walltime, sec  last program  path
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os.path
+import re
+from cfour_parser.archive import DEFAULT_PATTERN
+
+BOUNDARY_PATTERN = re.compile(
+    rb'^[ \t]*--invoking executable--[^\n]*\n([^\n]*)'
+    rb'|^[ \t]*--executable (\w+) finished with status\s+(\d+)'
+    rb' in\s+(\d+\.\d+)'
+    rb'|^[ \t]*--executable[^\n]*',
+    re.MULTILINE
+)
+
+# Program states
+FINISHED = 'finished'
+FAILED = 'failed'
+UNFINISHED = 'unfinished'
+UNMATCHED = 'unmatched'
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser triage')
+    parser.add_argument('inputs', nargs='+',
+                        help='CFOUR outputs, directories, or archives.')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help='Glob matching names of CFOUR outputs in '
+                        'directories and archives.')
+    parser.add_argument('--jobs', default=1, type=int)
+    parser.add_argument('-j', '--json', default=False, action='store_true',
+                        help='Print one JSON line per output.')
+    parser.add_argument('-v', '--verbose', default=False,
+                        action='store_true',
+                        help='List all programs of every output.')
+    args = parser.parse_args(argv)
+    return args
+
+
+def triage_programs(data: bytes):
+    """
+    Finds all programs in the CFOUR output `data`. Returns a list of
+    dictionaries, in the order of the programs' starts, with
+        'name': program name (None if unknown)
+        'state': 'finished', 'failed' (non-zero exit status), 'unfinished'
+                 (no end line), or 'unmatched' (an end line without its start
+                 or a broken end line)
+        'start', 'end': line numbers (first line of output is numbered 1),
+                        None if missing
+        'depth': number of programs that were running when this one started
+        'exit status', 'walltime, sec': as reported by the end line
+    """
+    programs = list()
+    active = list()
+    line_no = 1
+    position = 0
+    for match in BOUNDARY_PATTERN.finditer(data):
+        line_no += data.count(b'\n', position, match.start())
+        position = match.start()
+
+        if match.group(1) is not None:
+            name = os.path.basename(match.group(1).strip().decode(
+                errors='replace'))
+            program = {
+                'name': name or None,
+                'state': UNFINISHED,
+                'start': line_no,
+                'end': None,
+                'depth': len(active),
+            }
+            programs += [program]
+            active += [program]
+            continue
+
+        if match.group(2) is None:
+            programs += [{
+                'name': None,
+                'state': UNMATCHED,
+                'start': None,
+                'end': line_no,
+                'depth': len(active),
+            }]
+            continue
+
+        name = match.group(2).decode()
+        names = [program['name'] for program in active]
+        if name in names:
+            # Programs started after this one never reported their ends
+            while active[-1]['name'] != name:
+                active.pop()['state'] = UNMATCHED
+            program = active.pop()
+        else:
+            program = {
+                'name': name,
+                'start': None,
+                'depth': len(active),
+            }
+            programs += [program]
+
+        exit_status = int(match.group(3))
+        program['end'] = line_no
+        program['exit status'] = exit_status
+        program['walltime, sec'] = float(match.group(4))
+        if program['start'] is None:
+            program['state'] = UNMATCHED
+        elif exit_status != 0:
+            program['state'] = FAILED
+        else:
+            program['state'] = FINISHED
+
+    return programs
+
+
+def triage_output(data: bytes):
+    """
+    Summarizes the CFOUR output `data`. Returns a dictionary with
+        'status': 'finished', 'failed', 'running', or 'broken'
+        'programs': see `triage_programs`
+        'last program': the program started last
+        'running': the innermost program without an end (None if all ended)
+        'walltime, sec': sum of walltimes of the finished top-level programs
+    """
+    programs = triage_programs(data)
+    unfinished = [program for program in programs if program['state'] ==
+                  UNFINISHED]
+    states = set(program['state'] for program in programs)
+
+    if FAILED in states:
+        status = FAILED
+    elif UNMATCHED in states:
+        status = 'broken'
+    elif len(unfinished) > 0:
+        status = 'running'
+    else:
+        status = FINISHED
+
+    started = [program for program in programs if program['start'] is not
+               None]
+    # Nested programs are already counted in the walltime of their parents
+    walltime = sum(program.get('walltime, sec', 0.0) for program in
+                   programs if program['depth'] == 0)
+    summary = {
+        'status': status,
+        'programs': programs,
+        'last program': started[-1] if len(started) > 0 else None,
+        'running': unfinished[-1] if len(unfinished) > 0 else None,
+        'walltime, sec': walltime,
+    }
+    return summary
+
+
+def triage_source(source):
+    """ Triage of one source of `cfour_parser.batch.collect_sources`. """
+    from cfour_parser.batch import load_source
+
+    summary = {
+        'path': source['path'],
+        'member': source['member'],
+    }
+    try:
+        summary.update(triage_output(load_source(source)))
+    except Exception as error:
+        summary['status'] = 'error'
+        summary['error'] = f'{type(error).__name__}: {error}'
+    return summary
+
+
+def triage_sources(sources, jobs: int = 1):
+    """ Yields triage summaries of `sources` in their order. """
+    from cfour_parser.batch import map_in_order
+
+    if jobs == 1:
+        yield from map(triage_source, sources)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+        yield from map_in_order(pool, triage_source, sources, 4 * jobs)
+
+
+def str_triage_row(summary):
+    """ One line of the triage table. """
+    name = summary['path']
+    if summary['member'] is not None:
+        name += f":{summary['member']}"
+
+    if 'error' in summary:
+        return f"{'error':10s}{'':34s}{name}: {summary['error']}"
+
+    programs = summary['programs']
+    n_failed = len([program for program in programs if program['state'] ==
+                    FAILED])
+    last = summary['running'] or summary['last program']
+    last_name = '-' if last is None else str(last['name'])
+    row = f"{summary['status']:10s}{len(programs):4d}{n_failed:4d}"
+    row += f"{summary['walltime, sec']:12.1f}  {last_name:12s}{name}"
+    return row
+
+
+def str_triage_programs(summary):
+    """ Lines listing every program of an output. """
+    rows = list()
+    for program in summary.get('programs', list()):
+        start = '-' if program['start'] is None else program['start']
+        end = '-' if program['end'] is None else program['end']
+        row = f"{'':10s}{start:>7} -- {end:>7}: {str(program['name']):12s}"
+        row += f"{program['state']:11s}"
+        if 'walltime, sec' in program:
+            row += f"{program['walltime, sec']:10.2f} sec, status "
+            row += f"{program['exit status']}"
+        rows += [row]
+    return rows
+
+
+def main(argv=None):
+    from cfour_parser.batch import collect_sources, expand_sources
+
+    args = get_args(argv)
+    sources = expand_sources(collect_sources(args.inputs, args.pattern),
+                             args.pattern)
+
+    if args.json is False:
+        print(f"{'status':10s}{'#':>4s}{'bad':>4s}{'walltime, s':>12s}  "
+              f"{'last':12s}output")
+    for summary in triage_sources(sources, args.jobs):
+        if args.json is True:
+            print(json.dumps(summary))
+            continue
+        print(str_triage_row(summary))
+        if args.verbose is True:
+            for row in str_triage_programs(summary):
+                print(row)
+
+
+if __name__ == "__main__":
+    main()
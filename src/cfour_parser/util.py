@@ -1,6 +1,38 @@
+import contextlib
+import contextvars
 import re
 import sys
 
+# The list collecting the diagnostics of the parsers in the current context,
+# see `collect_diagnostics`
+_diagnostics = contextvars.ContextVar('diagnostics', default=None)
+
+
+def warn(message: str):
+    """
+    Reports a problem met while parsing: to the list of the enclosing
+    `collect_diagnostics`, or to stderr outside of one.
+    """
+    diagnostics = _diagnostics.get()
+    if diagnostics is None:
+        print(message, file=sys.stderr)
+    else:
+        diagnostics.append(message)
+
+
+@contextlib.contextmanager
+def collect_diagnostics():
+    """
+    Collects the `warn`ings of the parsers called inside of the `with` block
+    into the list it yields. Every thread and task collects its own.
+    """
+    diagnostics = []
+    token = _diagnostics.set(diagnostics)
+    try:
+        yield diagnostics
+    finally:
+        _diagnostics.reset(token)
+
 
 def skip_to(what: str, lines, ln: int):
     """ Skip to the line that matches `what`.
@@ -41,8 +73,8 @@ def skip_to_empty_line(lines, ln: int):
             break
         ln += 1
         if ln >= len(lines):
-            print("Error in parsing eom roots in xncc", file=sys.stderr)
-            print("Did not find an empty line", file=sys.stderr)
+            warn("Error in parsing eom roots in xncc\n"
+                 "Did not find an empty line")
             break
 
     return ln
@@ -54,3 +86,33 @@ def fortran_float_to_float(frtr: str):
 
 class ParsingError(Exception):
     pass
+
+
+def find_sections(section, name: str):
+    """
+    Returns all subsections of `section`, at any depth, called `name` in the
+    order they appear in the output.
+    """
+    found = []
+    for subsection in section.get('sections', []):
+        if subsection['name'] == name:
+            found += [subsection]
+        found += find_sections(subsection, name)
+    return found
+
+
+def find_catches(lines, highlights):
+    """
+    Returns a catch for every line of `lines` matched by one of the
+    `highlights`: a copy of the first highlight which matched with the
+    'line' number and the 'match' added.
+    """
+    catches = list()
+    for ln, line in enumerate(lines):
+        for highlight in highlights:
+            match = highlight['pattern'].match(line)
+            if match is None:
+                continue
+            catches += [dict(highlight, line=ln, match=match)]
+            break
+    return catches
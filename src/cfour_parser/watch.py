@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Watching directories for finished CFOUR jobs.
+
+    cfour_parser watch runs/ --journal runs.journal --db results.sqlite
+
+Every `--interval` seconds the directories are walked and the outputs are
+`stat`ed. An output is considered finished when it did not change for
+`--settle` seconds and its last line marking a program is a
+`--executable ... finished` line (see `cfour_parser.tail`); the pause guards
+against the gap between two programs of a running job. Finished outputs are
+parsed in a pool of processes and the records (see `cfour_parser.batch`) go
+to the sinks
+    --jsonl FILE    appended as lines of JSON
+    --db FILE       the results store of `cfour_parser ingest`
+    --npz DIR       columnar tables (see `cfour_parser.export`) in
+                    DIR/<sha256>/
+Every handled output is appended to the journal together with its size and
+modification time. After a restart outputs whose size and modification time
+match the journal are skipped; changed ones are parsed again.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+import time
+from cfour_parser.archive import DEFAULT_PATTERN
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(prog='cfour_parser watch')
+    parser.add_argument('directories', nargs='+',
+                        help='Directories with CFOUR outputs.')
+    parser.add_argument('--journal', required=True,
+                        help='File recording the handled outputs.')
+    parser.add_argument('--jsonl', default=None,
+                        help='Append records to this JSON lines file.')
+    parser.add_argument('--db', default=None,
+                        help='Store records in this results store.')
+    parser.add_argument('--npz', default=None,
+                        help='Export records as npz tables into this '
+                        'directory.')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN,
+                        help='Glob matching names of CFOUR outputs.')
+    parser.add_argument('--jobs', default=1, type=int,
+                        help='Number of parsing processes.')
+    parser.add_argument('--interval', default=60.0, type=float,
+                        help='Seconds between two walks of the directories.')
+    parser.add_argument('--settle', default=120.0, type=float,
+                        help='Seconds an output must stay unchanged to be '
+                        'considered finished.')
+    parser.add_argument('--once', default=False, action='store_true',
+                        help='Handle the outputs finished by now and exit.')
+    args = parser.parse_args(argv)
+    if args.jsonl is None and args.db is None and args.npz is None:
+        parser.error("give at least one of --jsonl, --db, --npz")
+    return args
+
+
+class JsonlSink:
+    def __init__(self, path):
+        self.output = open(path, 'a')
+
+    def write(self, record):
+        self.output.write(json.dumps(record) + '\n')
+        self.output.flush()
+
+    def close(self):
+        self.output.close()
+
+
+class StoreSink:
+    def __init__(self, path):
+        from cfour_parser.store import connect
+        self.connection = connect(path)
+
+    def write(self, record):
+        from cfour_parser.store import store_record
+        store_record(self.connection, record)
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class NpzSink:
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, record):
+        from cfour_parser.export import add_run, collect_tables, write_tables
+        tables = collect_tables(record['programs'])
+        add_run(tables, 0, record['path'], record['member'],
+                record['sha256'])
+        write_tables(tables, os.path.join(self.directory, record['sha256']),
+                     'npz')
+
+    def close(self):
+        pass
+
+
+def open_sinks(args):
+    sinks = []
+    if args.jsonl is not None:
+        sinks += [JsonlSink(args.jsonl)]
+    if args.db is not None:
+        sinks += [StoreSink(args.db)]
+    if args.npz is not None:
+        sinks += [NpzSink(args.npz)]
+    return sinks
+
+
+def file_state(path):
+    """ (size, modification time) of `path`. """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def read_journal(path):
+    """ Returns {output path: its last journal entry}. """
+    journal = dict()
+    if not os.path.exists(path):
+        return journal
+    with open(path) as entries:
+        for line in entries:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash
+                continue
+            journal[entry['path']] = entry
+    return journal
+
+
+def is_finished(path):
+    """ True if the last program of the output `path` has finished. """
+    from cfour_parser.tail import scan_tail
+
+    found = scan_tail(path, ['last program'])
+    return 'last program' in found and found['last program']['running'] is \
+        False
+
+
+class Watcher:
+    """
+    Decides which outputs are finished and not yet handled. `seen` maps
+    outputs to (size, modification time, time when this state was first
+    seen).
+    """
+
+    def __init__(self, journal_path, settle: float = 120.0):
+        self.journal_path = journal_path
+        self.journal = read_journal(journal_path)
+        self.settle = settle
+        self.seen = dict()
+
+    def finished_outputs(self, directories, pattern: str = DEFAULT_PATTERN,
+                         now=None):
+        """ Returns the outputs which are ready to be parsed. """
+        from cfour_parser.batch import collect_sources
+
+        now = time.monotonic() if now is None else now
+        ready = []
+        for source in collect_sources(directories, pattern):
+            if source['kind'] != 'file':
+                continue
+            path = source['path']
+            try:
+                size, mtime = file_state(path)
+            except OSError:
+                continue
+
+            entry = self.journal.get(path)
+            if entry is not None and entry['size'] == size and \
+                    entry['mtime_ns'] == mtime:
+                continue
+
+            previous = self.seen.get(path)
+            if previous is None or previous[:2] != (size, mtime):
+                self.seen[path] = (size, mtime, now)
+                if self.settle > 0:
+                    continue
+            elif now - previous[2] < self.settle:
+                continue
+
+            if is_finished(path):
+                ready += [path]
+        return ready
+
+    def record(self, path, size, mtime, status, sha256=None):
+        """ Appends an entry for `path` to the journal. """
+        entry = {
+            'path': path,
+            'size': size,
+            'mtime_ns': mtime,
+            'status': status,
+            'sha256': sha256,
+            'time': time.time(),
+        }
+        with open(self.journal_path, 'a') as journal:
+            journal.write(json.dumps(entry) + '\n')
+        self.journal[path] = entry
+        self.seen.pop(path, None)
+
+
+def parse_output(path):
+    """ Parses `path` in a worker; returns its state and the record. """
+    from cfour_parser.batch import file_source, parse_source
+
+    size, mtime = file_state(path)
+    return size, mtime, parse_source(file_source(path))
+
+
+def handle_outputs(watcher, paths, sinks, pool=None):
+    """
+    Parses the finished `paths`, hands the records to the `sinks`, and
+    journals them. Returns the number of outputs handled.
+    """
+    from cfour_parser.batch import print_warnings
+
+    if pool is None:
+        results = map(parse_output, paths)
+    else:
+        results = pool.map(parse_output, paths)
+
+    n_handled = 0
+    for path, (size, mtime, record) in zip(paths, results):
+        print_warnings(record)
+        if 'error' in record:
+            print(f"Error in parsing {path}: {record['error']}",
+                  file=sys.stderr)
+            watcher.record(path, size, mtime, 'error')
+            continue
+        for sink in sinks:
+            sink.write(record)
+        watcher.record(path, size, mtime, 'ingested', record['sha256'])
+        n_handled += 1
+    return n_handled
+
+
+def main(argv=None):
+    args = get_args(argv)
+    watcher = Watcher(args.journal, 0.0 if args.once else args.settle)
+    sinks = open_sinks(args)
+    pool = None
+    if args.jobs > 1:
+        pool = concurrent.futures.ProcessPoolExecutor(args.jobs)
+    try:
+        while True:
+            paths = watcher.finished_outputs(args.directories, args.pattern)
+            n_handled = handle_outputs(watcher, paths, sinks, pool)
+            if n_handled > 0:
+                print(f"Handled {n_handled} finished outputs.",
+                      file=sys.stderr)
+            if args.once is True:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        for sink in sinks:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
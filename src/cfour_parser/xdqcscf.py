@@ -3,8 +3,11 @@
 import argparse
 import json
 import re
+from cfour_parser.compression import open_input
+from cfour_parser.memo import freeze
 from cfour_parser.programs import find_programs
 from cfour_parser.text import FLOAT, pretty_introduce_section
+from cfour_parser.util import find_catches
 from cfour_parser.xvscf import parse_MOs_listing
 
 
@@ -17,6 +20,28 @@ def get_args():
     return args
 
 
+XDQCSCF_HIGHLIGHTS = freeze([
+    {
+        'pattern': re.compile(r'\s*E\(SCF\) =\s+' + FLOAT),
+        'name': 'energy',
+        'type': 'oneline',
+    },
+    # WARNING: This is almost the same as in xvscf EXCPET that the last few
+    # digists of the 1H are different!
+    {
+        'pattern': re.compile(
+            r'\s*ORBITAL EIGENVALUES \(ALPHA\)  \(1H = 27.2113834 eV\)'
+        ),
+        'name': 'MOs',
+        'type': 'start',
+    },
+    # {'pattern': re.compile(r''),
+    #  'name': '',
+    #  'type': '',
+    #  },
+])
+
+
 def cool_lines_in_xdqcscf(xdqcscf):
     """
     First step on the way of parsing this section of the CFOUR's output.
@@ -25,43 +50,7 @@ def cool_lines_in_xdqcscf(xdqcscf):
     if xdqcscf['name'] != 'xdqcscf':
         return
 
-    highlights = [
-        {
-            'pattern': re.compile(r'\s*E\(SCF\) =\s+' + FLOAT),
-            'name': 'energy',
-            'type': 'oneline',
-        },
-        # WARNING: This is almost the same as in xvscf EXCPET that the last few
-        # digists of the 1H are different!
-        {
-            'pattern': re.compile(
-                r'\s*ORBITAL EIGENVALUES \(ALPHA\)  \(1H = 27.2113834 eV\)'
-            ),
-            'name': 'MOs',
-            'type': 'start',
-        },
-        # {'pattern': re.compile(r''),
-        #  'name': '',
-        #  'type': '',
-        #  },
-    ]
-
-    catches = list()
-    for ln, line in enumerate(xdqcscf['lines']):
-        for highlight in highlights:
-            pattern = highlight['pattern']
-            match = pattern.match(line)
-            if match is None:
-                continue
-            data = {
-                'line': ln,
-                'match': match,
-            }
-            data.update(highlight)
-            catches += [data]
-            break
-
-    return catches
+    return find_catches(xdqcscf['lines'], XDQCSCF_HIGHLIGHTS)
 
 
 def turn_xdqcscf_catches_into_sections_and_data(catches, xdqcscf):
@@ -98,7 +87,7 @@ def parse_xdqcscf_program(xdqcscf):
 
 def main():
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
     for program in programs:
@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 
 import argparse
-import sys
 import json
 import re
-from cfour_parser.util import skip_to
+from cfour_parser.util import find_catches, skip_to, warn
+from cfour_parser.compression import open_input
+from cfour_parser.memo import freeze, parse_section
 from cfour_parser.programs import find_programs
 from cfour_parser.text import pretty_introduce_section
 
@@ -18,6 +19,39 @@ def get_args():
     return args
 
 
+XJODA_HIGHLIGHTS = freeze([
+    {'pattern': re.compile(r'\s*CFOUR Control Parameters'),
+     'name': 'control parameters',
+     'type': 'start',
+     },
+    {'pattern': re.compile(
+        r'\s*The full molecular point group is\s+([a-zA-Z0-9]+)\s*\.'),
+     'name': 'point group',
+     'type': 'start',
+     },
+    {'pattern': re.compile(r'\s*Coordinates used in calculation \(QCOMP\)'),
+     'name': 'qcomp',
+     'type': 'start',
+     },
+    {'pattern': re.compile(r'\s*Normal Coordinate Gradient'),
+     'name': 'normal coordinate gradient',
+     'type': 'start',
+     },
+    {'pattern': re.compile(r'\s*Normal Coordinates'),
+     'name': 'normal coordinates',
+     'type': 'start',
+     },
+    {'pattern': re.compile(r'\s*current gradient vector'),
+     'name': 'cartesian gradient',
+     'type': 'start',
+     },
+    # {'pattern': re.compile(r''),
+    #  'name': '',
+    #  'type': '',
+    #  },
+])
+
+
 def cool_lines_in_xjoda(xjoda):
     """
     First step on the way of parsing xjoda section of the CFOUR's output.
@@ -26,54 +60,7 @@ def cool_lines_in_xjoda(xjoda):
     if xjoda['name'] != 'xjoda':
         return
 
-    highlights = [
-        {'pattern': re.compile(r'\s*CFOUR Control Parameters'),
-         'name': 'control parameters',
-         'type': 'start',
-         },
-        {'pattern': re.compile(
-            r'\s*The full molecular point group is\s+([a-zA-Z0-9]+)\s*\.'),
-         'name': 'point group',
-         'type': 'start',
-         },
-        {'pattern': re.compile(r'\s*Coordinates used in calculation \(QCOMP\)'),
-         'name': 'qcomp',
-         'type': 'start',
-         },
-        {'pattern': re.compile(r'\s*Normal Coordinate Gradient'),
-         'name': 'normal coordinate gradient',
-         'type': 'start',
-         },
-        {'pattern': re.compile(r'\s*Normal Coordinates'),
-         'name': 'normal coordinates',
-         'type': 'start',
-         },
-        {'pattern': re.compile(r'\s*current gradient vector'),
-         'name': 'cartesian gradient',
-         'type': 'start',
-         },
-        # {'pattern': re.compile(r''),
-        #  'name': '',
-        #  'type': '',
-        #  },
-    ]
-
-    catches = list()
-    for ln, line in enumerate(xjoda['lines']):
-        for highlight in highlights:
-            pattern = highlight['pattern']
-            match = pattern.match(line)
-            if match is None:
-                continue
-            data = {
-                'line': ln,
-                'match': match,
-            }
-            data.update(highlight)
-            catches += [data]
-            break
-
-    return catches
+    return find_catches(xjoda['lines'], XJODA_HIGHLIGHTS)
 
 
 def xjoda_catch2sec_point_group(catch, lines, start_offset):
@@ -82,8 +69,7 @@ def xjoda_catch2sec_point_group(catch, lines, start_offset):
     start = catch['line']
     if lines[start-1] != lines[start+3] != THE_LINE:
         oll_korrect = False
-        print(f"Error in parsing the '{catch['name']}' section of xjoda",
-              file=sys.stderr)
+        warn(f"Error in parsing the '{catch['name']}' section of xjoda")
 
     cp = {
         'name': catch['name'],
@@ -109,8 +95,7 @@ def xjoda_catch2sec_control_pars(catch, lines, start_offset):
     start = catch['line']
     if lines[start-1] != lines[start+1] != lines[start+4] != THE_LINE:
         oll_korrect = False
-        print(f"Error in parsing the '{catch['name']}' section of xjoda",
-              file=sys.stderr)
+        warn(f"Error in parsing the '{catch['name']}' section of xjoda")
 
     end = skip_to(THE_LINE, lines, start+5)
 
@@ -135,8 +120,7 @@ def xjoda_catch2sec_qcomp(catch, lines, start_offset):
     start = catch['line']
     if lines[start-1] != lines[start+1] != lines[start+4] != THE_LINE:
         oll_korrect = False
-        print(f"Error in parsing the '{catch['name']}' section of xjoda.",
-              file=sys.stderr)
+        warn(f"Error in parsing the '{catch['name']}' section of xjoda.")
 
     end = skip_to(THE_LINE, lines, start+5)
 
@@ -161,8 +145,7 @@ def xjoda_catch2sec_normal_coordinate_gradient(catch, lines, start_offset):
     start = catch['line']
     if lines[start+1] != lines[start+4] != THE_LINE:
         oll_korrect = False
-        print(f"Error in parsing the {catch['name']} section of xjoda.",
-              file=sys.stderr)
+        warn(f"Error in parsing the {catch['name']} section of xjoda.")
 
     end = skip_to(THE_LINE, lines, start+5)
 
@@ -300,9 +283,9 @@ def parse_point_group(section):
         lines[0]
     )
     if match_full_group is None:
-        print(
+        warn(
             "Error: the full molecular point group is not detected in line:\n\t"
-            f"{lines[0][:-1]}", file=sys.stderr
+            f"{lines[0][:-1]}"
         )
         section['metadata']['ok'] = False
     else:
@@ -314,9 +297,9 @@ def parse_point_group(section):
         lines[1]
     )
     if match_largest_abelian_group is None:
-        print(
+        warn(
             "Error: the largest abelian subgroup is not detected in line:\n\t"
-            f"{lines[1][:-1]}", file=sys.stderr
+            f"{lines[1][:-1]}"
         )
         section['metadata']['ok'] = False
     else:
@@ -328,9 +311,9 @@ def parse_point_group(section):
         lines[2]
     )
     if match_comp_group is None:
-        print(
+        warn(
             "Error: the computational point group is missing in line:\n\t"
-            f"{lines[2][:-1]}", file=sys.stderr
+            f"{lines[2][:-1]}"
         )
         section['metadata']['ok'] = False
     else:
@@ -568,7 +551,7 @@ def parse_xjoda_sections(xjoda):
         name = section['name']
         if name in parsers:
             parse = parsers[name]
-            parse(section)
+            parse_section(parse, section)
 
 
 def parse_xjoda_program(xjoda):
@@ -583,7 +566,7 @@ def parse_xjoda_program(xjoda):
 
 def main():
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
     for xjoda in programs:
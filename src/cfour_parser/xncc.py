@@ -1,24 +1,122 @@
 #!/usr/bin/env python3
 
 import argparse
-import sys
 import json
+import math
 import re
-from cfour_parser.util import skip_to, skip_to_re, skip_to_empty_line
+from cfour_parser.util import skip_to, skip_to_re, skip_to_empty_line, \
+    find_catches, find_sections, warn
+from cfour_parser.compression import open_input
+from cfour_parser.memo import freeze, parse_section
 from cfour_parser.programs import find_programs
 from cfour_parser.text import FLOAT, INT, FLOAT_WS, INT_WS, \
     pretty_introduce_section
 
+# CFOUR's default CC_CONV=7 (the largest residual must drop below 1e-7)
+DEFAULT_CC_CONV = 1e-7
+
+CC_CONV_PATTERN = re.compile(r'\s*CC_CONV\s+ICCCNV\s+(10D-\s*\d+)')
+
+EOM_CONVERGED_PATTERN = re.compile(
+    r'EOMEE-CCSDT?Q? iterations converged in' + INT_WS + r'cycles and'
+    + FLOAT_WS + r'seconds \(' + FLOAT_WS + r's/it.\) at' + FLOAT_WS
+    + r'Gflops/sec')
+
+# Sizes printed by xncc
+MEMORY_UNITS = {
+    'B': 1,
+    'KiB': 1024,
+    'MiB': 1024**2,
+    'GiB': 1024**3,
+    'TiB': 1024**4,
+}
+MEMORY_UNIT = r'(' + '|'.join(MEMORY_UNITS) + r')'
+SIZE = r'(\d+(?:\.\d+)?)\s+' + MEMORY_UNIT
+
+MEMORY_REQUIREMENTS = {
+    'Memory limit': 'limit',
+    'Minimum memory requirement': 'minimum',
+    'Compromise memory amount': 'compromise',
+    'Optimal memory requirement': 'optimal',
+}
+MEMORY_REQUIREMENT_PATTERN = re.compile(
+    r'(' + '|'.join(MEMORY_REQUIREMENTS) + r'):\s*' + SIZE)
+MEMORY_LIST_PATTERN = re.compile(
+    r'\s*(\S.*?)\s+(\S+)\s+' + SIZE + r'\s+(Yes|No)\s+(\d+|-)\s+' + SIZE
+    + r'\s*$')
+MEMORY_TIME_PATTERN = re.compile(
+    r'Simulation and memory analysis took' + FLOAT_WS + 'seconds')
+
+ITERATION_HEADER = re.compile(
+    r'\s*It\.\s+Correlation Energy((?:\s+\w+ Residual)+)'
+    r'\s+CPU Time \(s\)\s+Walltime \(s\)')
+
+ITERATION_ROW = re.compile(
+    r'\s*(\d+)\s+' + FLOAT + r'((?:\s+\d+\.\d+[eE][+-]?\d+)+)\s+' + FLOAT
+    + r'\s+' + FLOAT + r'\s*$')
+
 
 def get_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('cfour_output', help='CFOUR output.')
+    parser.add_argument('-p', '--progress', default=False,
+                        action='store_true',
+                        help='Project the convergence of the last CC, also '
+                        'of a running xncc.')
+    parser.add_argument('-m', '--capacity', default=False,
+                        action='store_true',
+                        help='Print the predicted memory and disk I/O next '
+                        'to the observed cost.')
+    parser.add_argument('-c', '--eom-cost', default=False,
+                        action='store_true',
+                        help='Print the cost of EOM roots per model and '
+                        'irrep.')
     parser.add_argument('-j', '--json', default=False, action='store_true')
     parser.add_argument('-v', '--verbose', default=False, action='store_true')
     args = parser.parse_args()
     return args
 
 
+XNCC_HIGHLIGHTS = freeze([
+    {'pattern': re.compile(r'Memory limit:' + FLOAT_WS + MEMORY_UNIT),
+        'name': 'mem',
+        'type': 'start',
+     },
+    {'pattern': re.compile(
+        'Simulation and memory analysis took' + FLOAT_WS + 'seconds'),
+        'name': 'mem',
+        'type': 'end',
+     },
+    {'pattern': re.compile(r'MP2 correlation energy:' + FLOAT_WS),
+        'name': 'mp2',
+        'type': 'start',
+     },
+    {'pattern': re.compile(r'Total MP2 energy:' + FLOAT_WS),
+     'name': 'mp2',
+     'type': 'end',
+     },
+    {'pattern': re.compile(
+        r'Beginning iterative solution of (CCSD|CCSDT|CCSDTQ) equations:'),
+     'name': 'cc',
+     'type': 'start',
+     },
+    {'pattern': re.compile(r'Total CC(?:SD|SDT|SDTQ) energy:' + FLOAT_WS),
+     'name': 'cc',
+     'type': 'end',
+     },
+    {'pattern': re.compile(r'Formation of H took' + FLOAT_WS + 'seconds at'
+                           + FLOAT_WS + 'Gflops/sec'),
+
+     'name': 'eom',
+     'type': 'start',
+     },
+    # {'pattern': re.compile(r''),
+    #  'name': '',
+    #  'type': '',
+    #  },
+])
+
+
 def cool_lines_in_xncc(xncc):
     """
     First step on the way of parsing xncc section of the CFOUR's output.
@@ -27,57 +125,100 @@ def cool_lines_in_xncc(xncc):
     if xncc['name'] != 'xncc':
         return
 
-    highlights = [
-        {'pattern': re.compile(
-            'Simulation and memory analysis took' + FLOAT_WS + 'seconds'),
-            'name': 'mem',
-            'type': 'end',
-         },
-        {'pattern': re.compile(r'MP2 correlation energy:' + FLOAT_WS),
-            'name': 'mp2',
-            'type': 'start',
-         },
-        {'pattern': re.compile(r'Total MP2 energy:' + FLOAT_WS),
-         'name': 'mp2',
-         'type': 'end',
-         },
-        {'pattern': re.compile(
-            r'Beginning iterative solution of (CCSD|CCSDT|CCSDTQ) equations:'),
-         'name': 'cc',
-         'type': 'start',
-         },
-        {'pattern': re.compile(r'Total CC(?:SD|SDT|SDTQ) energy:' + FLOAT_WS),
-         'name': 'cc',
-         'type': 'end',
-         },
-        {'pattern': re.compile(r'Formation of H took' + FLOAT_WS + 'seconds at'
-                               + FLOAT_WS + 'Gflops/sec'),
-
-         'name': 'eom',
-         'type': 'start',
-         },
-        # {'pattern': re.compile(r''),
-        #  'name': '',
-        #  'type': '',
-        #  },
-    ]
-
-    catches = list()
-    for ln, line in enumerate(xncc['lines']):
-        for highlight in highlights:
-            pattern = highlight['pattern']
-            match = pattern.match(line)
-            if match is None:
-                continue
-            data = {
-                'line': ln,
-                'match': match,
-            }
-            data.update(highlight)
-            catches += [data]
-            break
+    return find_catches(xncc['lines'], XNCC_HIGHLIGHTS)
+
+
+def get_memory_lines_from_xncc(xncc, catches):
+    """
+    Returns the memory analysis of xncc as a section or None if the xncc has
+    none.
+    """
+    mem_start_ln = None
+    mem_end_ln = None
+    for catch in catches:
+        if catch['name'] != 'mem':
+            continue
+        if catch['type'] == 'start':
+            mem_start_ln = catch['line']
+        elif mem_start_ln is not None:
+            mem_end_ln = catch['line']
+
+    if mem_start_ln is None or mem_end_ln is None:
+        return None
+
+    memory_section = {
+        'name': 'memory analysis',
+        'start': xncc['start'] + mem_start_ln,
+        'end': xncc['start'] + mem_end_ln,
+        'lines': xncc['lines'][mem_start_ln:mem_end_ln+1],
+        'sections': list(),
+        'data': dict(),
+    }
+    return memory_section
+
+
+def to_gib(size: str, unit: str):
+    return float(size) * MEMORY_UNITS[unit] / MEMORY_UNITS['GiB']
+
+
+def parse_xncc_memory_analysis(memory):
+    """
+    Parser of the memory analysis which xncc prints before the CC:
+
+Memory limit:                953.674 GiB
+Minimum memory requirement:    1.279 GiB
+Compromise memory amount:   1165.915 GiB
+Optimal memory requirement: 1187.649 GiB
+
+List              Location   Size        Cached Hunks Est. Disk I/O
+----------------- ---------- ----------- ------ ----- -------------
+
+           HR_DAV      470:1  661.088 MiB    Yes     -   104.372 GiB
+...
+Simulation and memory analysis took 632.401 seconds
+
+    All sizes are in GiB. Adds to 'data'
+        'memory, GiB': {'limit', 'minimum', 'compromise', 'optimal'}
+        'lists': [{'name', 'location', 'size, GiB', 'cached',
+                   'hunks' (None if not split), 'disk I/O, GiB'}]
+        'disk I/O, GiB': estimated disk I/O of all lists
+        'uncached lists': number of lists which do not fit in memory
+        'simulation time, sec'
+    """
+    data = memory['data']
+    memory_gib = dict()
+    lists = list()
+    for line in memory['lines']:
+        requirement_match = MEMORY_REQUIREMENT_PATTERN.match(line)
+        if requirement_match is not None:
+            kind = MEMORY_REQUIREMENTS[requirement_match.group(1)]
+            memory_gib[kind] = to_gib(requirement_match.group(2),
+                                      requirement_match.group(3))
+            continue
 
-    return catches
+        list_match = MEMORY_LIST_PATTERN.match(line)
+        if list_match is not None:
+            hunks = list_match.group(6)
+            lists += [{
+                'name': list_match.group(1),
+                'location': list_match.group(2),
+                'size, GiB': to_gib(list_match.group(3), list_match.group(4)),
+                'cached': list_match.group(5) == 'Yes',
+                'hunks': None if hunks == '-' else int(hunks),
+                'disk I/O, GiB': to_gib(list_match.group(7),
+                                        list_match.group(8)),
+            }]
+            continue
+
+        time_match = MEMORY_TIME_PATTERN.match(line)
+        if time_match is not None:
+            data['simulation time, sec'] = float(time_match.group(1))
+
+    data['memory, GiB'] = memory_gib
+    data['lists'] = lists
+    data['disk I/O, GiB'] = sum(entry['disk I/O, GiB'] for entry in lists)
+    data['uncached lists'] = len([entry for entry in lists if
+                                  entry['cached'] is False])
 
 
 def get_cc_lines_from_xncc(xncc, catches):
@@ -110,17 +251,17 @@ def get_cc_lines_from_xncc(xncc, catches):
                     },
                 }
                 continue
-            print("Warrning unrecognized CC header in xncc\n"
-                  f"{catch=}", file=sys.stderr)
+            warn("Warrning unrecognized CC header in xncc\n"
+                 f"{catch=}")
 
     if cc_start_ln is None:
-        print("Warning! No beginning of the CC section found in xncc",
-              file=sys.stderr)
+        warn("Warning! No beginning of the CC section found in xncc")
         return
 
     if cc_end_ln is None:
-        print("Error! Problem in parsing CC of xncc.", file=sys.stderr)
-        pass
+        # Most likely the CC iterations are still running
+        warn("Warning! No end of the CC section found in xncc.")
+        cc_end_ln = len(xncc['lines']) - 1
 
     cc_section = {
         'name': 'cc',
@@ -134,8 +275,152 @@ def get_cc_lines_from_xncc(xncc, catches):
     return cc_section
 
 
-def parse_xncc_cc(xncc_cc):
-    """ The CC section of the xncc program. """
+def parse_iteration_tables(lines):
+    """
+    Collects the rows of all tables of iterations, CC or EOM, in `lines`:
+It.  Correlation Energy T1 Residual T2 Residual T3 Residual CPU Time (s) Walltime (s)
+-------------------------------------------------------------------------------------
+  1  -1.187951465952140 2.64706e-03 1.64084e-02 1.63674e-03     1450.845      153.584
+    Returns None if there is no table or the columns
+        'iteration': list of ints
+        'correlation energy': list of floats
+        'energy change': difference to the previous iteration (None first)
+        'residuals': {'T1': list of floats, 'T2': ...}
+        'max residual': largest residual of every iteration
+        'CPU time, sec', 'walltime, sec': time of every iteration
+    """
+    history = None
+    in_table = False
+    for line in lines:
+        header_match = ITERATION_HEADER.match(line)
+        if header_match is not None:
+            names = header_match.group(1).replace('Residual', '').split()
+            if history is None:
+                history = {
+                    'iteration': list(),
+                    'correlation energy': list(),
+                    'energy change': list(),
+                    'residuals': {name: list() for name in names},
+                    'max residual': list(),
+                    'CPU time, sec': list(),
+                    'walltime, sec': list(),
+                }
+            in_table = True
+            continue
+
+        if in_table is False:
+            continue
+
+        if line.strip() == '':
+            in_table = False
+            continue
+
+        # Lines like "Locking on root: ..." are skipped
+        row_match = ITERATION_ROW.match(line)
+        if row_match is None:
+            continue
+
+        residuals = [float(residual) for residual in
+                     row_match.group(3).split()]
+        if len(residuals) != len(history['residuals']):
+            continue
+
+        energy = float(row_match.group(2))
+        energies = history['correlation energy']
+        change = None if len(energies) == 0 else energy - energies[-1]
+        history['iteration'] += [int(row_match.group(1))]
+        history['correlation energy'] += [energy]
+        history['energy change'] += [change]
+        for name, residual in zip(history['residuals'], residuals):
+            history['residuals'][name] += [residual]
+        history['max residual'] += [max(residuals)]
+        history['CPU time, sec'] += [float(row_match.group(4))]
+        history['walltime, sec'] += [float(row_match.group(5))]
+
+    return history
+
+
+def fit_convergence_rate(residuals, window: int = 5):
+    """
+    Least squares slope of log10 of the last `window` `residuals`, i.e.,
+    orders of magnitude gained per iteration (negative when converging).
+    Returns None for less than two positive residuals.
+    """
+    points = [(x, math.log10(residual)) for x, residual in
+              enumerate(residuals[-window:]) if residual > 0.0]
+    if len(points) < 2:
+        return None
+
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    sxx = sum((x - mean_x)**2 for x, _ in points)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    return sxy / sxx
+
+
+def project_convergence(history, threshold: float = DEFAULT_CC_CONV,
+                        window: int = 5):
+    """
+    Extrapolates the `history` of `parse_iteration_tables` to the iteration
+    where the largest residual drops below `threshold`. Returns
+        'threshold': `threshold`
+        'converged': True if the last residual is below the threshold
+        'rate, log10/it': see `fit_convergence_rate`
+        'remaining iterations': None if the residuals do not decrease
+        'remaining walltime, sec': based on the last `window` iterations
+    """
+    residuals = history['max residual']
+    walltimes = history['walltime, sec'][-window:]
+    rate = fit_convergence_rate(residuals, window)
+    projection = {
+        'threshold': threshold,
+        'converged': len(residuals) > 0 and residuals[-1] < threshold,
+        'rate, log10/it': rate,
+        'remaining iterations': None,
+        'remaining walltime, sec': None,
+    }
+
+    if projection['converged'] is True:
+        projection['remaining iterations'] = 0
+        projection['remaining walltime, sec'] = 0.0
+    elif rate is not None and rate < 0.0:
+        gap = math.log10(threshold) - math.log10(residuals[-1])
+        remaining = max(1, math.ceil(gap / rate))
+        projection['remaining iterations'] = remaining
+        projection['remaining walltime, sec'] = \
+            remaining * sum(walltimes) / len(walltimes)
+
+    return projection
+
+
+def cc_conv_threshold(value: str):
+    """ Turns CC_CONV of xjoda's control parameters, e.g., '10D-  7'. """
+    match = re.match(r'\s*10D-\s*(\d+)', value)
+    if match is None:
+        return DEFAULT_CC_CONV
+    return 10.0**(-int(match.group(1)))
+
+
+def job_cc_conv(programs, xncc):
+    """ CC_CONV set by the xjoda runs of `programs` before `xncc`. """
+    threshold = DEFAULT_CC_CONV
+    for program in programs:
+        if program['start'] >= xncc['start']:
+            break
+        if program['name'] != 'xjoda':
+            continue
+        for line in program['lines']:
+            cc_conv_match = CC_CONV_PATTERN.match(line)
+            if cc_conv_match is not None:
+                threshold = cc_conv_threshold(cc_conv_match.group(1))
+    return threshold
+
+
+def parse_xncc_cc(xncc_cc, threshold: float = DEFAULT_CC_CONV):
+    """
+    The CC section of the xncc program. The convergence of the iterations is
+    projected for the `threshold` (see CC_CONV).
+    """
 
     lines = xncc_cc['lines']
     # from text import print_section
@@ -169,26 +454,30 @@ def parse_xncc_cc(xncc_cc):
             continue
 
     if iterations_start is None:
-        print("Error in parsing CC section of xncc.\n\t"
-              "No beginning of the CC iterations found.", file=sys.stderr)
+        warn("Error in parsing CC section of xncc.\n\t"
+             "No beginning of the CC iterations found.")
         return
 
     if iterations_end is None:
-        print("Error in parsing CC section of xncc.\n\t"
-              "No end of the CC iterations found.", file=sys.stderr)
-        return
+        # The iterations did not finish (yet)
+        warn("Warning! No end of the CC iterations found in xncc.")
+        iterations_end = len(lines) - 1
+
+    iterations_lines = lines[iterations_start: iterations_end + 1]
+    history = parse_iteration_tables(iterations_lines)
+    if history is not None:
+        data['history'] = history
+        data['convergence'] = project_convergence(history, threshold)
 
     xncc_cc['sections'] += [{
         'name': 'iterations',
         'start': xncc_cc['start'] + iterations_start,
         'end': xncc_cc['start'] + iterations_end,
-        'lines': lines[iterations_start: iterations_end + 1],
+        'lines': iterations_lines,
         'sections': list(),
         'data': data,
     }]
 
-    # TODO: Parse iterations section
-
 
 def get_eom_lines_from_xncc(xncc, catches):
     """
@@ -213,10 +502,10 @@ def get_eom_lines_from_xncc(xncc, catches):
             elif catch['type'] == 'end':
                 eom_end_ln = line
                 continue
-            print("Warrning unrecognized eom header in xncc", file=sys.stderr)
+            warn("Warrning unrecognized eom header in xncc")
 
     if eom_start_ln is None:
-        print("Warning! No xncc EOM section", file=sys.stderr)
+        warn("Warning! No xncc EOM section")
         return
 
     if eom_end_ln is None:
@@ -225,7 +514,7 @@ def get_eom_lines_from_xncc(xncc, catches):
             eom_end_ln = len(xncc['lines']) - 1
         else:
             # TODO:
-            print("Error! Problem in parsing eom of xncc.", file=sys.stderr)
+            warn("Error! Problem in parsing eom of xncc.")
             pass
 
     eom_section = {
@@ -243,9 +532,8 @@ def parse_singles_of_converged_root(lines, ln, lines_offset):
     while True:
         ln += 1
         if ln >= len(lines):
-            print("Warning error in processing converged root"
-                  f"\n line {ln + lines_offset}",
-                  file=sys.stderr)
+            warn("Warning error in processing converged root"
+                 f"\n line {ln + lines_offset}")
             return
         matchlist = singles_pattern.findall(lines[ln])
 
@@ -269,9 +557,8 @@ def parse_doubles_of_converged_root(lines, ln, lines_offset):
     while True:
         ln += 1
         if ln >= len(lines):
-            print("Warning error in processing converged root"
-                  f"\n line {ln + lines_offset}",
-                  file=sys.stderr)
+            warn("Warning error in processing converged root"
+                 f"\n line {ln + lines_offset}")
             return
         matchlist = doubles_pattern.findall(lines[ln])
 
@@ -307,8 +594,8 @@ def parse_xncc_eom_converged_root(converged_root):
     ln = skip_to(r'\s*-+\s+', lines, ln)
     singles_header = re.compile(r'(\s*A\s+I){3}')
     if singles_header.match(lines[ln-1]) is None:
-        print("Warning unable to process converged root"
-              f"\n line {ln + root_start_ln - 1}", file=sys.stderr)
+        warn("Warning unable to process converged root"
+             f"\n line {ln + root_start_ln - 1}")
         return
     ln, singles = parse_singles_of_converged_root(lines, ln, root_start_ln)
     converged_root['data']['singles'] = singles
@@ -317,19 +604,49 @@ def parse_xncc_eom_converged_root(converged_root):
     ln = skip_to(r'\s*-+', lines, ln)
     doubles_header = re.compile(r'(?:\s+A\s+B\s+I\s+J){,2}')
     if doubles_header.match(lines[ln-1]) is None:
-        print("Warning unable to process converged root at line "
-              f"{root_start_ln + ln - 1}", file=sys.stderr)
+        warn("Warning unable to process converged root at line "
+             f"{root_start_ln + ln - 1}")
         return
     ln, doubles = parse_doubles_of_converged_root(lines, ln, root_start_ln)
     converged_root['data']['doubles'] = doubles
 
 
+def parse_xncc_eom_iterative_solution(iterative_solution):
+    """
+    The Davidson iterations of an EOM root. Adds the 'history' of
+    `parse_iteration_tables` and the summary of the closing line
+        '# iterations', 'time, sec', 'time per iteration, sec', 'Gflops/s'
+    """
+    if 'data' not in iterative_solution:
+        iterative_solution['data'] = dict()
+    data = iterative_solution['data']
+    lines = iterative_solution['lines']
+
+    history = parse_iteration_tables(lines)
+    if history is not None:
+        data['history'] = history
+
+    summary_match = EOM_CONVERGED_PATTERN.match(lines[-1].strip())
+    if summary_match is None:
+        warn("Warning unable to process the end of EOM iterations at line "
+             f"{iterative_solution['end']}")
+        return
+
+    data['# iterations'] = int(summary_match.group(1))
+    data['time, sec'] = float(summary_match.group(2))
+    data['time per iteration, sec'] = float(summary_match.group(3))
+    data['Gflops/s'] = float(summary_match.group(4))
+
+
 def parse_xncc_eom_root_sections(sections):
     for section in sections:
         # TODO: there are more sections availabe for parsing. If needed one
         # needs to wire their parsers
         if section['name'] == 'converged root':
-            parse_xncc_eom_converged_root(section)
+            parse_section(parse_xncc_eom_converged_root, section)
+            continue
+        if section['name'] == 'iterative solution':
+            parse_section(parse_xncc_eom_iterative_solution, section)
             continue
 
 
@@ -372,17 +689,15 @@ def parse_xncc_eom_root(lines, line_offset):
                                  + FLOAT_WS + r'\(' + FLOAT_WS + r'eV\)')
     eom_exc_match = eom_exc_pattern.match(lines[ln].strip())
     if eom_exc_match is None:
-        print("Error in parsing eom roots in xncc", file=sys.stderr)
-        print(f"Expected EOM excitation energies in line{line_offset + ln}",
-              file=sys.stderr)
+        warn("Error in parsing eom roots in xncc\n"
+             f"Expected EOM excitation energies in line{line_offset + ln}")
 
     ln += 1
     eom_total_pattern = re.compile(f'Total {model} energy:' + FLOAT_WS)
     eom_total_match = eom_total_pattern.match(lines[ln].strip())
     if eom_total_match is None:
-        print("Error in parsing eom roots in xncc", file=sys.stderr)
-        print(f"Expected EOM total energy in line{line_offset + ln}",
-              file=sys.stderr)
+        warn("Error in parsing eom roots in xncc\n"
+             f"Expected EOM total energy in line{line_offset + ln}")
 
     sections += [{
         'name': 'EOM energy',
@@ -429,6 +744,33 @@ def parse_xncc_eom_root(lines, line_offset):
     return root
 
 
+def find_xncc_eom_irrep_roots(irrep_lines):
+    """
+    Splits the lines of an xncc's eom's irrep into roots.
+    Returns a list of (start, end) line numbers of the roots, relative to
+    the first line of the irrep.
+    """
+    # Each EOM root output starts with a listing of the guess root
+    # Watch out: EOMEE-CCSDT uses the EOMEE-CCSD guess vector!
+    guess_pattern = re.compile(r'(EOMEE-CCSDT?) guess vector:')
+    detected_roots = []
+    for ln, line in enumerate(irrep_lines):
+        guess_match = guess_pattern.match(line.strip())
+        if guess_match is None:
+            continue
+        detected_roots += [ln]
+
+    roots = []
+    for n, root_start in enumerate(detected_roots):
+        if n + 1 == len(detected_roots):
+            root_end = len(irrep_lines)
+        else:
+            root_end = detected_roots[n + 1]
+        roots += [(root_start, root_end)]
+
+    return roots
+
+
 def parse_xncc_eom_irrep(xncc_eom, irrep_start, end_line):
     """
     Parses the EOM part of XNCC, but only a single irrep part of it.
@@ -444,39 +786,21 @@ def parse_xncc_eom_irrep(xncc_eom, irrep_start, end_line):
     irrep_no = int(irrep_start['match'].group(2))
 
     # Split irrep into roots
-    # Each EOM root output starts with a listing of the guess root
     irrep_start_line = irrep_start['line']
     irrep_lines = xncc_eom['lines'][irrep_start_line:end_line]
 
-    # Watch out: EOMEE-CCSDT uses the EOMEE-CCSD guess vector!
-    guess_pattern = re.compile(r'(EOMEE-CCSDT?) guess vector:')
-    detected_roots = []
-    for ln, line in enumerate(irrep_lines):
-        guess_match = guess_pattern.match(line.strip())
-        if guess_match is None:
-            continue
-        detected_roots += [{
-            'line': ln,
-        }]
-
     # Parse roots
     roots = []
-    for n, root_start in enumerate(detected_roots):
-        if n + 1 == len(detected_roots):
-            end_line = len(irrep_lines)
-        else:
-            end_line = detected_roots[n + 1]['line']
-
-        root_start_line = root_start['line']
+    for root_start_line, root_end_line in find_xncc_eom_irrep_roots(
+            irrep_lines):
         line_offset = xncc_eom['start'] + irrep_start_line + root_start_line
-        roots += [parse_xncc_eom_root(irrep_lines[root_start_line:end_line],
-                                      line_offset)]
+        roots += [parse_xncc_eom_root(
+            irrep_lines[root_start_line:root_end_line], line_offset)]
 
     if len(roots) != no_states:
-        print("Warning, not all roots of the irrep"
-              f" #{irrep_no} were parsed in xncc",
-              file=sys.stderr)
-        print(f"Expected {no_states=} got {len(roots)=}", file=sys.stderr)
+        warn("Warning, not all roots of the irrep"
+             f" #{irrep_no} were parsed in xncc\n"
+             f"Expected {no_states=} got {len(roots)=}")
 
     irrep = {
         'name': 'irrep',
@@ -492,12 +816,15 @@ def parse_xncc_eom_irrep(xncc_eom, irrep_start, end_line):
     return irrep
 
 
-def parse_xncc_eom(xncc_eom):
-    """ The EOM section splits into subsections, one for each irrep """
-    xncc_eom['sections'] = []
+def find_xncc_eom_irreps(xncc_eom):
+    """
+    Splits the EOM section of xncc into irreps. Returns a list of
+    {'line': first line of the irrep,
+     'match': match of 'Searching for (2) roots in irrep (7)',
+     'end': the line where the next irrep starts/or where the eom ends}
+    """
     lines = xncc_eom['lines']
 
-    # 1. Find these subsections
     detected_irreps = []
     irrep_pattern = re.compile(r'Searching for' + INT_WS
                                + 'roots in irrep' + INT_WS)
@@ -510,50 +837,280 @@ def parse_xncc_eom(xncc_eom):
             'match': irrep_match,
         },]
 
-    # Parse every irrep's subsection
     for n, irrep_start in enumerate(detected_irreps):
         if n + 1 == len(detected_irreps):
-            end_line = len(lines)
+            irrep_start['end'] = len(lines)
         else:
-            end_line = detected_irreps[n + 1]['line']
+            irrep_start['end'] = detected_irreps[n + 1]['line']
+
+    return detected_irreps
+
 
+def parse_xncc_eom(xncc_eom):
+    """ The EOM section splits into subsections, one for each irrep """
+    xncc_eom['sections'] = []
+
+    # Parse every irrep's subsection
+    for irrep_start in find_xncc_eom_irreps(xncc_eom):
         eom_irrep_states = parse_xncc_eom_irrep(xncc_eom, irrep_start,
-                                                end_line)
+                                                irrep_start['end'])
         xncc_eom['sections'] += [eom_irrep_states]
 
 
-def parse_xncc_program(xncc):
+def parse_xncc_program(xncc, threshold=None):
+    """
+    Parses the xncc program. The CC convergence is projected for the
+    `threshold`, by default CC_CONV of the job being parsed by
+    `cfour_parser.registry.parse_programs`.
+    """
+    from cfour_parser.registry import job_programs
+
+    if threshold is None:
+        programs = job_programs()
+        threshold = DEFAULT_CC_CONV if programs is None else \
+            job_cc_conv(programs, xncc)
 
     catches = cool_lines_in_xncc(xncc)
 
+    memory_section = get_memory_lines_from_xncc(xncc, catches)
+    if memory_section is not None:
+        parse_section(parse_xncc_memory_analysis, memory_section)
+        xncc['sections'] += [memory_section]
+
     # TODO: catches should be turned into sections. Each section should
     # contain the keys: name, start, end, lines, sections, data.
     # The sections should be looped over and parsed if a parser is
     # available
 
     cc_section = get_cc_lines_from_xncc(xncc, catches)
-    parse_xncc_cc(cc_section)
-    xncc['sections'] += [cc_section]
+    if cc_section is not None:
+        parse_xncc_cc(cc_section, threshold)
+        xncc['sections'] += [cc_section]
 
     eom_section = get_eom_lines_from_xncc(xncc, catches)
-    parse_xncc_eom(eom_section)
-    xncc['sections'] += [eom_section]
+    if eom_section is not None:
+        parse_xncc_eom(eom_section)
+        xncc['sections'] += [eom_section]
+
+
+def eom_cost_report(xncc):
+    """
+    Cost of the EOM roots of a parsed xncc summed per model and irrep.
+    Returns a list, in the order of the output, of dictionaries with
+        'model', 'irrep': the EOM model and the irrep number
+        '# roots', '# iterations': number of roots and their iterations
+        'time, sec': time spent on the roots
+        'iterations per root', 'time per root, sec': averages
+        'time share': fraction of the EOM time of all roots
+    """
+    rows = dict()
+    for irrep in find_sections(xncc, 'irrep'):
+        for root in irrep['sections']:
+            key = (root['data']['model'], irrep['data']['#'])
+            row = rows.setdefault(key, {
+                'model': key[0],
+                'irrep': key[1],
+                '# roots': 0,
+                '# iterations': 0,
+                'time, sec': 0.0,
+            })
+            row['# roots'] += 1
+            for solution in find_sections(root, 'iterative solution'):
+                row['# iterations'] += solution['data'].get('# iterations',
+                                                            0)
+                row['time, sec'] += solution['data'].get('time, sec', 0.0)
+
+    rows = list(rows.values())
+    total_time = sum(row['time, sec'] for row in rows)
+    for row in rows:
+        row['iterations per root'] = row['# iterations'] / row['# roots']
+        row['time per root, sec'] = row['time, sec'] / row['# roots']
+        row['time share'] = (row['time, sec'] / total_time if total_time > 0
+                             else 0.0)
+
+    return rows
+
+
+def capacity_report(xncc):
+    """
+    Joins the predictions of the memory analysis of a parsed xncc with the
+    observed cost of its CC and EOM. Returns a dictionary with
+        'memory limit, GiB', 'minimum memory, GiB', 'optimal memory, GiB',
+        'estimated disk I/O, GiB', 'uncached lists', 'simulation time, sec'
+        'CC model', 'CC iterations', 'CC time, sec', 'CC time per
+            iteration, sec', 'CC Gflops/s'
+        'EOM roots', 'EOM iterations', 'EOM time, sec', 'EOM Gflops/s'
+            (weighted by the time of every root)
+        'walltime, sec': of the whole xncc
+    Missing values are None.
+    """
+    report = dict.fromkeys((
+        'memory limit, GiB', 'minimum memory, GiB', 'optimal memory, GiB',
+        'estimated disk I/O, GiB', 'uncached lists', 'simulation time, sec',
+        'CC model', 'CC iterations', 'CC time, sec',
+        'CC time per iteration, sec', 'CC Gflops/s', 'EOM roots',
+        'EOM iterations', 'EOM time, sec', 'EOM Gflops/s'))
+    report['walltime, sec'] = xncc['data'].get('walltime, sec')
+
+    for memory in find_sections(xncc, 'memory analysis'):
+        data = memory['data']
+        memory_gib = data['memory, GiB']
+        report['memory limit, GiB'] = memory_gib.get('limit')
+        report['minimum memory, GiB'] = memory_gib.get('minimum')
+        report['optimal memory, GiB'] = memory_gib.get('optimal')
+        report['estimated disk I/O, GiB'] = data['disk I/O, GiB']
+        report['uncached lists'] = data['uncached lists']
+        report['simulation time, sec'] = data.get('simulation time, sec')
+
+    for iterations in find_sections(xncc, 'iterations'):
+        data = iterations['data']
+        report['CC model'] = data.get('CC model')
+        report['CC iterations'] = data.get('# iterations')
+        report['CC time, sec'] = data.get('time, sec')
+        if data.get('# iterations'):
+            report['CC time per iteration, sec'] = \
+                data['time, sec'] / data['# iterations']
+        report['CC Gflops/s'] = data.get('Gflops/s')
+
+    solutions = [solution['data'] for solution in
+                 find_sections(xncc, 'iterative solution') if
+                 'time, sec' in solution['data']]
+    if len(solutions) > 0:
+        eom_time = sum(solution['time, sec'] for solution in solutions)
+        report['EOM roots'] = len(solutions)
+        report['EOM iterations'] = sum(solution['# iterations'] for
+                                       solution in solutions)
+        report['EOM time, sec'] = eom_time
+        if eom_time > 0:
+            report['EOM Gflops/s'] = sum(
+                solution['Gflops/s'] * solution['time, sec'] for solution in
+                solutions) / eom_time
+
+    return report
+
+
+def str_capacity_report(report):
+    """ Lines listing `capacity_report`. """
+    lines = list()
+    for key, value in report.items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
+        lines += [f"{key:>28s}: {'-' if value is None else value}"]
+    return lines
+
+
+def str_eom_cost_report(rows):
+    """ Lines of a table of `eom_cost_report`. """
+    lines = [f"{'model':14s}{'irrep':>6s}{'roots':>6s}{'its':>6s}"
+             f"{'its/root':>10s}{'time, s':>12s}{'s/root':>12s}"
+             f"{'share':>7s}"]
+    for row in rows:
+        lines += [f"{row['model']:14s}{row['irrep']:6d}{row['# roots']:6d}"
+                  f"{row['# iterations']:6d}"
+                  f"{row['iterations per root']:10.1f}"
+                  f"{row['time, sec']:12.1f}"
+                  f"{row['time per root, sec']:12.1f}"
+                  f"{100 * row['time share']:6.1f}%"]
+    return lines
+
+
+def cc_progress(path):
+    """
+    Returns the 'iterations' section of the last CC of xncc in the CFOUR
+    output at `path`, also when xncc is still running, or None. Its
+    'convergence' uses CC_CONV of the output.
+    """
+    from cfour_parser.triage import triage_programs
+
+    with open_input(path, 'rb') as cfour_output:
+        data = cfour_output.read()
+
+    runs = [program for program in triage_programs(data) if
+            program['name'] == 'xncc' and program['start'] is not None]
+    if len(runs) == 0:
+        return None
+
+    run = runs[-1]
+    lines = data.decode(errors='replace').splitlines(keepends=True)
+    end = len(lines) if run['end'] is None else run['end']
+    xncc = {
+        'name': 'xncc',
+        'start': run['start'],
+        'end': end,
+        'lines': lines[run['start'] - 1:end],
+        'sections': list(),
+        'data': dict(),
+    }
+
+    threshold = DEFAULT_CC_CONV
+    for line in lines[:run['start']]:
+        cc_conv_match = CC_CONV_PATTERN.match(line)
+        if cc_conv_match is not None:
+            threshold = cc_conv_threshold(cc_conv_match.group(1))
+
+    cc_section = get_cc_lines_from_xncc(xncc, cool_lines_in_xncc(xncc))
+    if cc_section is None:
+        return None
+    parse_xncc_cc(cc_section, threshold)
+    for section in cc_section['sections']:
+        if section['name'] == 'iterations':
+            return section
+    return None
+
+
+def str_cc_progress(iterations):
+    """ A short report on the section returned by `cc_progress`. """
+    history = iterations['data'].get('history')
+    if history is None:
+        return "No CC iterations found."
+
+    convergence = iterations['data']['convergence']
+    report = f"{iterations['data']['CC model']} iteration "
+    report += f"{history['iteration'][-1]}: largest residual "
+    report += f"{history['max residual'][-1]:.2e}, threshold "
+    report += f"{convergence['threshold']:.0e}"
+    if convergence['converged'] is True:
+        return report + ", converged."
+
+    if convergence['remaining iterations'] is None:
+        return report + ", not converging."
+
+    report += f", about {convergence['remaining iterations']} more "
+    report += f"iterations and {convergence['remaining walltime, sec']:.0f} "
+    report += "seconds."
+    return report
 
 
 def main():
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    if args.progress is True:
+        iterations = cc_progress(args.cfour_output)
+        if iterations is None:
+            print("No CC iterations found.")
+        else:
+            print(str_cc_progress(iterations))
+        return
+
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
     for program in programs:
         if program['name'] != 'xncc':
             continue
 
-        parse_xncc_program(program)
+        parse_xncc_program(program, job_cc_conv(programs, program))
 
         if args.verbose is True:
             pretty_introduce_section(program, 1)
 
+        if args.capacity is True:
+            for line in str_capacity_report(capacity_report(program)):
+                print(line)
+
+        if args.eom_cost is True:
+            for line in str_eom_cost_report(eom_cost_report(program)):
+                print(line)
+
     if args.json is True:
         print(json.dumps(programs))
 
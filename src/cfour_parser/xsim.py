@@ -3,6 +3,7 @@
 import argparse
 import json
 import sys
+from cfour_parser.compression import open_input
 
 
 def get_args():
@@ -11,6 +12,12 @@ def get_args():
     parser.add_argument('-j', '--json', default=False, action='store_true',
                         help='Print colleted data in JSON.')
     parser.add_argument('-v', '--verbose', default=False, action='store_true')
+    parser.add_argument('--export', default=None,
+                        choices=('npz', 'npy', 'parquet'),
+                        help='Export the spectrum as a columnar table into '
+                        'the directory given with -o.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Directory of the exported table.')
     args = parser.parse_args()
     return args
 
@@ -103,6 +110,8 @@ def extract_xsim_basis_functions(lines):
 
 def parse_xsim_output(xsim_file):
     """
+    `xsim_file` is an open file, see `cfour_parser.compression.open_input`
+    for compressed outputs.
     Returns a dictionary.
 
     The 'spectrum_data' entry is a list. Each item of the list looks like this
@@ -136,7 +145,7 @@ def parse_xsim_output(xsim_file):
 
 def main():
     args = get_args()
-    with open(args.xsim_output, 'r') as xsim_output:
+    with open_input(args.xsim_output) as xsim_output:
         xsim_data = parse_xsim_output(xsim_output)
 
     if args.verbose is True:
@@ -145,6 +154,15 @@ def main():
     if args.json is True:
         print(json.dumps(xsim_data))
 
+    if args.export is not None:
+        if args.output is None:
+            raise SystemExit("Error: --export requires -o DIRECTORY.")
+        from cfour_parser.export import add_run, collect_xsim_tables, \
+            write_tables
+        tables = collect_xsim_tables(xsim_data)
+        add_run(tables, 0, args.xsim_output)
+        write_tables(tables, args.output, args.export)
+
 
 if __name__ == "__main__":
     main()
@@ -3,7 +3,10 @@
 import argparse
 import json
 import re
+from cfour_parser.compression import open_input
+from cfour_parser.memo import freeze
 from cfour_parser.programs import find_programs
+from cfour_parser.util import find_catches
 from cfour_parser.text import INT_WS, FLOAT, FLOAT_WS, pretty_introduce_section, print_section
 
 
@@ -24,6 +27,19 @@ def parse_xvcc_program(xvcc):
     turn_xvcc_catches_into_sections(catches, xvcc)
 
 
+XVCC_HIGHLIGHTS = freeze([
+    {'pattern': re.compile(r'\s*A miracle has come to pass\. '
+                           r'The CC iterations have converged\.'),
+     'name': 'A miracle',
+     'type': 'start',
+     },
+    # {'pattern': re.compile(r''),
+    #  'name': '',
+    #  'type': '',
+    #  },
+])
+
+
 def cool_lines_in_xvcc(xvcc):
     """
     The lines I would look for while reading the CFOUR's output file.
@@ -32,36 +48,7 @@ def cool_lines_in_xvcc(xvcc):
     if xvcc['name'] != 'xvcc':
         return
 
-    highlights = [
-        {'re': r'\s*A miracle has come to pass\. '
-         r'The CC iterations have converged\.',
-         'name': 'A miracle',
-         'type': 'start',
-         },
-        # {'pattern': re.compile(r''),
-        #  'name': '',
-        #  'type': '',
-        #  },
-    ]
-    for highlight in highlights:
-        highlight['pattern'] = re.compile(highlight['re'])
-
-    catches = list()
-    for ln, line in enumerate(xvcc['lines']):
-        for highlight in highlights:
-            pattern = highlight['pattern']
-            match = pattern.match(line)
-            if match is None:
-                continue
-            data = {
-                'line': ln,
-                'match': match,
-            }
-            data.update(highlight)
-            catches += [data]
-            break
-
-    return catches
+    return find_catches(xvcc['lines'], XVCC_HIGHLIGHTS)
 
 
 def turn_xvcc_catches_into_sections(catches, xvcc):
@@ -152,7 +139,7 @@ def parse_xvcc_miracle(catch, xvcc):
 
 def main():
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
     for xvcc in programs:
@@ -3,7 +3,9 @@
 import argparse
 import json
 import re
-from cfour_parser.util import skip_to_re
+from cfour_parser.util import find_catches, skip_to_re
+from cfour_parser.memo import freeze
+from cfour_parser.compression import open_input
 from cfour_parser.programs import find_programs
 from cfour_parser.text import INT_WS, FLOAT, pretty_introduce_section, print_section
 
@@ -25,6 +27,42 @@ def parse_xvee_program(xvee):
     turn_xvee_catches_into_sections(catches, xvee)
 
 
+# HINT: section commented out do not have parsers yet
+XVEE_HIGHLIGHTS = freeze([
+    # {'re': r'\s*Summary of active alpha molecular orbitals:',
+    #  'name': 'MO listing',
+    #  'type': 'start',
+    #  },
+    # {'re': r'\s*EOMEE-CCSD excitation energies will be evaluated\.',
+    #  'name': 'model',
+    #  'type': 'oneline',
+    #  },
+    # {'re': r'\s*Guess vectors transform as symmetry 5\.',
+    #  'name': 'irrep symmetry',
+    #  'type': 'oneline',
+    #  },
+    {'pattern': re.compile(r'\s*Beginning symmetry block' + INT_WS + r'\.' +
+                           INT_WS + r'roots requested.'),
+     'name': 'eom solution',
+     'type': 'start',
+     },
+    # {'re':
+    #  r'\s*@TDENS-I, Largest elements of the\s*(\w+)\s*transition density',
+    #  'name': 'transition density',
+    #  'type': 'start',
+    #  },
+    {'pattern': re.compile(r'\s*Right Transition Moment' +
+                           (r'\s+' + FLOAT) * 3),
+     'name': 'transition properties',
+     'type': 'start',  # this is also an end to the 'eom solution' block
+     },
+    # {'pattern': re.compile(r''),
+    #  'name': '',
+    #  'type': '',
+    #  },
+])
+
+
 def cool_lines_in_xvee(xvee):
     """
     The lines I would look for while reading the CFOUR's output file.
@@ -33,58 +71,7 @@ def cool_lines_in_xvee(xvee):
     if xvee['name'] != 'xvee':
         return
 
-    # HINT: section commented out do not have parsers yet
-    highlights = [
-        # {'re': r'\s*Summary of active alpha molecular orbitals:',
-        #  'name': 'MO listing',
-        #  'type': 'start',
-        #  },
-        # {'re': r'\s*EOMEE-CCSD excitation energies will be evaluated\.',
-        #  'name': 'model',
-        #  'type': 'oneline',
-        #  },
-        # {'re': r'\s*Guess vectors transform as symmetry 5\.',
-        #  'name': 'irrep symmetry',
-        #  'type': 'oneline',
-        #  },
-        {'re': r'\s*Beginning symmetry block' + INT_WS + r'\.' + INT_WS +
-         r'roots requested.',
-         'name': 'eom solution',
-         'type': 'start',
-         },
-        # {'re':
-        #  r'\s*@TDENS-I, Largest elements of the\s*(\w+)\s*transition density',
-        #  'name': 'transition density',
-        #  'type': 'start',
-        #  },
-        {'re': r'\s*Right Transition Moment' + (r'\s+' + FLOAT) * 3,
-         'name': 'transition properties',
-         'type': 'start',  # this is also an end to the 'eom solution' block
-         },
-        # {'pattern': re.compile(r''),
-        #  'name': '',
-        #  'type': '',
-        #  },
-    ]
-    for highlight in highlights:
-        highlight['pattern'] = re.compile(highlight['re'])
-
-    catches = list()
-    for ln, line in enumerate(xvee['lines']):
-        for highlight in highlights:
-            pattern = highlight['pattern']
-            match = pattern.match(line)
-            if match is None:
-                continue
-            data = {
-                'line': ln,
-                'match': match,
-            }
-            data.update(highlight)
-            catches += [data]
-            break
-
-    return catches
+    return find_catches(xvee['lines'], XVEE_HIGHLIGHTS)
 
 
 def turn_xvee_catches_into_sections(catches, xvee):
@@ -299,7 +286,7 @@ def parse_xvee_transition_properties(catch, xvee):
 
 def main():
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
     for xvee in programs:
@@ -3,8 +3,10 @@
 import argparse
 import json
 import re
-import sys
-from cfour_parser.util import skip_to, skip_to_empty_line
+from cfour_parser.util import find_catches, skip_to, skip_to_empty_line, \
+    warn
+from cfour_parser.compression import open_input
+from cfour_parser.memo import freeze, parse_section
 from cfour_parser.programs import find_programs
 from cfour_parser.util import fortran_float_to_float, ParsingError
 from cfour_parser.text import FLOAT, INT, FRTRN_FLOAT, pretty_introduce_section
@@ -19,6 +21,27 @@ def get_args():
     return args
 
 
+XVSCF_HIGHLIGHTS = freeze([
+    {
+        'pattern': re.compile(r'\s*E\(SCF\)=\s+' + FLOAT
+                              + r'\s+' + FRTRN_FLOAT),
+        'name': 'energy',
+        'type': 'oneline',
+    },
+    {
+        'pattern': re.compile(
+            r'\s*ORBITAL EIGENVALUES \(ALPHA\)  \(1H = 27.2113819 eV\)'
+        ),
+        'name': 'MOs',
+        'type': 'start',
+    },
+    # {'pattern': re.compile(r''),
+    #  'name': '',
+    #  'type': '',
+    #  },
+])
+
+
 def cool_lines_in_xvscf(xvscf):
     """
     First step on the way of parsing xvscf section of the CFOUR's output.
@@ -27,42 +50,7 @@ def cool_lines_in_xvscf(xvscf):
     if xvscf['name'] != 'xvscf':
         return
 
-    highlights = [
-        {
-            'pattern': re.compile(r'\s*E\(SCF\)=\s+' + FLOAT
-                                  + r'\s+' + FRTRN_FLOAT),
-            'name': 'energy',
-            'type': 'oneline',
-        },
-        {
-            'pattern': re.compile(
-                r'\s*ORBITAL EIGENVALUES \(ALPHA\)  \(1H = 27.2113819 eV\)'
-            ),
-            'name': 'MOs',
-            'type': 'start',
-        },
-        # {'pattern': re.compile(r''),
-        #  'name': '',
-        #  'type': '',
-        #  },
-    ]
-
-    catches = list()
-    for ln, line in enumerate(xvscf['lines']):
-        for highlight in highlights:
-            pattern = highlight['pattern']
-            match = pattern.match(line)
-            if match is None:
-                continue
-            data = {
-                'line': ln,
-                'match': match,
-            }
-            data.update(highlight)
-            catches += [data]
-            break
-
-    return catches
+    return find_catches(xvscf['lines'], XVSCF_HIGHLIGHTS)
 
 
 def parse_MO_line(line):
@@ -109,10 +97,16 @@ def parse_MO_line(line):
     return mo
 
 
+MO_TYPE_SEPARATOR = r'\+' * 77
+
+
 def parse_MOs_listing(catch, lines, lines_offset):
+    """
+    Finds the listing of MOs that starts at `catch` and returns it as a
+    section with its data filled in by `parse_MOs`.
+    """
     start = catch['line']
 
-    oll_korrect = True
     header_pattern = re.compile(
         r'\s*MO\s*#\s*E\(hartree\)\s*E\(eV\)\s*FULLSYM\s*COMPSYM')
 
@@ -121,46 +115,52 @@ def parse_MOs_listing(catch, lines, lines_offset):
         raise RuntimeError(
             "Error! The MOs listing in SCF is missing a header."
         )
-        oll_korrect = False
 
-    MO_TYPE_SEPARATOR = r'\+' * 77
-    occupied_start = start + 4
     occupied_end = skip_to(MO_TYPE_SEPARATOR, lines, start + 4)
+    virtual_end = skip_to_empty_line(lines, occupied_end)
+
+    mos = {
+        'name': 'MOs',
+        'start': lines_offset + start,
+        'end': lines_offset + virtual_end - 1,
+        'lines': lines[start: virtual_end],
+        'sections': list(),
+        'metadata': {
+            'ok': True,
+            },
+        'data': dict(),
+    }
+    parse_section(parse_MOs, mos)
+
+    return mos
+
+
+def parse_MOs(mos):
+    """ Parser of the MOs section made by `parse_MOs_listing`. """
+    lines = mos['lines']
+    occupied_start = 4
+    occupied_end = skip_to(MO_TYPE_SEPARATOR, lines, occupied_start)
 
     occupied = []
     for line in lines[occupied_start:occupied_end]:
         mo = parse_MO_line(line)
         occupied += [mo]
 
-    virtual_end = skip_to_empty_line(lines, occupied_end)
-
     virtual = []
-    for line in lines[occupied_end+1:virtual_end]:
+    for line in lines[occupied_end+1:]:
         try:
             mo = parse_MO_line(line)
         except ParsingError as pe:
-            print(pe, file=sys.stderr)
-            oll_korrect = False
+            warn(pe)
+            mos['metadata']['ok'] = False
             continue
 
         virtual += [mo]
 
-    mos = {
-        'name': 'MOs',
-        'start': lines_offset + start,
-        'end': lines_offset + virtual_end - 1,
-        'lines': lines[start: virtual_end],
-        'sections': list(),
-        'metadata': {
-            'ok': oll_korrect,
-            },
-        'data': {
-            'occupied': occupied,
-            'virtual': virtual,
-        }
-    }
-
-    return mos
+    mos['data'].update({
+        'occupied': occupied,
+        'virtual': virtual,
+    })
 
 
 def turn_xvscf_catches_into_sections(catches, xvscf):
@@ -204,7 +204,7 @@ def parse_xvscf_program(xvscf):
 
 def main():
     args = get_args()
-    with open(args.cfour_output, 'r') as cfour_output:
+    with open_input(args.cfour_output) as cfour_output:
         programs = find_programs(cfour_output)
 
     for program in programs:
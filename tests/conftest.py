@@ -0,0 +1,32 @@
+import os
+import pytest
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+@pytest.fixture
+def pyrazine():
+    return os.path.join(EXAMPLES, 'pyrazine.c4')
+
+
+@pytest.fixture
+def pyrazine_cc_conv_10(tmp_path):
+    """ The example output with CC_CONV=10 instead of 7. """
+    with open(os.path.join(EXAMPLES, 'pyrazine.c4')) as example:
+        text = example.read()
+    old = 'CC_CONV              ICCCNV          10D-  7'
+    assert old in text
+    path = tmp_path / 'cc_conv_10.c4'
+    path.write_text(text.replace(old, 'CC_CONV              ICCCNV          '
+                                 '10D- 10'))
+    return str(path)
+
+
+@pytest.fixture
+def two_xjoda(tmp_path):
+    """ The example output twice in a row, as from two jobs in one file. """
+    with open(os.path.join(EXAMPLES, 'pyrazine.c4')) as example:
+        text = example.read()
+    path = tmp_path / 'two_xjoda.c4'
+    path.write_text(text + text)
+    return str(path)
@@ -0,0 +1,43 @@
+from cfour_parser.lazy import LazyOutput
+from cfour_parser.registry import parse_programs, read_programs
+from cfour_parser.serve import parse_changed_file
+from cfour_parser.util import find_sections
+
+
+def xncc_convergence(programs):
+    xncc = [program for program in programs if program['name'] == 'xncc']
+    return cc_convergence(xncc[-1])
+
+
+def cc_convergence(section):
+    iterations, = find_sections(section, 'iterations')
+    return iterations['data']['convergence']
+
+
+def test_parse_programs_uses_cc_conv(pyrazine_cc_conv_10):
+    programs = parse_programs(read_programs(pyrazine_cc_conv_10))
+    convergence = xncc_convergence(programs)
+    assert convergence['threshold'] == 1e-10
+    assert convergence['converged'] is False
+
+
+def test_default_cc_conv(pyrazine):
+    convergence = xncc_convergence(parse_programs(read_programs(pyrazine)))
+    assert convergence['threshold'] == 1e-7
+    assert convergence['converged'] is True
+
+
+def test_serve_uses_cc_conv(pyrazine_cc_conv_10):
+    programs = [program for _, program in
+                parse_changed_file(pyrazine_cc_conv_10)]
+    assert xncc_convergence(programs)['threshold'] == 1e-10
+
+
+def test_lazy_uses_cc_conv(pyrazine_cc_conv_10):
+    output = LazyOutput(pyrazine_cc_conv_10)
+    xncc = output.programs['xncc'][-1]
+    assert cc_convergence(xncc.cc)['threshold'] == 1e-10
+
+    output = LazyOutput(pyrazine_cc_conv_10)
+    assert cc_convergence(output.programs['xncc'][-1].parsed)['threshold'] \
+        == 1e-10
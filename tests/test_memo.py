@@ -0,0 +1,32 @@
+import pytest
+from cfour_parser.memo import FrozenList, SectionCache, parse_section, thaw
+from cfour_parser.util import collect_diagnostics, warn
+
+
+def parse_words(section):
+    warn('parsed')
+    section['data']['words'] = [line.split() for line in section['lines']]
+
+
+def new_section():
+    return {'name': 'words', 'lines': ['a b', 'c'], 'data': dict()}
+
+
+def test_results_are_shared_and_frozen():
+    cache = SectionCache()
+    first = new_section()
+    second = new_section()
+    with collect_diagnostics() as diagnostics:
+        parse_section(parse_words, first, cache)
+        parse_section(parse_words, second, cache)
+    assert diagnostics == ['parsed', 'parsed']
+    assert cache.hits == 1
+    assert second['data']['words'] is first['data']['words']
+    assert isinstance(first['data']['words'], FrozenList)
+    with pytest.raises(AttributeError):
+        first['data']['words'][0].append('d')
+
+    words = thaw(second['data']['words'])
+    words[0].append('d')
+    assert words == [['a', 'b', 'd'], ['c']]
+    assert first['data']['words'] == (('a', 'b'), ('c',))
@@ -0,0 +1,38 @@
+import shutil
+import pytest
+from cfour_parser.batch import main as batch_main
+from cfour_parser.export import read_tables
+from cfour_parser.merge import merge_exports
+
+numpy = pytest.importorskip('numpy')
+
+
+def export(tmp_path, name, inputs):
+    directory = str(tmp_path / name)
+    batch_main([*inputs, '--export', 'npz', '-o', directory])
+    return directory
+
+
+def test_merge_exports_renumbers_states(tmp_path, pyrazine):
+    first = tmp_path / 'first'
+    second = tmp_path / 'second'
+    first.mkdir()
+    second.mkdir()
+    shutil.copy(pyrazine, first / 'a.c4')
+    (second / 'b.c4').write_text(open(pyrazine).read() + ' run 2\n')
+
+    shards = [export(tmp_path, 'first.npz', [str(first)]),
+              export(tmp_path, 'second.npz', [str(second)])]
+    merged = str(tmp_path / 'merged')
+    assert merge_exports(shards, merged) == 2
+    tables = read_tables(merged)
+    expected = read_tables(export(tmp_path, 'both', [str(first),
+                                                     str(second)]))
+
+    states = tables['eom_states']['state']
+    assert len(states) > 0
+    assert len(numpy.unique(states)) == len(states)
+    for table in ('eom_states', 'eom_amplitudes'):
+        for column in ('run', 'state'):
+            assert numpy.array_equal(tables[table][column],
+                                     expected[table][column])
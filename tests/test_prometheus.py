@@ -0,0 +1,12 @@
+from cfour_parser.prometheus import JobMonitor
+
+
+def test_update_in_chunks(monkeypatch, pyrazine):
+    whole = JobMonitor(pyrazine)
+    whole.update()
+    monkeypatch.setattr('cfour_parser.prometheus.READ_CHUNK', 1000)
+    chunked = JobMonitor(pyrazine)
+    chunked.update()
+    assert chunked.completed > 0
+    assert chunked.metrics() == whole.metrics()
+    assert chunked.partial == whole.partial
@@ -0,0 +1,24 @@
+from cfour_parser.batch import main as batch_main
+from cfour_parser.store import iter_input_records
+
+
+def test_ndjson_records_keep_their_shard(tmp_path, pyrazine):
+    runs = tmp_path / 'runs'
+    text = open(pyrazine).read()
+    for run in range(6):
+        job = runs / f'job{run}'
+        job.mkdir(parents=True)
+        (job / 'out.c4').write_text(text + f' run {run}\n')
+    ndjson = str(tmp_path / 'all.ndjson')
+    batch_main([str(runs), '-o', ndjson])
+
+    names = []
+    for index in (1, 2, 3):
+        shard = (index, 3)
+        parsed = [record['name'] for record in
+                  iter_input_records([str(runs)], shard=shard)]
+        read = [record['name'] for record in
+                iter_input_records([ndjson], shard=shard)]
+        assert read == parsed
+        names += read
+    assert sorted(names) == [f'job{run}/out.c4' for run in range(6)]
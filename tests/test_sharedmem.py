@@ -0,0 +1,25 @@
+import pytest
+from cfour_parser.sharedmem import GrowingTables, SharedArrays, share_arrays
+
+numpy = pytest.importorskip('numpy')
+
+
+def test_growing_tables():
+    tables = GrowingTables()
+    for n in (1, 3, 2):
+        tables.append({'t': {'x': numpy.arange(n),
+                             'name': numpy.array(['a' * n] * n)}})
+    arrays = tables.arrays()['t']
+    assert arrays['x'].tolist() == [0, 0, 1, 2, 0, 1]
+    assert arrays['name'].tolist() == ['a', 'aaa', 'aaa', 'aaa', 'aa', 'aa']
+
+
+def test_append_from_shared_block(monkeypatch):
+    monkeypatch.setattr('cfour_parser.sharedmem.SHARED_MIN_BYTES', 0)
+    arrays = {'t': {'x': numpy.arange(10.0)}}
+    descriptor = share_arrays(arrays)
+    assert 'shared' in descriptor
+    tables = GrowingTables()
+    with SharedArrays(descriptor) as shared:
+        tables.append(shared.arrays)
+    assert tables.arrays()['t']['x'].tolist() == arrays['t']['x'].tolist()
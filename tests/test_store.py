@@ -0,0 +1,58 @@
+from cfour_parser.store import connect, ingest_records, iter_input_records
+
+
+def test_two_xjoda(two_xjoda):
+    connection = connect(':memory:')
+    n_stored = ingest_records(connection, iter_input_records([two_xjoda]))
+    assert n_stored == 1
+    xjodas = connection.execute(
+        "SELECT program_idx FROM programs WHERE name = 'xjoda'").fetchall()
+    assert len(xjodas) == 2
+    rows = connection.execute(
+        'SELECT DISTINCT program_idx FROM control_parameters').fetchall()
+    assert sorted(rows) == sorted(xjodas)
+
+
+def test_failed_record_is_skipped(pyrazine):
+    connection = connect(':memory:')
+    good, = iter_input_records([pyrazine])
+    broken = dict(good, sha256='broken', programs=[{'name': 'xvscf'}])
+    n_stored = ingest_records(connection, [broken, good], batch_size=1)
+    assert n_stored == 1
+    assert connection.execute('SELECT sha256 FROM runs').fetchall() == [
+        (good['sha256'],)]
+
+
+def test_upgrade_control_parameters(tmp_path, pyrazine):
+    path = str(tmp_path / 'old.sqlite')
+    old = connect(path)
+    old.executescript(
+        "INSERT INTO runs VALUES (1, 'sha', 'old.c4', NULL, 3, 4, 0);"
+        "INSERT INTO programs (run_id, program_idx, name) "
+        "VALUES (1, 2, 'xjoda');"
+        'DROP TABLE control_parameters;'
+        'CREATE TABLE control_parameters (run_id INTEGER NOT NULL, '
+        'name TEXT NOT NULL, internal_name TEXT, value TEXT, '
+        'PRIMARY KEY (run_id, name));'
+        "INSERT INTO control_parameters VALUES (1, 'CC_CONV', 'ICCCNV', '7');"
+    )
+    old.commit()
+    old.close()
+    connection = connect(path)
+    assert connection.execute('SELECT * FROM control_parameters').fetchall() \
+        == [(1, 2, 'CC_CONV', 'ICCCNV', '7')]
+    assert ingest_records(connection, iter_input_records([pyrazine])) == 1
+
+
+def test_checkout_times(pyrazine):
+    connection = connect(':memory:')
+    record, = iter_input_records([pyrazine])
+    ingest_records(connection, [record])
+    timed = [program['data'] for program in record['programs']
+             if 'wall time, sec' in program['data']]
+    assert len(timed) > 0
+    rows = connection.execute(
+        'SELECT cpu_time, wall_time FROM programs '
+        'WHERE wall_time IS NOT NULL ORDER BY program_idx').fetchall()
+    assert rows == [(data['CPU time, sec'], data['wall time, sec'])
+                    for data in timed]